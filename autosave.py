@@ -0,0 +1,94 @@
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, QTimer
+
+import constants
+from fileio import save_layout
+
+
+class AutosaveManager(QObject):
+    """定期的な自動保存（スナップショットは GUI スレッド、書き込みはワーカースレッド）"""
+    def __init__(self, window, interval_ms: int = constants.AUTOSAVE_INTERVAL_MS) -> None:
+        """初期化処理"""
+        super().__init__(window)
+        self.window = window
+        self._dirty = False  # 前回の自動保存以降にレイアウトが変化したか
+        self._pending: Future | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        window.undoStack.indexChanged.connect(self._mark_dirty)
+        window.undoStack.cleanChanged.connect(self._on_clean_changed)
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.autosave)
+        self.timer.start()
+
+    def watch_scene(self, scene) -> None:
+        """Undo スタックを通らない編集（プロパティ欄・パッチ表など）も変更として扱う"""
+        scene.itemsMarkedDirty.connect(self._mark_dirty)
+
+    def _mark_dirty(self, *args) -> None:
+        """Undo スタック・シーンの変化を記録"""
+        self._dirty = True
+
+    def _on_clean_changed(self, is_clean: bool) -> None:
+        """手動保存でクリーンになった場合は自動保存は不要"""
+        if is_clean:
+            self._dirty = False
+
+    def autosave_path(self) -> str:
+        """自動保存先のパス（保存済みファイルの隣、未保存なら data/autosave）"""
+        file_path = self.window.current_file_path
+        if file_path:
+            base, ext = os.path.splitext(file_path)
+            return f"{base}.autosave{ext}"
+        return os.path.join(constants.AUTOSAVE_DIR, "untitled.autosave.json")
+
+    def autosave(self) -> bool:
+        """変更があればスナップショットを取り、書き込みをワーカーに渡す"""
+        if self._pending is not None:
+            if not self._pending.done():
+                return False  # 前回の書き込みが終わっていなければ次の周期に回す
+            if not self._pending.result():
+                self._dirty = True  # 失敗していれば再試行
+            self._pending = None
+        if not self._dirty:
+            return False
+        # シーンへのアクセスは GUI スレッドでのみ行う（以降は単なる dict のみを扱う）
+        snapshot = self.window._build_layout_data()
+        path = self.autosave_path()
+        self._dirty = False
+        self._pending = self._executor.submit(self._write, snapshot, path)
+        return True
+
+    @staticmethod
+    def _write(snapshot: dict, path: str) -> bool:
+        """ワーカースレッドでのエンコードとアトミック書き込み（成否を返し、GUI 側の状態には触れない）"""
+        start = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            save_layout(snapshot, path)
+        except Exception as e:
+            print(f"自動保存中にエラーが発生しました: {e}")
+            return False
+        print(f"自動保存しました: {path} ({(time.perf_counter() - start) * 1000:.0f}ms)")
+        return True
+
+    def discard(self, *paths: str) -> None:
+        """手動保存後などに古い自動保存ファイル（現在の保存先と paths）を削除"""
+        # 書き込み中の自動保存が削除後にファイルを作り直さないよう、完了を待つ
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+        for path in dict.fromkeys((self.autosave_path(), *paths)):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"自動保存ファイルを削除できませんでした: {e}")
+
+    def shutdown(self) -> None:
+        """タイマーを止め、書き込み中の自動保存の完了を待つ"""
+        self.timer.stop()
+        self._executor.shutdown(wait=True)
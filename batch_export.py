@@ -0,0 +1,117 @@
+"""レイアウトの一括出力 (PDF / PNG)
+
+使い方: python main.py export (--pdf 出力フォルダ | --png 出力フォルダ) レイアウト... [--pages layout,dmx_map,...] [--jobs N]
+
+画面なし (offscreen) で動作し、表のプレビュー (TablePreviewDialog) は経由せずに
+ExportDialog と同じ出力処理を使う。レイアウトはプロセスプールに振り分け、
+各ワーカープロセスが QApplication と MainWindow を1つずつ持って順に処理する。
+"""
+import argparse
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# ExportDialog の出力項目と同じ名前
+PAGES = ("layout", "dmx_map", "dmx_list", "pwr_map", "pwr_list")
+
+# ワーカープロセス毎のアプリケーションとウィンドウ
+_app = None
+_window = None
+
+
+def _init_worker() -> None:
+    """ワーカープロセスの初期化（画面なしの QApplication を作る）"""
+    global _app
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    import constants
+    constants.ensure_data_directories()
+    _app = QApplication.instance() or QApplication([])
+
+
+def _get_window():
+    """ワーカー内で使い回す MainWindow（機材ライブラリの読み込みは1回だけ）"""
+    global _window
+    if _window is None:
+        from main import MainWindow  # ワーカー内でのみ必要なため関数内でインポート
+        _window = MainWindow()
+    return _window
+
+
+def _export_layout(layout_path: str, out_dir: str, export_format: str, pages: tuple[str, ...]) -> dict:
+    """1つのレイアウトを読み込んで出力する（ワーカープロセスで実行）"""
+    from image_resolver import IMAGE_RESOLVER
+    start = time.perf_counter()
+    result = {"layout": layout_path, "output": None, "error": None, "missing_images": []}
+    try:
+        window = _get_window()
+        if not window.open_layout(layout_path):
+            result["error"] = "レイアウトを読み込めませんでした"
+            return result
+        result["missing_images"] = IMAGE_RESOLVER.take_missing()
+
+        options = {page: page in pages for page in PAGES}
+        options["format"] = export_format
+        dmx_html = window._generate_dmx_list_html() if options["dmx_list"] else ""
+        pwr_html = window._generate_power_list_html() if options["pwr_list"] else ""
+        name = os.path.splitext(os.path.basename(layout_path))[0]
+        out_path = os.path.join(out_dir, f"{name}.{export_format}")
+        window.export_pages(out_path, options, dmx_html, pwr_html)
+        result["output"] = out_path
+    except Exception as e:
+        result["error"] = f"{e}\n{traceback.format_exc()}"
+    finally:
+        result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _parse_pages(text: str) -> tuple[str, ...]:
+    """--pages の値 (カンマ区切り) を検証"""
+    pages = tuple(p.strip() for p in text.split(",") if p.strip())
+    unknown = [p for p in pages if p not in PAGES]
+    if unknown or not pages:
+        raise argparse.ArgumentTypeError(f"不明なページ: {', '.join(unknown) or '(空)'} (候補: {', '.join(PAGES)})")
+    return pages
+
+
+def main(argv: list[str]) -> int:
+    """コマンドライン引数に従って一括出力する（失敗があれば 1 を返す）"""
+    parser = argparse.ArgumentParser(prog="main.py export", description="レイアウトを PDF / PNG に一括出力する")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--pdf", metavar="出力フォルダ", help="PDF として出力")
+    target.add_argument("--png", metavar="出力フォルダ", help="PNG として出力（ページ毎に1ファイル）")
+    parser.add_argument("layouts", nargs="+", metavar="レイアウト", help="レイアウトファイル (.json / .olb)")
+    parser.add_argument("--pages", type=_parse_pages, default=PAGES, help=f"出力するページ (既定: {','.join(PAGES)})")
+    parser.add_argument("--jobs", type=int, default=0, help="ワーカープロセス数 (既定: CPU 数)")
+    args = parser.parse_args(argv)
+
+    export_format = "pdf" if args.pdf else "png"
+    out_dir = args.pdf or args.png
+    names = [os.path.splitext(os.path.basename(p))[0] for p in args.layouts]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        print(f"出力ファイル名が重複します: {', '.join(duplicates)}")
+        return 2
+    os.makedirs(out_dir, exist_ok=True)
+
+    jobs = max(1, min(args.jobs or os.cpu_count() or 1, len(args.layouts)))
+    # Qt は fork 後の子プロセスで安全に使えないため spawn で起動する
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_worker) as executor:
+        futures = [executor.submit(_export_layout, path, out_dir, export_format, args.pages) for path in args.layouts]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            prefix = f"[{done}/{len(futures)}] {result['layout']}"
+            if result["error"]:
+                failures += 1
+                print(f"{prefix}: 失敗 - {result['error']}")
+                continue
+            print(f"{prefix} -> {result['output']} ({result['seconds']:.1f}s)")
+            if result["missing_images"]:
+                print(f"  画像が見つかりません ({len(result['missing_images'])}件): {', '.join(result['missing_images'])}")
+    print(f"{len(futures) - failures}/{len(futures)} 件を出力しました ({time.perf_counter() - start:.1f}s, {jobs} プロセス)")
+    return 1 if failures else 0
@@ -0,0 +1,594 @@
+"""パフォーマンス計測スクリプト
+
+使い方: python benchmarks.py [計測名 ...]  (省略時は全て実行)
+"""
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+# 画面なしで実行できるようにする
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import Qt, QEvent, QPoint, QPointF, QRectF
+from PySide6.QtGui import QImage, QMouseEvent
+
+import constants
+import layout_binary
+from items import EquipmentItem, OutletItem, VenueItem, WiringItem, wire_anchor
+from scene import LayoutScene
+from views import CustomGraphicsView
+from venue_catalog import VenueCatalog
+
+BENCH_TYPE_INFO = {
+    "id": "bench_fixture", "type": "equipment", "name": "Bench",
+    "image_path": "placeholder.png", "has_power": True, "has_dmx": True,
+    "power_consumption": 100, "dmx_modes": [{"name": "4ch", "channels": 4}]
+}
+
+
+def _build_wired_scene(wire_count: int) -> tuple[LayoutScene, CustomGraphicsView, list[EquipmentItem]]:
+    """機材を一列に並べ、隣同士を配線したシーンを作成"""
+    scene = LayoutScene()
+    scene.setSceneRect(-5000, -5000, 10000, 10000)  # MainWindow と同じ初期範囲
+    view = CustomGraphicsView(scene)
+    view.mainWindow = None
+    outlet = OutletItem({"x": -100, "y": 0, "circuit_id": "A-1"})
+    scene.addItem(outlet)
+    fixtures = []
+    prev = outlet
+    for i in range(wire_count):
+        item = EquipmentItem(BENCH_TYPE_INFO)
+        item.setPos((i % 100) * 80, (i // 100) * 80)
+        scene.addItem(item)
+        scene.addItem(WiringItem(prev, item, [], wire_type="power"))
+        fixtures.append(item)
+        prev = item
+    return scene, view, fixtures
+
+
+def _build_truss_scene(truss_count: int) -> tuple[LayoutScene, CustomGraphicsView, EquipmentItem]:
+    """スナップ点付きのトラスを格子状に並べ、ドラッグ用の機材を1台置いたシーンを作成"""
+    scene = LayoutScene()
+    scene.setSceneRect(-5000, -5000, 10000, 10000)  # MainWindow と同じ初期範囲
+    view = CustomGraphicsView(scene)
+    view.mainWindow = None
+    view.show_grid = False
+    truss_info = dict(BENCH_TYPE_INFO, id="bench_truss", name="Truss", has_power=False, has_dmx=False,
+                      snap_points=[{"x": x, "y": 0} for x in range(-100, 101, 25)])
+    for i in range(truss_count):
+        truss = EquipmentItem(truss_info)
+        truss.setPos((i % 50) * 300, (i // 50) * 120)
+        scene.addItem(truss)
+    mover = EquipmentItem(BENCH_TYPE_INFO)
+    scene.addItem(mover)
+    return scene, view, mover
+
+
+def _time_per_call(func, repeat: int) -> float:
+    """1回あたりの平均時間(ms)を返す"""
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def bench_drag() -> None:
+    """1台の機材をドラッグしたときの1移動あたりのコスト（配線更新は配線数に対して一定であること）"""
+    print("drag: 配線数 / 1移動あたり(ms) / うち配線更新(ms)")
+    for wire_count in (500, 1000, 2000, 4000):
+        scene, view, fixtures = _build_wired_scene(wire_count)
+        target = fixtures[len(fixtures) // 2]
+        origin = target.pos()
+        move_ms = _time_per_call(lambda i: target.setPos(origin + QPointF(i % 7, i % 5)), 200)
+        wire_ms = _time_per_call(lambda i: target.update_attached_wires(), 200)
+        print(f"  {wire_count:>6} {move_ms:8.3f} {wire_ms:8.3f}")
+
+
+def bench_snap() -> None:
+    """スナップ点を持つトラスが多数ある時の1移動あたりのコスト（トラス数に対して一定であること）"""
+    print("snap: トラス数 / 1移動あたり(ms)")
+    for truss_count in (100, 500, 1000, 2000):
+        scene, view, mover = _build_truss_scene(truss_count)
+        ms = _time_per_call(lambda i: mover.setPos((i * 37) % 15000, (i * 13) % 4800), 200)
+        print(f"  {truss_count:>6} {ms:8.3f}")
+
+
+def bench_group_drag() -> None:
+    """300台を選択してドラッグした時の1フレームあたりのコスト（トランザクション有無の比較）"""
+    print("group_drag: 配線数 / 1フレームあたり(ms) 逐次 / まとめて反映")
+    for wire_count in (1000, 4000):
+        scene, view, fixtures = _build_wired_scene(wire_count)
+        group = fixtures[:300]
+        origins = [item.pos() for item in group]
+        
+        def move_group(i: int) -> None:
+            offset = QPointF(i % 7, i % 5)
+            for item, origin in zip(group, origins):
+                item.setPos(origin + offset)
+        
+        plain_ms = _time_per_call(move_group, 20)
+        scene.begin_drag(group)
+        
+        def move_group_batched(i: int) -> None:
+            move_group(i)
+            scene.flush_drag()
+        
+        batched_ms = _time_per_call(move_group_batched, 20)
+        scene.end_drag()
+        print(f"  {wire_count:>6} {plain_ms:8.3f} {batched_ms:8.3f}")
+
+
+def _make_layout_data(fixture_count: int) -> dict:
+    """_perform_save と同じ形のレイアウトデータを作成"""
+    equipment = []
+    wires = []
+    for i in range(fixture_count):
+        equipment.append({
+            "instance_id": f"inst_{i:08x}", "type_id": "bench_fixture",
+            "x": (i % 100) * 80.0, "y": (i // 100) * 80.0, "angle": 0.0,
+            "z_value": 30.0, "text_visible": True, "channel_visible": True,
+            "text_color": "#ffffff", "channel_text_color": "#00ffff",
+            "dmx_data": {"universe": 1 + i // 128, "address": 1 + (i % 128) * 4, "mode_name": "4ch"}
+        })
+        if i:
+            wires.append({
+                "start_item_id": f"inst_{i - 1:08x}", "end_item_id": f"inst_{i:08x}",
+                "points": [{"x": (i % 100) * 80.0, "y": (i // 100) * 80.0 - 40.0}],
+                "wire_category": "dmx" if i % 2 else "power"
+            })
+    return {"version": 1.1, "background_color": "#969696",
+            "venue": {"walls": [], "outlets": []}, "equipment_items": equipment, "wires": wires}
+
+
+def bench_layout_format() -> None:
+    """JSON とバイナリ(.olb)のファイルサイズ・読み込み時間の比較"""
+    print("layout_format: 機材数 / JSON(KB, ms) / バイナリ(KB, ms)")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for fixture_count in (1000, 5000, 20000):
+            layout_data = _make_layout_data(fixture_count)
+            json_path = os.path.join(tmp_dir, "layout.json")
+            binary_path = os.path.join(tmp_dir, "layout.olb")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(layout_data, f, indent=4, ensure_ascii=False)
+            layout_binary.dump(layout_data, binary_path)
+            
+            def load_json(i: int) -> None:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    json.load(f)
+            
+            json_ms = _time_per_call(load_json, 10)
+            binary_ms = _time_per_call(lambda i: layout_binary.load(binary_path), 10)
+            assert layout_binary.load(binary_path) == layout_data
+            print(f"  {fixture_count:>6} {os.path.getsize(json_path) / 1024:9.0f} {json_ms:8.1f}"
+                  f" {os.path.getsize(binary_path) / 1024:9.0f} {binary_ms:8.1f}")
+
+
+def _frame_ms(view: CustomGraphicsView, repeat: int, before_frame=None) -> float:
+    """ビューポート全体を1回描画する平均時間(ms)（毎フレーム数pxずつパンする）"""
+    image = QImage(view.viewport().size(), QImage.Format_ARGB32_Premultiplied)
+    scroll_bar = view.horizontalScrollBar()
+    origin = scroll_bar.value()
+    
+    def frame(i: int) -> None:
+        scroll_bar.setValue(origin + (i % 16) * 3)
+        if before_frame is not None:
+            before_frame()
+        view.viewport().render(image)
+    
+    frame(0)  # 初回の準備分は除く
+    return _time_per_call(frame, repeat)
+
+
+def bench_grid() -> None:
+    """グリッド表示の有無による1フレームの描画時間（タイルキャッシュ無効化時との比較）"""
+    print("grid: ズーム / グリッドなし(ms) / キャッシュなし(ms) / タイルキャッシュ(ms)")
+    scene, view, fixtures = _build_wired_scene(200)
+    view.resize(1600, 900)
+    for zoom in (1.0, 0.25):
+        view.resetTransform()
+        view.scale(zoom, zoom)
+        view.show_grid = False
+        off_ms = _frame_ms(view, 30)
+        view.show_grid = True
+        cold_ms = _frame_ms(view, 30, view._grid_tiles.invalidate)
+        warm_ms = _frame_ms(view, 30)
+        print(f"  {zoom:>6} {off_ms:8.2f} {cold_ms:8.2f} {warm_ms:8.2f}")
+
+
+def bench_lod() -> None:
+    """全体表示時の1フレームの描画時間（詳細度の切り替えなし / あり）"""
+    print("lod: 機材数 / ズーム / 常に通常描画(ms) / 詳細度切り替え(ms)")
+    for count in (1000, 3000):
+        scene, view, fixtures = _build_wired_scene(count)
+        view.resize(1600, 900)
+        view.show_grid = False
+        for zoom in (0.35, 0.1):
+            view.resetTransform()
+            view.scale(zoom, zoom)
+            view.centerOn(fixtures[len(fixtures) // 2])
+            view.set_lod_thresholds(0, 0)
+            full_ms = _frame_ms(view, 10)
+            view.set_lod_thresholds(constants.LOD_FULL_MIN_SCALE, constants.LOD_THUMBNAIL_MIN_SCALE)
+            lod_ms = _frame_ms(view, 10)
+            print(f"  {count:>6} {zoom:>6} {full_ms:8.2f} {lod_ms:8.2f}")
+
+
+def bench_viewport_update() -> None:
+    """3000台のシーンで、操作1回分の再描画にかかる時間（全体再描画 / 高速描画モード）"""
+    print("viewport_update: 操作 / 全体再描画(ms) / 高速描画モード(ms)")
+    app = QApplication.instance()
+    scene, view, fixtures = _build_wired_scene(3000)
+    view.resize(1600, 900)
+    view.show()
+    view.centerOn(fixtures[1550])
+    target = fixtures[1550]
+    origin = target.pos()
+    scroll_bar = view.horizontalScrollBar()
+    scroll_origin = scroll_bar.value()
+    cases = {
+        "選択の切り替え": lambda i: target.setSelected(i % 2 == 0),
+        "機材1台の移動": lambda i: target.setPos(origin + QPointF(i % 7, 0)),
+        "配線ハイライト": lambda i: target.setWiringHighlight(i % 2 == 0),
+        "3pxのパン": lambda i: scroll_bar.setValue(scroll_origin + (i % 16) * 3),
+    }
+    results = {name: [] for name in cases}
+    for enabled in (False, True):
+        view.set_performance_mode(enabled)
+        app.processEvents()
+        for name, action in cases.items():
+            action(1)
+            app.processEvents()  # キャッシュ作成などの初回分は除く
+            
+            def frame(i: int, action=action) -> None:
+                action(i)
+                app.processEvents()  # 保留中の再描画をここで行う
+            
+            results[name].append(_time_per_call(frame, 30))
+    view.set_performance_mode(False)
+    view.hide()
+    for name, (full_ms, fast_ms) in results.items():
+        print(f"  {name:<10} {full_ms:8.2f} {fast_ms:8.2f}")
+
+
+def bench_wiring_snap() -> None:
+    """配線中のマウス移動1回あたりのコスト（機材数に対して一定であること）"""
+    print("wiring_snap: 機材数 / 配線開始(ms) / 1移動あたり(ms)")
+    app = QApplication.instance()
+    for count in (100, 1000, 10000):
+        scene = LayoutScene()
+        scene.setSceneRect(-5000, -5000, 10000, 10000)
+        view = CustomGraphicsView(scene)
+        view.mainWindow = None
+        view.resize(1600, 900)
+        fixtures = []
+        for i in range(count):
+            item = EquipmentItem(BENCH_TYPE_INFO)
+            item.setPos((i % 100) * 80, (i // 100) * 80)
+            scene.addItem(item)
+            fixtures.append(item)
+        view.set_interaction_mode("wiring_dmx")
+        start = fixtures[0]
+        view.centerOn(start)
+        start_pos = view.mapFromScene(wire_anchor(start))
+        
+        def event(kind: QEvent.Type, pos: QPointF, button: Qt.MouseButton) -> QMouseEvent:
+            return QMouseEvent(kind, pos, view.viewport().mapToGlobal(pos), button, button, Qt.NoModifier)
+        
+        def start_wiring(i: int) -> None:
+            view._cancel_wiring()
+            view.mousePressEvent(event(QEvent.MouseButtonPress, QPointF(start_pos), Qt.LeftButton))
+        
+        start_ms = _time_per_call(start_wiring, 5)
+        # 機材の中心付近（スナップあり）と機材の間（スナップなし）を交互に動かす
+        moves = [QPointF(start_pos + QPoint(40 * (i % 10), 5 * (i % 3))) for i in range(20)]
+        move_ms = _time_per_call(lambda i: view.mouseMoveEvent(event(QEvent.MouseMove, moves[i % 20], Qt.NoButton)), 500)
+        view._cancel_wiring()
+        app.processEvents()
+        print(f"  {count:>6} {start_ms:8.2f} {move_ms:8.3f}")
+
+
+def bench_wire_shape() -> None:
+    """配線の当たり判定（範囲選択・ホバー相当）のコスト（形状キャッシュなし / あり）"""
+    print("wire_shape: 配線数 / 範囲選択 キャッシュなし(ms) / あり(ms) / 点の判定 なし(ms) / あり(ms)")
+    for wire_count in (1000, 4000):
+        scene, view, fixtures = _build_wired_scene(wire_count)
+        band = QRectF(-200, -100, 4000, 1200)
+        point = fixtures[len(fixtures) // 2].pos() + QPointF(-30, 25)
+        # 形状の判定対象になる配線（外接矩形が重なるもの）だけキャッシュを破棄する
+        band_wires = [item for item in scene.items(band) if isinstance(item, WiringItem)]
+        point_wires = [item for item in scene.items(QRectF(point, point)) if isinstance(item, WiringItem)]
+        
+        def cold(wires: list, query) -> None:
+            for wire in wires:
+                wire._shapes.clear()
+            query()
+        
+        band_query = lambda: scene.items(band, Qt.IntersectsItemShape)
+        point_query = lambda: scene.items(point)
+        band_cold_ms = _time_per_call(lambda i: cold(band_wires, band_query), 10)
+        band_warm_ms = _time_per_call(lambda i: band_query(), 10)
+        point_cold_ms = _time_per_call(lambda i: cold(point_wires, point_query), 200)
+        point_warm_ms = _time_per_call(lambda i: point_query(), 200)
+        print(f"  {wire_count:>6} {band_cold_ms:8.2f} {band_warm_ms:8.2f} {point_cold_ms:8.3f} {point_warm_ms:8.3f}")
+
+
+def _add_dense_venue(scene: LayoutScene, outlet_count: int) -> None:
+    """細かい壁（格子状の客席図面を想定）とコンセントを追加"""
+    walls = []
+    for row in range(60):
+        y = row * 60 - 600
+        walls.append([QPointF(-1000 + x * 20, y + (x % 2) * 10) for x in range(600)])
+    scene.addItem(VenueItem(walls))
+    for i in range(outlet_count):
+        scene.addItem(OutletItem({"x": (i % 50) * 230 - 900, "y": (i // 50) * 350 - 550, "circuit_id": f"A-{i}"}))
+
+
+def bench_static_layer() -> None:
+    """会場図面の上での1フレームの描画時間（アイテムとして描画 / 静的レイヤー）"""
+    print("static_layer: ズーム / 操作 / アイテムとして描画(ms) / 静的レイヤー(ms)（作り直しはタイルを毎回破棄）")
+    scene, view, fixtures = _build_wired_scene(200)
+    _add_dense_venue(scene, 500)
+    view.resize(1600, 900)
+    target = fixtures[50]
+    origin = target.pos()
+    for zoom in (1.0, 0.25):
+        view.resetTransform()
+        view.scale(zoom, zoom)
+        view.centerOn(target)
+        results = []
+        for enabled in (False, True):
+            view.set_static_layer_enabled(enabled)
+            pan_ms = _frame_ms(view, 20)
+            moves = itertools.count()
+            drag_ms = _frame_ms(view, 20, lambda: target.setPos(origin + QPointF(next(moves) % 7, 3)))
+            rebuild_ms = _frame_ms(view, 5, scene.invalidate_static_layer)
+            results.append((pan_ms, drag_ms, rebuild_ms))
+        view.set_static_layer_enabled(False)
+        print(f"  {zoom:>6} パン       {results[0][0]:8.2f} {results[1][0]:8.2f}")
+        print(f"  {zoom:>6} パン+移動  {results[0][1]:8.2f} {results[1][1]:8.2f}")
+        print(f"  {zoom:>6} 作り直し   {results[0][2]:8.2f} {results[1][2]:8.2f}")
+
+
+def bench_router() -> None:
+    """配線の自動ルーティング（占有マップの作成 / キャッシュ再利用 / 経路探索のスレッド数による違い）"""
+    import router
+    print("router: 配線数 / 占有マップ 初回(ms) / 再利用(ms) / 経路探索 1スレッド(ms) / 並列(ms) / 経路なし(本)")
+    for wire_count in (200, 1000):
+        scene, view, fixtures = _build_wired_scene(wire_count)
+        # 機材の間に配線を通せる間隔を空ける
+        for i, item in enumerate(fixtures):
+            item.setPos((i % 100) * 120, (i // 100) * 160)
+        rows = (wire_count + 99) // 100
+        # 外周の壁と、機材の列の間を仕切る（片側が空いた）壁
+        walls = [[QPointF(-300, -300), QPointF(12200, -300), QPointF(12200, rows * 160 + 200), QPointF(-300, rows * 160 + 200), QPointF(-300, -300)]]
+        walls += [[QPointF(300 if row % 2 else -300, row * 160 + 110), QPointF(12200 if row % 2 else 11700, row * 160 + 110)] for row in range(rows - 1)]
+        scene.addItem(VenueItem(walls))
+        wires = scene.items_of(WiringItem)
+        cache = router.OBSTACLE_CACHE
+        
+        def build_cold(i: int) -> None:
+            scene.invalidate_static_layer()
+            cache.get(scene)
+        
+        cold_ms = _time_per_call(build_cold, 3)
+        warm_ms = _time_per_call(lambda i: cache.get(scene), 10)
+        workers = constants.ROUTER_WORKERS
+        constants.ROUTER_WORKERS = 1
+        single_ms = _time_per_call(lambda i: router.route_wires(scene, wires), 1)
+        constants.ROUTER_WORKERS = workers
+        start = time.perf_counter()
+        routes = router.route_wires(scene, wires)
+        parallel_ms = (time.perf_counter() - start) * 1000
+        print(f"  {wire_count:>6} {cold_ms:10.1f} {warm_ms:8.2f} {single_ms:10.1f} {parallel_ms:8.1f} {len(wires) - len(routes):6}")
+
+
+def bench_power() -> None:
+    """電力計算のコスト（全体の再計算 / 配線1本の変更後 / 変更なし）"""
+    from power import PowerGraph
+    print("power: 機材数 / 全体再計算(ms) / 配線1本変更 過負荷判定(ms) / レポート(ms) / 変更なし(ms)")
+    for count in (1000, 4000):
+        scene, view, fixtures = _build_wired_scene(count)
+        # 20台毎にチェーンを切り、別のコンセントから給電する
+        for i in range(0, count, 20):
+            for wire in [w for w in fixtures[i].attached_wires if w.end_item is fixtures[i]]:
+                scene.removeItem(wire)
+            outlet = OutletItem({"x": (i % 100) * 80, "y": (i // 100) * 80 - 40, "circuit_id": f"A-{i // 200}"})
+            scene.addItem(outlet)
+            scene.addItem(WiringItem(outlet, fixtures[i], [], wire_type="power"))
+        items = scene.items_of(EquipmentItem, OutletItem, WiringItem)
+        
+        def rebuild(i: int) -> None:
+            graph = PowerGraph()
+            for item in items:
+                graph.add_item(item)
+            graph.report()
+        
+        full_ms = _time_per_call(rebuild, 3)
+        wire = next(w for w in fixtures[count // 2 + 5].attached_wires if w.start_item is fixtures[count // 2 + 4])
+        
+        def toggle_wire(i: int, report: bool) -> None:
+            if i % 2:
+                scene.addItem(wire)
+            else:
+                scene.removeItem(wire)
+            if report:
+                scene.power_graph.report()
+            else:
+                scene.power_graph.overloads()
+        
+        overload_ms = _time_per_call(lambda i: toggle_wire(i, False), 20)
+        report_ms = _time_per_call(lambda i: toggle_wire(i, True), 20)
+        cached_ms = _time_per_call(lambda i: scene.power_graph.report(), 100)
+        print(f"  {count:>6} {full_ms:10.2f} {overload_ms:10.3f} {report_ms:10.3f} {cached_ms:10.4f}")
+
+
+def bench_dmx_overlap() -> None:
+    """DMX アドレスの重複検出（総当たり / ユニバース毎の走査）"""
+    import random
+    from dmx_patch import Footprint, find_overlaps, is_allowed_overlap
+    
+    def pairwise(footprints: list[Footprint]) -> int:
+        count = 0
+        for i, a in enumerate(footprints):
+            for b in footprints[i + 1:]:
+                if a.universe == b.universe and a.start <= b.end and b.start <= a.end and not is_allowed_overlap(a, b):
+                    count += 1
+        return count
+    
+    print("dmx_overlap: 機材数 / 総当たり(ms) / 走査(ms) / 重複(組)")
+    rng = random.Random(0)
+    for count in (500, 2500):
+        # 16ch の機材を隙間なく並べ、1% だけ手入力の誤りで重ねる
+        footprints = []
+        for i in range(count):
+            universe, slot = divmod(i, 32)
+            start = slot * 16 + 1 - (rng.randrange(1, 16) if rng.random() < 0.01 else 0)
+            footprints.append(Footprint(i, universe + 1, start, start + 15, "Bench", "16ch"))
+        pairwise_ms = _time_per_call(lambda i: pairwise(footprints), 1)
+        sweep_ms = _time_per_call(lambda i: find_overlaps(footprints), 10)
+        print(f"  {count:>6} {pairwise_ms:10.1f} {sweep_ms:8.2f} {len(find_overlaps(footprints)):6}")
+
+
+def bench_dmx_occupancy() -> None:
+    """ユニバースの使用状況（作成 / 1台の変更 / 空き検索 / 断片化 / 一覧の画像作成）"""
+    from dmx_patch import UniverseOccupancy
+    from widgets import UniverseOccupancyWidget
+    print("dmx_occupancy: 機材数 / 作成(ms) / 1台変更(ms) / 空き検索(ms) / 断片化(ms) / 画像作成(ms)")
+    for count in (2500, 10000):
+        scene, view, fixtures = _build_wired_scene(count)
+        for i, item in enumerate(fixtures):
+            universe, slot = divmod(i, 100)  # 4ch x 100台 = 400ch / ユニバース
+            item.setDmxData(universe + 1, slot * 4 + 1, "4ch")
+        build_ms = _time_per_call(lambda i: UniverseOccupancy.from_items(fixtures), 3)
+        occupancy = UniverseOccupancy.from_items(fixtures)
+        target = fixtures[count // 2]
+        move_ms = _time_per_call(lambda i: occupancy.set_footprint(target, target.dmx_universe, 401 + i % 100, 4), 100)
+        free_ms = _time_per_call(lambda i: occupancy.first_free_block(112), 20)
+        fragmentation_ms = _time_per_call(lambda i: occupancy.fragmentation(i % 10 + 1), 100)
+        widget = UniverseOccupancyWidget()
+        widget.set_occupancy(occupancy)
+        image_ms = _time_per_call(lambda i: widget.refresh(), 20)
+        print(f"  {count:>6} {build_ms:8.1f} {move_ms:10.4f} {free_ms:10.3f} {fragmentation_ms:10.4f} {image_ms:10.3f}")
+
+
+def bench_dmx_modes() -> None:
+    """機材のチャンネル数の取得（モード一覧の走査 / ライブラリの表 / 機材のキャッシュ）"""
+    from library import EquipmentLibrary
+    modes = [{"name": f"{ch}ch", "channels": ch, "definitions": [f"P{i}" for i in range(ch)]} for ch in range(1, 41)]
+    type_info = dict(BENCH_TYPE_INFO, dmx_modes=modes)
+    library = EquipmentLibrary([type_info])
+    
+    def scan(item: EquipmentItem) -> int:
+        for m in item.data(0).get("dmx_modes", []):
+            if m["name"] == item.dmx_mode_name:
+                return m.get("channels", 1)
+        return 1
+    
+    print("dmx_modes: 機材数 / 走査(ms) / ライブラリ(ms) / 機材キャッシュ(ms)")
+    for count in (2500, 10000):
+        items = []
+        for i in range(count):
+            item = EquipmentItem(type_info, mode_table=library.mode_table(type_info["id"]))
+            item.setDmxData(1, 1, f"{i % 40 + 1}ch")
+            items.append(item)
+        scan_ms = _time_per_call(lambda i: [scan(item) for item in items], 3)
+        table_ms = _time_per_call(lambda i: [library.mode_channels(item.type_id, item.dmx_mode_name) for item in items], 3)
+        cached_ms = _time_per_call(lambda i: [item.dmx_channels for item in items], 3)
+        print(f"  {count:>6} {scan_ms:8.1f} {table_ms:10.1f} {cached_ms:10.1f}")
+
+
+def bench_auto_patch() -> None:
+    """選択機材の自動パッチ（並べ替え / 割り当て / コマンド適用）"""
+    from commands import CommandChangeDmx
+    from dmx_patch import ORDER_STRATEGIES, PACKING_MODES, auto_patch, order_fixtures
+    print("auto_patch: 機材数 / 並べ方 / 詰め方 / 並べ替え(ms) / 割り当て(ms) / 適用(ms)")
+    count = 10000
+    scene, view, fixtures = _build_wired_scene(count)
+    reserved = [(None, 1, 8), (1, 9, 16)]
+    for strategy in ORDER_STRATEGIES:
+        for packing in PACKING_MODES:
+            order_ms = _time_per_call(lambda i: order_fixtures(fixtures, strategy), 3)
+            requests = [(item, item.dmx_channels) for item in order_fixtures(fixtures, strategy)]
+            solve_ms = _time_per_call(lambda i: auto_patch(requests, packing, universe_limit=500, reserved=reserved), 3)
+            assignments, _ = auto_patch(requests, packing, universe_limit=500, reserved=reserved)
+            changes = [(item, (item.dmx_universe, item.dmx_address, item.dmx_mode_name), (universe, address, item.dmx_mode_name))
+                       for item, (universe, address) in assignments.items()]
+            start = time.perf_counter()
+            CommandChangeDmx(changes).redo()
+            apply_ms = (time.perf_counter() - start) * 1000
+            print(f"  {count:>6} {strategy:>8} {packing:>9} {order_ms:10.1f} {solve_ms:10.1f} {apply_ms:10.1f}")
+
+
+def bench_venue_catalog() -> None:
+    """会場一覧の表示コスト（全ファイル読み込み / カタログ初回作成 / 差分更新）"""
+    print("venue_catalog: 会場数 / 全読み込み(ms) / 初回(ms) / 変更なし(ms) / 1件変更(ms)")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        venue_dir = os.path.join(tmp_dir, "venues")
+        os.makedirs(venue_dir)
+        venue_count = 200
+        for v in range(venue_count):
+            walls = [[{"x": float(i), "y": float((i * 7 + w) % 500)} for i in range(1000)] for w in range(3)]
+            outlets = [{"x": float(i * 10), "y": 0.0, "circuit_id": f"A-{i}"} for i in range(20)]
+            with open(os.path.join(venue_dir, f"venue_{v:03d}.json"), "w", encoding="utf-8") as f:
+                json.dump({"name": f"会場{v}", "walls": walls, "outlets": outlets}, f, indent=4, ensure_ascii=False)
+        
+        def load_all(i: int) -> None:
+            for name in os.listdir(venue_dir):
+                with open(os.path.join(venue_dir, name), "r", encoding="utf-8") as f:
+                    json.load(f)
+        
+        full_ms = _time_per_call(load_all, 3)
+        catalog_path = os.path.join(tmp_dir, "catalog.json")
+        start = time.perf_counter()
+        VenueCatalog(venue_dir, catalog_path).refresh()
+        cold_ms = (time.perf_counter() - start) * 1000
+        # ダイアログを開き直す度に新しく作る想定（カタログファイルから読み込む）
+        warm_ms = _time_per_call(lambda i: VenueCatalog(venue_dir, catalog_path).refresh(), 5)
+        
+        def touch_one(i: int) -> None:
+            os.utime(os.path.join(venue_dir, "venue_000.json"), ns=(i, i + 1))
+            VenueCatalog(venue_dir, catalog_path).refresh()
+        
+        one_ms = _time_per_call(touch_one, 5)
+        print(f"  {venue_count:>6} {full_ms:10.1f} {cold_ms:8.1f} {warm_ms:10.1f} {one_ms:10.1f}")
+
+
+BENCHMARKS = {
+    "drag": bench_drag,
+    "snap": bench_snap,
+    "group_drag": bench_group_drag,
+    "layout_format": bench_layout_format,
+    "grid": bench_grid,
+    "lod": bench_lod,
+    "viewport_update": bench_viewport_update,
+    "static_layer": bench_static_layer,
+    "wire_shape": bench_wire_shape,
+    "wiring_snap": bench_wiring_snap,
+    "router": bench_router,
+    "power": bench_power,
+    "dmx_overlap": bench_dmx_overlap,
+    "dmx_occupancy": bench_dmx_occupancy,
+    "dmx_modes": bench_dmx_modes,
+    "auto_patch": bench_auto_patch,
+    "venue_catalog": bench_venue_catalog,
+}
+
+
+def main(argv: list[str]) -> int:
+    """指定された計測を実行"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    names = argv or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"不明な計測名: {name} (候補: {', '.join(BENCHMARKS)})")
+            return 1
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
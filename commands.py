@@ -7,6 +7,16 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from items import EquipmentItem, WiringItem, OutletItem, VenueItem, VenueOutletItem
 
+def _mark_dirty(items) -> None:
+    """アイテムを所属シーンの変更済みリストに記録する（差分保存用。シーン毎にまとめて通知）"""
+    by_scene: dict[QGraphicsScene, list[QGraphicsItem]] = {}
+    for item in items:
+        scene = item.scene()
+        if scene is not None and hasattr(scene, "mark_dirty"):
+            by_scene.setdefault(scene, []).append(item)
+    for scene, scene_items in by_scene.items():
+        scene.mark_dirty(*scene_items)
+
 class CommandAddItems(QUndoCommand):
     """ 1つまたは複数のアイテムをシーンに追加するコマンド """
     def __init__(self, items: list[QGraphicsItem] | QGraphicsItem, scene: QGraphicsScene, description: str = "アイテムの追加") -> None:
@@ -19,10 +29,12 @@ class CommandAddItems(QUndoCommand):
         """コマンド実行（やり直し）"""
         for item in self.items:
             self.scene.addItem(item)
+        _mark_dirty(self.items)
         self.scene.update()
     
     def undo(self) -> None:
         """コマンド取り消し（元に戻す）"""
+        _mark_dirty(self.items)
         for item in self.items:
             if item.scene(): # シーンに存在する場合のみ削除
                 self.scene.removeItem(item)
@@ -38,18 +50,14 @@ class CommandRemoveItems(QUndoCommand):
         # 削除対象の機材に接続されている配線も検索し、削除リストに含める
         # (CustomGraphicsView.keyPressEvent のロジックをここに統合)
         items_set = set(items_to_delete_initially)
-        wires_to_remove = []
-        all_wires = [item for item in self.scene.items() if isinstance(item, WiringItem)]
+        wires_to_remove = set()
         
         for item in items_set:
             if isinstance(item, EquipmentItem):
-                for wire in all_wires:
-                    if wire.start_item is item or wire.end_item is item:
-                        if wire not in wires_to_remove:
-                            wires_to_remove.append(wire)
+                wires_to_remove.update(item.attached_wires)
         
         # 最終的に削除/復活させるアイテムのリスト（配線も含む）
-        self.all_items_to_process = list(items_set | set(wires_to_remove))
+        self.all_items_to_process = list(items_set | wires_to_remove)
         
         # 復活させる順序（機材 -> 配線）を考慮
         self.equip_items = [item for item in self.all_items_to_process if isinstance(item, EquipmentItem)]
@@ -57,6 +65,7 @@ class CommandRemoveItems(QUndoCommand):
     
     def redo(self) -> None:
         """コマンド実行（やり直し） -> アイテムを削除"""
+        _mark_dirty(self.all_items_to_process)
         # 削除（配線 -> 機材の順が安全）
         for item in self.wire_items:
             if item.scene():
@@ -75,6 +84,7 @@ class CommandRemoveItems(QUndoCommand):
         for item in self.wire_items:
             if not item.scene():
                 self.scene.addItem(item)
+        _mark_dirty(self.all_items_to_process)
         self.scene.update()
 
 class CommandMoveItems(QUndoCommand):
@@ -100,6 +110,7 @@ class CommandMoveItems(QUndoCommand):
         
     def scene_update(self) -> None:
         """最初のアイテムのシーンを取得して更新する"""
+        _mark_dirty(item for item, _, _ in self.items_with_pos)
         if self.items_with_pos:
             item = self.items_with_pos[0][0]
             if item.scene():
@@ -128,11 +139,68 @@ class CommandRotateItems(QUndoCommand):
     
     def scene_update(self) -> None:
         """シーンを更新する"""
+        _mark_dirty(item for item, _, _ in self.items_with_rot)
         if self.items_with_rot:
             item = self.items_with_rot[0][0]
             if item.scene():
                 item.scene().update()
 
+class CommandRouteWires(QUndoCommand):
+    """ 配線の経路（中間点）をまとめて変更するコマンド（自動ルーティング用） """
+    def __init__(self, wires_with_points: list[tuple["WiringItem", list[QPointF], list[QPointF]]], description: str = "配線の自動ルーティング") -> None:
+        """ wires_with_points: (wire, old_points, new_points) のタプルのリスト """
+        super().__init__(description)
+        self.wires_with_points = wires_with_points
+    
+    def redo(self) -> None:
+        """コマンド実行（やり直し）"""
+        for wire, _, new_points in self.wires_with_points:
+            wire.middle_points = list(new_points)
+            wire.update_path()
+        self.scene_update()
+    
+    def undo(self) -> None:
+        """コマンド取り消し（元に戻す）"""
+        for wire, old_points, _ in self.wires_with_points:
+            wire.middle_points = list(old_points)
+            wire.update_path()
+        self.scene_update()
+    
+    def scene_update(self) -> None:
+        """シーンを更新する"""
+        _mark_dirty(wire for wire, _, _ in self.wires_with_points)
+        if self.wires_with_points:
+            wire = self.wires_with_points[0][0]
+            if wire.scene():
+                wire.scene().update()
+
+class CommandChangeDmx(QUndoCommand):
+    """ 複数の機材の DMX ユニバース・アドレス・モードをまとめて変更するコマンド（自動パッチ用） """
+    def __init__(self, items_with_dmx: list[tuple["EquipmentItem", tuple[int, int, str], tuple[int, int, str]]], description: str = "DMXパッチの変更") -> None:
+        """ items_with_dmx: (item, (旧universe, 旧address, 旧mode), (新universe, 新address, 新mode)) のタプルのリスト """
+        super().__init__(description)
+        self.items_with_dmx = items_with_dmx
+    
+    def redo(self) -> None:
+        """コマンド実行（やり直し）"""
+        for item, _, new_dmx in self.items_with_dmx:
+            item.setDmxData(*new_dmx)
+        self.scene_update()
+    
+    def undo(self) -> None:
+        """コマンド取り消し（元に戻す）"""
+        for item, old_dmx, _ in self.items_with_dmx:
+            item.setDmxData(*old_dmx)
+        self.scene_update()
+    
+    def scene_update(self) -> None:
+        """シーンを更新する"""
+        _mark_dirty(item for item, _, _ in self.items_with_dmx)
+        if self.items_with_dmx:
+            item = self.items_with_dmx[0][0]
+            if item.scene():
+                item.scene().update()
+
 class CommandChangeProperty(QUndoCommand):
     """ プロパティパネルからの変更（複数アイテム同時）を扱うクラス """
     def __init__(self, main_window: QMainWindow, items: list[QGraphicsItem], prop_name: str, old_values: list, new_value, description: str = "プロパティ変更") -> None:
@@ -178,12 +246,14 @@ class CommandChangeProperty(QUndoCommand):
         """コマンド実行（やり直し）"""
         for item in self.items:
             self._set_property(item, self.new_value)
+        _mark_dirty(self.items)
         self.mainWindow.update_properties_panel() # 念のため全体を更新
     
     def undo(self) -> None:
         """コマンド取り消し（元に戻す）"""
         for item, old_val in zip(self.items, self.old_values):
             self._set_property(item, old_val)
+        _mark_dirty(self.items)
         self.mainWindow.update_properties_panel() # 念のため全体を更新
 
 class CommandChangeTextColor(QUndoCommand):
@@ -215,6 +285,7 @@ class CommandChangeTextColor(QUndoCommand):
                 item.setChannelTextColor(color)
             elif self.target_type == 'outlet' and isinstance(item, OutletItem):
                 item.setTextColor(color)
+        _mark_dirty(self.items)
         if self.items: self.items[0].scene().update()
     
     def redo(self) -> None:
@@ -230,6 +301,7 @@ class CommandChangeTextColor(QUndoCommand):
                 item.setChannelTextColor(color)
             elif self.target_type == 'outlet' and isinstance(item, OutletItem):
                 item.setTextColor(color)
+        _mark_dirty(self.items)
         if self.items: self.items[0].scene().update()
 
 class CommandChangeZValue(QUndoCommand):
@@ -244,11 +316,13 @@ class CommandChangeZValue(QUndoCommand):
     def redo(self) -> None:
         """コマンド実行（やり直し）"""
         self.item.setZValue(self.new_z)
+        _mark_dirty([self.item])
         self.item.update()
     
     def undo(self) -> None:
         """コマンド取り消し（元に戻す）"""
         self.item.setZValue(self.old_z)
+        _mark_dirty([self.item])
         self.item.update()
 
 class VenueAddCommand(QUndoCommand):
@@ -5,7 +5,9 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 IMAGES_DIR = os.path.join(DATA_DIR, "images")
 VENUES_DIR = os.path.join(DATA_DIR, "venues")
+VENUE_CATALOG_FILE = os.path.join(DATA_DIR, "venue_catalog.json")
 LIBRARY_FILE = os.path.join(DATA_DIR, "equipment_library.json")
+AUTOSAVE_DIR = os.path.join(DATA_DIR, "autosave")
 
 # 定数定義
 Z_VAL_PREVIEW         = 100.0
@@ -20,6 +22,34 @@ DEFAULT_GRID_SIZE     = 50.0
 SNAP_DISTANCE_MOUSE   = 15.0
 SNAP_THRESHOLD_ITEM   = 20.0
 
+PIXMAP_CACHE_LIMIT_BYTES = 64 * 1024 * 1024  # 画像キャッシュの上限
+PIXMAP_SIZE_CACHE_LIMIT  = 4096  # 元画像サイズのキャッシュの上限 (件)
+LOAD_CHUNK_SIZE          = 200  # 読み込み時にイベントループへ処理を返す間隔 (アイテム数)
+AUTOSAVE_INTERVAL_MS     = 60 * 1000  # 自動保存の間隔
+JOURNAL_MAX_ENTRIES      = 100  # 差分ジャーナルをスナップショットにまとめる件数
+JOURNAL_COMPACT_RATIO    = 0.5  # ジャーナルがスナップショットのこの割合を超えたらまとめる
+JOURNAL_VERIFY_SAMPLE    = 200  # 差分保存の度に記録漏れを照合するアイテム数（セクション毎）
+VENUE_THUMBNAIL_SIZE     = 64  # 会場一覧の縮小表示の大きさ (px)
+GRID_TILE_PX             = 256  # グリッド背景のキャッシュタイルの大きさ (画面px)
+GRID_TILE_CACHE_LIMIT    = 256  # 保持するグリッドタイルの上限 (枚)
+LOD_FULL_MIN_SCALE       = 0.5  # この表示倍率以上で機材を通常描画
+LOD_THUMBNAIL_MIN_SCALE  = 0.2  # この表示倍率以上で縮小画像+アドレス、未満は種類毎の色の矩形のみ
+LOD_THUMBNAIL_PX         = 24  # 中間の詳細度で使う縮小画像の幅 (px)
+STATIC_LAYER_TILE_PX     = 512  # 会場の静的レイヤーのタイルの大きさ (画面px)
+STATIC_LAYER_CACHE_LIMIT = 64  # 保持する静的レイヤーのタイルの上限 (枚)
+VENUE_PATH_CHUNK         = 64  # 会場の壁を部分描画用に分ける区間の線分数
+ITEM_CACHE_LIMIT_KB      = 96 * 1024  # 高速描画モードで機材の描画キャッシュに使う QPixmapCache の上限
+DMX_UNIVERSE_SIZE        = 512  # 1ユニバースのチャンネル数
+AUTO_PATCH_ROW_HEIGHT    = 50.0  # 自動パッチを配置位置の順で行う時、同じ段とみなす高さ
+ROUTER_CELL_SIZE         = 25.0  # 自動ルーティングの格子の間隔
+ROUTER_MAX_CELLS         = 400_000  # 格子のセル数の上限（超える場合は格子を粗くする）
+ROUTER_MARGIN            = 200.0  # 配置範囲の外側に確保する迂回用の余白
+ROUTER_CLEARANCE         = 5.0  # 機材の外接矩形の周りに空ける間隔
+ROUTER_BEND_PENALTY      = 5  # 曲がり角1つ分のコスト（セル数換算）
+ROUTER_MAX_EXPANSIONS    = 500_000  # 1本の探索で展開するセル数の上限（超えたら経路なし）
+ROUTER_WORKERS           = 4  # まとめて探索する時のスレッド数
+ROUTER_POLL_INTERVAL     = 0.05  # 探索の完了を待つ間に進捗表示を更新する間隔 (秒)
+
 # ディレクトリ作成関数
 def ensure_data_directories():
     if not os.path.exists(DATA_DIR):
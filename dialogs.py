@@ -2,7 +2,6 @@ import os
 import copy
 import uuid
 import shutil
-import glob
 import json
 
 from PySide6.QtWidgets import (
@@ -11,20 +10,28 @@ from PySide6.QtWidgets import (
     QComboBox, QTableWidget, QHeaderView, QTableWidgetItem, QTreeWidgetItem,
     QFileDialog, QMessageBox, QProgressDialog, QAbstractItemView,
     QStackedWidget, QListWidget, QListWidgetItem, QGraphicsScene,
-    QRadioButton, QButtonGroup, QDoubleSpinBox,
+    QRadioButton, QButtonGroup, QDoubleSpinBox, QScrollArea,
     QApplication
 )
 from PySide6.QtCore import Qt, QSize, QTimer, QPoint, QRectF, QPointF
 from PySide6.QtGui import (
-    QPixmap, QColor, QPen, QPainter, QPageSize, QPageLayout,
-    QTextDocument, QImage, QFont, QCloseEvent, QUndoStack, QKeySequence
+    QColor, QPen, QPainter, QPageSize, QPageLayout,
+    QTextDocument, QImage, QFont, QCloseEvent, QUndoStack, QKeySequence, QIcon
 )
 from PySide6.QtPrintSupport import QPrinter
 
 import constants
-from widgets import SnapPreviewWidget, NumericTableWidgetItem, FilterHeaderView, AdvancedTableWidget
+from widgets import SnapPreviewWidget, NumericTableWidgetItem, FilterHeaderView, AdvancedTableWidget, UniverseOccupancyWidget
 from items import EquipmentItem, VenueItem, VenueOutletItem, WiringItem, OutletItem
 from views import VenueEditorView
+from pixmap_cache import PIXMAP_CACHE
+from image_resolver import IMAGE_RESOLVER
+from library import EquipmentLibrary
+from dmx_patch import (
+    Footprint, UniverseOccupancy, find_overlaps,
+    ORDER_STRATEGIES, PACKING_MODES, parse_reserved
+)
+from venue_catalog import VENUE_CATALOG, thumbnail_pixmap
 
 
 class EquipmentManagerDialog(QDialog):
@@ -35,6 +42,7 @@ class EquipmentManagerDialog(QDialog):
         self.setWindowTitle("機材ライブラリ管理")
         self.setMinimumSize(1100, 750) # 詳細表示のため少し大きく
         self.tree_data = copy.deepcopy(equipment_data)
+        self.library = EquipmentLibrary(self.tree_data)  # tree_data の ID 索引
         
         # --- UI構築 ---
         self.search_bar = QLineEdit()
@@ -320,7 +328,7 @@ class EquipmentManagerDialog(QDialog):
         
         # 大元のデータを検索して更新対象にする
         target_id = item_data_copy["id"]
-        real_item_data = self._find_data_by_id(self.tree_data, target_id)
+        real_item_data = self.library.find(target_id)
         if not real_item_data: return
         
         real_item_data["default_width"] = self.width_spin.value()
@@ -375,20 +383,14 @@ class EquipmentManagerDialog(QDialog):
         """画像幅・分割数・オフセットからスナップ点生成"""
         current_image_path = self.image_path_edit.text()
         
-        load_path = current_image_path
-        if current_image_path and not os.path.exists(current_image_path):
-            alt_path = os.path.join(constants.DATA_DIR, current_image_path)
-            if os.path.exists(alt_path):
-                load_path = alt_path
-        
-        if not os.path.exists(load_path):
+        load_path = IMAGE_RESOLVER.find(current_image_path)
+        if not load_path:
             QMessageBox.warning(self, "エラー", "画像が見つからないためサイズを計算できません。\n先に有効な画像を設定してください。")
             return
         
-        pixmap = QPixmap(load_path)
-        if pixmap.isNull(): return
+        width = PIXMAP_CACHE.source_size(load_path).width()
+        if width <= 0: return
         
-        width = pixmap.width()
         # height = pixmap.height() # 今回は幅基準
         
         divisions = self.snap_div_spin.value()
@@ -586,7 +588,7 @@ class EquipmentManagerDialog(QDialog):
         if not selected_item: return
         item_data_copy = selected_item.data(0, Qt.UserRole)
         target_id = item_data_copy["id"]
-        real_item_data = self._find_data_by_id(self.tree_data, target_id)
+        real_item_data = self.library.find(target_id)
         if not real_item_data: return
         
         modes = []
@@ -607,6 +609,7 @@ class EquipmentManagerDialog(QDialog):
                 except ValueError: pass
         
         real_item_data["dmx_modes"] = modes
+        self.library.update_modes(target_id)
         selected_item.setData(0, Qt.UserRole, real_item_data)
     
     def _on_form_edited(self) -> None:
@@ -615,7 +618,7 @@ class EquipmentManagerDialog(QDialog):
         if not selected_item: return
         item_data_copy = selected_item.data(0, Qt.UserRole)
         target_id = item_data_copy["id"]
-        real_item_data = self._find_data_by_id(self.tree_data, target_id)
+        real_item_data = self.library.find(target_id)
         if not real_item_data: return
         
         if real_item_data["type"] == "folder":
@@ -700,6 +703,8 @@ class EquipmentManagerDialog(QDialog):
                 
                 try:
                     shutil.copy2(file_path, dest_path)
+                    IMAGE_RESOLVER.invalidate()  # images フォルダの内容が変わったため
+                    PIXMAP_CACHE.invalidate(dest_path)  # 同名の画像を上書きした場合
                     
                     # 処理完了後にダイアログを閉じる
                     progress.close()
@@ -743,21 +748,22 @@ class EquipmentManagerDialog(QDialog):
         selected_item = self.tree_widget.currentItem()
         target_parent_data = None
         parent_widget = self.tree_widget
+        root_data = {"children": self.tree_data}  # 最上位を表す仮の親
         if not selected_item:
-            target_parent_data = {"children": self.tree_data}
+            target_parent_data = root_data
         else:
             selected_data_copy = selected_item.data(0, Qt.UserRole)
             if selected_data_copy["type"] == "folder":
-                target_parent_data = self._find_data_by_id(self.tree_data, selected_data_copy["id"])
+                target_parent_data = self.library.find(selected_data_copy["id"])
                 parent_widget = selected_item
             elif selected_data_copy["type"] == "equipment":
                 parent_tree_item = selected_item.parent()
                 if parent_tree_item:
                     parent_id = parent_tree_item.data(0, Qt.UserRole)["id"]
-                    target_parent_data = self._find_data_by_id(self.tree_data, parent_id)
+                    target_parent_data = self.library.find(parent_id)
                     parent_widget = parent_tree_item
                 else:
-                    target_parent_data = {"children": self.tree_data}
+                    target_parent_data = root_data
                     parent_widget = self.tree_widget
         if not target_parent_data or "children" not in target_parent_data:
             return
@@ -780,7 +786,7 @@ class EquipmentManagerDialog(QDialog):
                 "dmx_modes": [{"name": "Default", "channels": 1}], # デフォルトモード
                 "can_be_wired": True 
             }
-        target_parent_data["children"].append(new_data)
+        self.library.add(new_data, None if target_parent_data is root_data else target_parent_data)
         tree_item = QTreeWidgetItem(parent_widget)
         tree_item.setText(0, new_data["name"])
         tree_item.setData(0, Qt.UserRole, new_data)
@@ -801,16 +807,15 @@ class EquipmentManagerDialog(QDialog):
         reply = QMessageBox.question(self, "削除の確認", warning_message, QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             parent_tree_item = selected_item.parent()
+            target_id_to_delete = item_data_copy["id"]
             if parent_tree_item:
                 parent_id = parent_tree_item.data(0, Qt.UserRole)["id"]
-                parent_real_data = self._find_data_by_id(self.tree_data, parent_id)
+                parent_real_data = self.library.find(parent_id)
                 if parent_real_data and "children" in parent_real_data:
-                    target_id_to_delete = item_data_copy["id"]
-                    parent_real_data["children"] = [item for item in parent_real_data["children"] if item.get("id") != target_id_to_delete]
+                    self.library.remove(target_id_to_delete)
                     parent_tree_item.removeChild(selected_item)
             else:
-                target_id_to_delete = item_data_copy["id"]
-                self.tree_data = [item for item in self.tree_data if item.get("id") != target_id_to_delete]
+                self.library.remove(target_id_to_delete)
                 idx = self.tree_widget.indexOfTopLevelItem(selected_item)
                 if idx != -1:
                     self.tree_widget.takeTopLevelItem(idx)
@@ -822,24 +827,6 @@ class EquipmentManagerDialog(QDialog):
         self.tree_widget.setCurrentItem(None)
         self._on_selection_changed()
     
-    def _find_data_by_id(self, data_list: list[dict], target_id: str) -> dict | None:
-        """IDでデータを再帰検索"""
-        for item in data_list:
-            if item.get("id") == target_id: return item
-            if item.get("type") == "folder" and "children" in item:
-                found = self._find_data_by_id(item["children"], target_id)
-                if found: return found
-        return None
-    
-    def _find_tree_item_by_id(self, data_list: list[dict], target_id: str) -> dict | None:
-        """IDでツリー項目を再帰検索（未使用）"""
-        for item in data_list:
-            if item.get("id") == target_id: return item
-            if item.get("type") == "folder" and "children" in item:
-                found = self._find_data_by_id(item["children"], target_id)
-                if found: return found
-        return None
-    
     def get_updated_data(self) -> dict:
         """現在のツリー構造からデータを取得"""
         return self._reconstruct_data_from_tree()
@@ -1082,6 +1069,7 @@ class VenueManagerDialog(QDialog):
         layout = QVBoxLayout()
         
         self.list_widget = QListWidget()
+        self.list_widget.setIconSize(QSize(constants.VENUE_THUMBNAIL_SIZE, constants.VENUE_THUMBNAIL_SIZE))
         layout.addWidget(self.list_widget)
         
         btn_layout = QHBoxLayout()
@@ -1108,18 +1096,13 @@ class VenueManagerDialog(QDialog):
     def load_list(self) -> None:
         """会場リストを読み込んで表示する"""
         self.list_widget.clear()
-        files = glob.glob(os.path.join(self.venue_dir, "*.json"))
-        for f in files:
-            try:
-                with open(f, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    name = data.get("name", "Unknown")
-                    item = QListWidgetItem(f"{name} ({os.path.basename(f)})")
-                    item.setData(Qt.UserRole, f) # ファイルパスを保持
-                    self.list_widget.addItem(item)
-            except Exception as e:
-                print(f"会場データ読み込みエラー ({f}): {e}")
-                continue
+        # 変更のあったファイルだけを読み直したカタログから表示する
+        for f, entry in VENUE_CATALOG.refresh():
+            item = QListWidgetItem(f"{entry['name']} ({os.path.basename(f)})")
+            item.setData(Qt.UserRole, f) # ファイルパスを保持
+            item.setIcon(QIcon(thumbnail_pixmap(entry["thumbnail"])))
+            item.setToolTip(f"壁: {entry['wall_count']} / コンセント: {entry['outlet_count']}")
+            self.list_widget.addItem(item)
     
     def create_new_venue(self) -> None:
         """新しい会場データを作成する"""
@@ -1312,6 +1295,13 @@ class PatchWindow(QDialog):
         top_layout.addWidget(self.btn_refresh)
         top_layout.addWidget(self.lbl_status)
         top_layout.addStretch()
+        # 空きアドレスの検索（指定したチャンネル数が続けて空いている最初の位置）
+        self.spin_free_ch = QSpinBox(); self.spin_free_ch.setRange(1, constants.DMX_UNIVERSE_SIZE); self.spin_free_ch.setValue(16)
+        self.spin_free_ch.setPrefix("空き検索: "); self.spin_free_ch.setSuffix(" ch")
+        self.spin_free_ch.valueChanged.connect(self.update_free_block)
+        self.lbl_free = QLabel()
+        top_layout.addWidget(self.spin_free_ch)
+        top_layout.addWidget(self.lbl_free)
         layout.addLayout(top_layout)
         
         # --- パッチテーブル ---
@@ -1343,8 +1333,26 @@ class PatchWindow(QDialog):
         self.table.itemChanged.connect(self.on_table_item_changed)
         
         layout.addWidget(self.table)
+        
+        # --- ユニバースの使用状況 ---
+        self.occupancy = UniverseOccupancy()
+        self.occupancy_widget = UniverseOccupancyWidget()
+        occupancy_scroll = QScrollArea()
+        occupancy_scroll.setWidgetResizable(True)
+        occupancy_scroll.setWidget(self.occupancy_widget)
+        occupancy_scroll.setMaximumHeight(UniverseOccupancyWidget.ROW_HEIGHT * 12 + 4)
+        layout.addWidget(occupancy_scroll)
         self.setLayout(layout)
         
+        # 表の外（Undo/Redo・プロパティパネル・自動パッチ）で変わった機材の使用状況をまとめて反映する
+        self._pending_occupancy: dict[EquipmentItem, None] = {}
+        self._occupancy_timer = QTimer(self)
+        self._occupancy_timer.setSingleShot(True)
+        self._occupancy_timer.setInterval(0)
+        self._occupancy_timer.timeout.connect(self._apply_pending_occupancy)
+        if hasattr(self.scene, "itemsMarkedDirty"):
+            self.scene.itemsMarkedDirty.connect(self._on_items_marked_dirty)
+        
         # データ読み込み
         self.load_data()
     
@@ -1355,9 +1363,9 @@ class PatchWindow(QDialog):
         self.table.setRowCount(0)
         
         self.dmx_items = []
-        for item in self.scene.items():
-            # DMXを持ち、かつ EquipmentItem であるものを探す
-            if isinstance(item, EquipmentItem) and item.has_dmx:
+        for item in self.scene.items_of(EquipmentItem):
+            # DMXを持つものを探す
+            if item.has_dmx:
                 # コントローラー（卓）はパッチ対象外なので除外
                 if item.data(0).get("is_controller", False):
                     continue
@@ -1414,11 +1422,7 @@ class PatchWindow(QDialog):
             self.table.setItem(row, 5, addr_item)
             
             # Ch数 (数値・計算)
-            current_ch = 1
-            for m in modes:
-                if m["name"] == item.dmx_mode_name:
-                    current_ch = m.get("channels", 1)
-                    break
+            current_ch = item.dmx_channels
             ch_item = NumericTableWidgetItem(str(current_ch))
             ch_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
             self.table.setItem(row, 6, ch_item)
@@ -1433,6 +1437,50 @@ class PatchWindow(QDialog):
         self.apply_filters()
         self.validate_patch()
         self.table.blockSignals(False)
+        
+        self.occupancy = UniverseOccupancy.from_items(self.dmx_items)
+        self.occupancy_widget.set_occupancy(self.occupancy)
+        self.update_free_block()
+    
+    def _update_occupancy(self, item: EquipmentItem) -> None:
+        """機材1台分の使用状況を更新"""
+        self.occupancy.set_footprint(item, item.dmx_universe, item.dmx_address, item.dmx_channels)
+        self.occupancy_widget.refresh()
+        self.update_free_block()
+    
+    def _on_items_marked_dirty(self, items: list) -> None:
+        """シーンで変更された機材を使用状況の更新待ちにする"""
+        for item in items:
+            if isinstance(item, EquipmentItem):
+                self._pending_occupancy[item] = None
+        if self._pending_occupancy:
+            self._occupancy_timer.start()
+    
+    def _apply_pending_occupancy(self) -> None:
+        """更新待ちの機材の使用状況を反映（削除・DMX なしになった機材は取り除く）"""
+        items, self._pending_occupancy = list(self._pending_occupancy), {}
+        for item in items:
+            if item.scene() is self.scene and item.has_dmx and not item.data(0).get("is_controller", False):
+                self.occupancy.set_footprint(item, item.dmx_universe, item.dmx_address, item.dmx_channels)
+            else:
+                self.occupancy.remove(item)
+        self.occupancy_widget.refresh()
+        self.update_free_block()
+    
+    def done(self, result: int) -> None:
+        """閉じる時にシーンのシグナルを切り離す"""
+        if hasattr(self.scene, "itemsMarkedDirty"):
+            try:
+                self.scene.itemsMarkedDirty.disconnect(self._on_items_marked_dirty)
+            except (RuntimeError, TypeError):
+                pass
+        self._occupancy_timer.stop()
+        super().done(result)
+    
+    def update_free_block(self) -> None:
+        """指定チャンネル数の空きアドレスを表示"""
+        block = self.occupancy.first_free_block(self.spin_free_ch.value())
+        self.lbl_free.setText(f"→ U{block[0]}-{block[1]}" if block else "")
     
     def apply_filters(self) -> None:
         """ヘッダーのフィルタ設定に基づいて行の表示/非表示を切り替え"""
@@ -1453,15 +1501,25 @@ class PatchWindow(QDialog):
                 if target_item.dmx_universe != val:
                     target_item.dmx_universe = val
                     target_item.updateDmxText()
+                    self._mark_dirty(target_item)
+                    self._update_occupancy(target_item)
                     self.validate_patch()
             elif col == 5: # Address
                 if target_item.dmx_address != val:
                     target_item.dmx_address = val
                     target_item.updateDmxText()
+                    self._mark_dirty(target_item)
                     self.update_row_calculations(row, target_item) # End再計算
+                    self._update_occupancy(target_item)
                     self.validate_patch()
         except ValueError: pass
     
+    def _mark_dirty(self, item: EquipmentItem) -> None:
+        """直接編集したアイテムを差分保存の対象にする"""
+        scene = item.scene()
+        if scene is not None and hasattr(scene, "mark_dirty"):
+            scene.mark_dirty(item)
+    
     def on_mode_changed(self, item: EquipmentItem, index: int) -> None:
         """モードコンボボックス変更時の処理"""
         # ソートやフィルタで行番号が変わっている可能性があるため、アイテムから行を逆引き
@@ -1483,18 +1541,15 @@ class PatchWindow(QDialog):
         if item.dmx_mode_name != new_mode_name:
             item.dmx_mode_name = new_mode_name
             item.updateDmxText()
+            self._mark_dirty(item)
             self.update_row_calculations(row, item)
+            self._update_occupancy(item)
             self.validate_patch()
     
     def update_row_calculations(self, row: int, item: EquipmentItem) -> None:
         """行のチャンネル数・Endアドレスを再計算する"""
         self.table.blockSignals(True)
-        modes = item.data(0).get("dmx_modes", [])
-        current_ch = 1
-        for m in modes:
-            if m["name"] == item.dmx_mode_name:
-                current_ch = m.get("channels", 1)
-                break
+        current_ch = item.dmx_channels
         
         self.table.item(row, 6).setText(str(current_ch))
         end_addr = item.dmx_address + current_ch - 1
@@ -1509,16 +1564,16 @@ class PatchWindow(QDialog):
         
         # --- 1. DMX結線の接続確認 (BFS探索) ---
         adj = {}
-        for item in self.scene.items():
-            if isinstance(item, WiringItem) and item.wire_type == "dmx":
+        for item in self.scene.items_of(WiringItem):
+            if item.wire_type == "dmx":
                 u, v = item.start_item, item.end_item
                 if u and v:
                     adj.setdefault(u, []).append(v)
                     adj.setdefault(v, []).append(u)
         
         sources = []
-        for item in self.scene.items():
-            if isinstance(item, EquipmentItem) and item.has_dmx:
+        for item in self.scene.items_of(EquipmentItem):
+            if item.has_dmx:
                 if item.data(0).get("is_controller", False):
                     sources.append(item)
         
@@ -1559,10 +1614,7 @@ class PatchWindow(QDialog):
                 start = int(self.table.item(r, 5).text())
                 end = int(self.table.item(r, 7).text())
                 
-                entries.append({
-                    'row': r, 'u': univ, 's': start, 'e': end,
-                    'name': name, 'mode': mode
-                })
+                entries.append(Footprint(r, univ, start, end, name, mode))
                 
                 # --- Check B: 512ch超過 (Orange) ---
                 if end > 512:
@@ -1574,24 +1626,12 @@ class PatchWindow(QDialog):
                 print(f"パッチ検証エラー (行 {r}): {e}")
             
         # --- Check C: 重複チェック (Red) ---
-        for i in range(len(entries)):
-            for j in range(i + 1, len(entries)):
-                a = entries[i]
-                b = entries[j]
-                
-                if a['u'] == b['u']:
-                    if a['s'] <= b['e'] and b['s'] <= a['e']:
-                        is_same_machine = (a['name'] == b['name'])
-                        is_same_mode = (a['mode'] == b['mode'])
-                        is_same_start = (a['s'] == b['s'])
-                        
-                        if is_same_machine and is_same_mode and is_same_start:
-                            continue
-                        else:
-                            overlap_count += 1
-                            # 赤背景は白文字で見やすいので、文字色はデフォルト(Qt.white)でOK
-                            self._set_row_color(a['row'], QColor(255, 100, 100), Qt.white)
-                            self._set_row_color(b['row'], QColor(255, 100, 100), Qt.white)
+        # ユニバース毎に開始アドレス順で走査し、重なる組だけを調べる
+        for a, b in find_overlaps(entries):
+            overlap_count += 1
+            # 赤背景は白文字で見やすいので、文字色はデフォルト(Qt.white)でOK
+            self._set_row_color(a.key, QColor(255, 100, 100), Qt.white)
+            self._set_row_color(b.key, QColor(255, 100, 100), Qt.white)
         
         msg = []
         if overlap_count > 0: msg.append(f"重複: {overlap_count}件")
@@ -1619,6 +1659,82 @@ class PatchWindow(QDialog):
                 if text_color:
                     it.setForeground(text_color)
 
+class AutoPatchDialog(QDialog):
+    """選択機材の自動パッチ設定ダイアログ"""
+    def __init__(self, fixture_count: int, parent: QWidget = None) -> None:
+        """初期化処理"""
+        super().__init__(parent)
+        self.setWindowTitle("自動パッチ")
+        self.resize(380, 300)
+        self.reserved: list[tuple[int | None, int, int]] = []
+        
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"<b>選択中の {fixture_count} 台にアドレスを割り当てます</b>"))
+        
+        form = QFormLayout()
+        self.combo_order = QComboBox()
+        for key, label in ORDER_STRATEGIES.items():
+            self.combo_order.addItem(label, key)
+        form.addRow("並べ方:", self.combo_order)
+        
+        self.combo_packing = QComboBox()
+        for key, label in PACKING_MODES.items():
+            self.combo_packing.addItem(label, key)
+        form.addRow("詰め方:", self.combo_packing)
+        
+        self.spin_universe = QSpinBox(); self.spin_universe.setRange(1, 100); self.spin_universe.setPrefix("U: ")
+        self.spin_address = QSpinBox(); self.spin_address.setRange(1, constants.DMX_UNIVERSE_SIZE); self.spin_address.setPrefix("Addr: ")
+        start_layout = QHBoxLayout()
+        start_layout.addWidget(self.spin_universe)
+        start_layout.addWidget(self.spin_address)
+        form.addRow("開始位置:", start_layout)
+        
+        self.spin_limit = QSpinBox(); self.spin_limit.setRange(1, constants.DMX_UNIVERSE_SIZE); self.spin_limit.setValue(constants.DMX_UNIVERSE_SIZE); self.spin_limit.setSuffix(" ch")
+        form.addRow("1ユニバースの上限:", self.spin_limit)
+        
+        self.edit_reserved = QLineEdit()
+        self.edit_reserved.setPlaceholderText("例: 1:1-16, *:500-512")
+        form.addRow("予約範囲:", self.edit_reserved)
+        
+        self.chk_avoid_existing = QCheckBox("選択外の機材のアドレスを避ける")
+        self.chk_avoid_existing.setChecked(True)
+        form.addRow(self.chk_avoid_existing)
+        layout.addLayout(form)
+        
+        layout.addStretch()
+        btn_layout = QHBoxLayout()
+        btn_ok = QPushButton("割り当て")
+        btn_ok.clicked.connect(self.accept)
+        btn_cancel = QPushButton("キャンセル")
+        btn_cancel.clicked.connect(self.reject)
+        btn_layout.addStretch()
+        btn_layout.addWidget(btn_ok)
+        btn_layout.addWidget(btn_cancel)
+        layout.addLayout(btn_layout)
+        
+        self.setLayout(layout)
+    
+    def accept(self) -> None:
+        """予約範囲を検証してから閉じる"""
+        try:
+            self.reserved = parse_reserved(self.edit_reserved.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "自動パッチ", str(e))
+            return
+        super().accept()
+    
+    def get_options(self) -> dict:
+        """自動パッチ設定の選択内容を辞書で返す"""
+        return {
+            "order": self.combo_order.currentData(),
+            "packing": self.combo_packing.currentData(),
+            "start_universe": self.spin_universe.value(),
+            "start_address": self.spin_address.value(),
+            "universe_limit": self.spin_limit.value(),
+            "reserved": self.reserved,
+            "avoid_existing": self.chk_avoid_existing.isChecked()
+        }
+
 class ExportDialog(QDialog):
     """出力設定ダイアログ"""
     def __init__(self, parent: QWidget = None) -> None:
@@ -1733,7 +1849,7 @@ class TablePreviewDialog(QDialog):
     
     def populate_dmx_data(self, scene: QGraphicsScene) -> None:
         """DMXデータをシーンから読み込んでテーブルにセット"""
-        items = [i for i in scene.items() if isinstance(i, EquipmentItem) and i.has_dmx]
+        items = [i for i in scene.items_of(EquipmentItem) if i.has_dmx]
         # デフォルトのソート順
         items.sort(key=lambda x: (x.dmx_universe, x.dmx_address))
         
@@ -1746,12 +1862,7 @@ class TablePreviewDialog(QDialog):
             row = self.dmx_table.rowCount()
             self.dmx_table.insertRow(row)
             
-            modes = item.data(0).get("dmx_modes", [])
-            ch_count = 1
-            for m in modes:
-                if m["name"] == item.dmx_mode_name:
-                    ch_count = m.get("channels", 1)
-                    break
+            ch_count = item.dmx_channels
             
             # No.
             self.dmx_table.setItem(row, 0, NumericTableWidgetItem(str(i + 1)))
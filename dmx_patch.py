@@ -0,0 +1,336 @@
+"""DMX パッチの検証（アドレスの重複検出）とユニバースの使用状況
+
+機材毎のアドレス範囲 (Footprint) をユニバース毎に分け、開始アドレス順に並べて走査する。
+走査中は「まだ終わっていない範囲」を終了アドレスのヒープで持ち、新しい範囲の開始より
+前に終わったものを取り除けば、残りは全て新しい範囲と重なる。
+PatchWindow に依存しないため、表を開かずに機材の一覧からでも使える。
+
+UniverseOccupancy はユニバース毎に 512 スロットの array（スロットを使う機材の数）と、
+それを 255 で頭打ちにした bytearray を持ち、空きブロックの検索・断片化の度合い・
+スロットの使用機材を O(1)〜O(512) で答える。
+
+auto_patch は選択した機材にユニバース・開始アドレスをまとめて割り当てる。ユニバース毎の
+使用中スロット（既存のパッチ・予約範囲・チャンネル上限）を 0/1 の bytearray で持ち、
+空きブロックの検索は bytearray.find で行う。
+"""
+import heapq
+from array import array
+from collections.abc import Iterable
+from typing import NamedTuple
+
+import constants
+
+# 使用数 → 使用中なら 1 の変換表（空きの連続区間を bytes の操作で求める）
+_USED = bytes([0] + [1] * 255)
+
+
+class Footprint(NamedTuple):
+    """1台の機材が使う DMX アドレスの範囲"""
+    key: object  # 呼び出し側の識別子（表の行番号・機材など）
+    universe: int
+    start: int
+    end: int  # 最後のチャンネル（この値を含む）
+    name: str = ""
+    mode: str = ""
+
+
+def is_allowed_overlap(a: Footprint, b: Footprint) -> bool:
+    """重なっていても問題としない組か（同じ機材名・モード・開始アドレス）"""
+    return a.name == b.name and a.mode == b.mode and a.start == b.start
+
+
+def find_overlaps(footprints: Iterable[Footprint]) -> list[tuple[Footprint, Footprint]]:
+    """アドレスが重なる組（許可される組を除く）を全て返す"""
+    by_universe: dict[int, list[Footprint]] = {}
+    for footprint in footprints:
+        by_universe.setdefault(footprint.universe, []).append(footprint)
+    overlaps = []
+    for group in by_universe.values():
+        # 開始が同じなら先に終わるものを前にする（0ch の範囲も総当たりと同じ判定になる）
+        group.sort(key=lambda footprint: (footprint.start, footprint.end))
+        active: list[tuple[int, int]] = []  # (終了アドレス, group 内の番号)
+        for index, footprint in enumerate(group):
+            while active and active[0][0] < footprint.start:
+                heapq.heappop(active)
+            for _, other_index in active:
+                other = group[other_index]
+                if not is_allowed_overlap(other, footprint):
+                    overlaps.append((other, footprint))
+            heapq.heappush(active, (footprint.end, index))
+    return overlaps
+
+
+class UniverseOccupancy:
+    """ユニバース毎のスロットの使用状況（機材の追加・変更・削除で差分更新）"""
+    def __init__(self) -> None:
+        """初期化処理"""
+        size = constants.DMX_UNIVERSE_SIZE
+        self._counts: dict[int, array] = {}  # ユニバース → スロット毎の使用機材数
+        # ユニバース → スロット毎の使用機材数を 255 で頭打ちにした bytes 表現（検索・描画用。0 なら空き）
+        self._levels: dict[int, bytearray] = {}
+        self._owners: dict[int, list] = {}  # ユニバース → スロット毎の使用機材（最後に割り当てたもの）
+        self._footprints: dict[object, tuple[int, int, int]] = {}  # 機材 → (ユニバース, 開始, 終了)
+        self._universe_owners: dict[int, dict[object, None]] = {}
+        self._empty = bytes(size)
+
+    @classmethod
+    def from_items(cls, items: Iterable) -> "UniverseOccupancy":
+        """EquipmentItem の一覧から作成"""
+        occupancy = cls()
+        for item in items:
+            occupancy.set_footprint(item, item.dmx_universe, item.dmx_address, item.dmx_channels)
+        return occupancy
+
+    def _universe(self, universe: int) -> array:
+        """ユニバースのスロット配列（なければ作る）"""
+        counts = self._counts.get(universe)
+        if counts is None:
+            counts = self._counts[universe] = array("I", [0]) * constants.DMX_UNIVERSE_SIZE
+            self._levels[universe] = bytearray(constants.DMX_UNIVERSE_SIZE)
+            self._owners[universe] = [None] * constants.DMX_UNIVERSE_SIZE
+            self._universe_owners[universe] = {}
+        return counts
+
+    def set_footprint(self, owner: object, universe: int, start: int, channels: int) -> None:
+        """機材のアドレス範囲を設定（範囲外のスロットは記録しない）"""
+        self.remove(owner)
+        end = start + channels - 1
+        counts = self._universe(universe)
+        levels = self._levels[universe]
+        owners = self._owners[universe]
+        self._footprints[owner] = (universe, start, end)
+        self._universe_owners[universe][owner] = None
+        for index in range(max(start, 1) - 1, min(end, constants.DMX_UNIVERSE_SIZE)):
+            counts[index] += 1
+            levels[index] = min(counts[index], 255)
+            owners[index] = owner
+
+    def remove(self, owner: object) -> None:
+        """機材のアドレス範囲を外す"""
+        footprint = self._footprints.pop(owner, None)
+        if footprint is None:
+            return
+        universe, start, end = footprint
+        counts = self._counts[universe]
+        levels = self._levels[universe]
+        owners = self._owners[universe]
+        del self._universe_owners[universe][owner]
+        for index in range(max(start, 1) - 1, min(end, constants.DMX_UNIVERSE_SIZE)):
+            counts[index] -= 1
+            levels[index] = min(counts[index], 255)
+            if owners[index] is owner:
+                # 重なっていた他の機材があれば、そちらを使用機材にする
+                owners[index] = self._find_owner(universe, index + 1) if counts[index] else None
+
+    def _find_owner(self, universe: int, slot: int) -> object | None:
+        """スロットを使う機材をユニバース内から探す（重なりがある場合のみ）"""
+        for owner in self._universe_owners[universe]:
+            _, start, end = self._footprints[owner]
+            if start <= slot <= end:
+                return owner
+        return None
+
+    def universes(self) -> list[int]:
+        """機材が割り当てられているユニバース（昇順）"""
+        return sorted(universe for universe, owners in self._universe_owners.items() if owners)
+
+    def counts(self, universe: int) -> bytes:
+        """スロット毎の使用機材数（255 で頭打ち。描画用）"""
+        levels = self._levels.get(universe)
+        return bytes(levels) if levels is not None else self._empty
+
+    def owner_at(self, universe: int, slot: int) -> object | None:
+        """スロットを使っている機材（空きなら None）"""
+        owners = self._owners.get(universe)
+        if owners is None or not 1 <= slot <= constants.DMX_UNIVERSE_SIZE:
+            return None
+        return owners[slot - 1]
+
+    def used(self, universe: int) -> int:
+        """使用中のスロット数"""
+        levels = self._levels.get(universe)
+        return constants.DMX_UNIVERSE_SIZE - levels.count(0) if levels is not None else 0
+
+    def first_free(self, universe: int, channels: int, start: int = 1) -> int | None:
+        """start 以降で channels 個続けて空いている最初の開始アドレス（なければ None）"""
+        if not 1 <= channels <= constants.DMX_UNIVERSE_SIZE:
+            return None
+        levels = self._levels.get(universe)
+        if levels is None:
+            return start if start + channels - 1 <= constants.DMX_UNIVERSE_SIZE else None
+        index = levels.find(self._empty[:channels], start - 1)
+        return index + 1 if index >= 0 else None
+
+    def first_free_block(self, channels: int, first_universe: int = 1) -> tuple[int, int] | None:
+        """channels 個続けて空いている最初の (ユニバース, 開始アドレス)"""
+        if not 1 <= channels <= constants.DMX_UNIVERSE_SIZE:
+            return None
+        universe = first_universe
+        # 使用中の最後のユニバースの次は必ず空いている
+        while True:
+            address = self.first_free(universe, channels)
+            if address is not None:
+                return universe, address
+            universe += 1
+
+    def fragmentation(self, universe: int) -> float:
+        """空きの断片化の度合い（0 = 空きが1か所にまとまっている、1 に近いほど細切れ）"""
+        levels = self._levels.get(universe)
+        if levels is None:
+            return 0.0
+        free_runs = levels.translate(_USED).split(b"\x01")
+        free = sum(len(run) for run in free_runs)
+        if free == 0:
+            return 0.0
+        return 1.0 - max(len(run) for run in free_runs) / free
+
+
+# 自動パッチの並べ方
+ORDER_STRATEGIES = {"chain": "DMX配線の順", "position": "配置位置の順", "type": "機材の種類の順"}
+# 自動パッチの詰め方
+PACKING_MODES = {"first_fit": "空きを前から埋める", "gap_free": "隙間なく順に並べる"}
+
+
+def _position_key(item) -> tuple[int, float]:
+    """配置位置の並び順（上の段から、同じ段は左から）"""
+    pos = item.scenePos()
+    return round(pos.y() / constants.AUTO_PATCH_ROW_HEIGHT), pos.x()
+
+
+def order_fixtures(items: list, strategy: str) -> list:
+    """自動パッチで割り当てる順に機材を並べる"""
+    if strategy == "position":
+        return sorted(items, key=_position_key)
+    if strategy == "type":
+        return sorted(items, key=lambda item: (item.name, item.type_id, _position_key(item)))
+    if strategy != "chain":
+        raise ValueError(f"不明な並べ方: {strategy}")
+    # コントローラー（なければ配線の端の機材）から DMX 配線をたどった順。たどれない機材は配置位置の順
+    targets = set(items)
+    starts = []
+    for item in sorted(items, key=_position_key):
+        for wire in item.attached_wires:
+            if wire.wire_type != "dmx":
+                continue
+            other = wire.end_item if wire.start_item is item else wire.start_item
+            if other is not None and other not in targets:
+                starts.append(other)  # チェーン外（コントローラーなど）からつながる機材
+    starts += [item for item in sorted(items, key=_position_key)
+               if sum(1 for wire in item.attached_wires if wire.wire_type == "dmx") == 1]
+    ordered = []
+    visited = set()
+    for start in starts:
+        stack = [start]
+        while stack:
+            current = stack.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            if current in targets:
+                ordered.append(current)
+            neighbors = []
+            for wire in current.attached_wires:
+                if wire.wire_type != "dmx":
+                    continue
+                other = wire.end_item if wire.start_item is current else wire.start_item
+                # チェーン外の機材は通り抜けない
+                if other in targets and other not in visited:
+                    neighbors.append(other)
+            # 分岐は近い機材から順にたどる
+            stack.extend(sorted(neighbors, key=_position_key, reverse=True))
+    ordered += [item for item in sorted(items, key=_position_key) if item not in visited]
+    return ordered
+
+
+def parse_reserved(text: str) -> list[tuple[int | None, int, int]]:
+    """予約範囲の文字列 ("1:1-16, *:500-512, 3:100" のようなカンマ区切り) を解釈する"""
+    reserved = []
+    for part in text.replace("、", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        universe_text, _, range_text = part.rpartition(":")
+        start_text, _, end_text = range_text.partition("-")
+        try:
+            universe = None if universe_text.strip() in ("", "*") else int(universe_text)
+            start = int(start_text)
+            end = int(end_text) if end_text.strip() else start
+        except ValueError:
+            raise ValueError(f"予約範囲を解釈できません: {part}") from None
+        if not 1 <= start <= end:
+            raise ValueError(f"予約範囲の開始・終了が不正です: {part}")
+        reserved.append((universe, start, end))
+    return reserved
+
+
+def auto_patch(fixtures: list[tuple[object, int]], packing: str = "first_fit", start_universe: int = 1,
+               start_address: int = 1, universe_limit: int = constants.DMX_UNIVERSE_SIZE,
+               reserved: Iterable[tuple[int | None, int, int]] = (),
+               occupancy: UniverseOccupancy | None = None) -> tuple[dict[object, tuple[int, int]], list]:
+    """(機材, チャンネル数) の順に (ユニバース, 開始アドレス) を割り当てる
+
+    reserved は (ユニバース（None なら全て）, 開始, 終了) の予約範囲、occupancy は避ける既存のパッチ。
+    戻り値は (機材 → (ユニバース, 開始アドレス), 割り当てられなかった機材)。
+    """
+    if packing not in PACKING_MODES:
+        raise ValueError(f"不明な詰め方: {packing}")
+    size = constants.DMX_UNIVERSE_SIZE
+    universe_limit = max(0, min(universe_limit, size))
+    reserved = list(reserved)
+    # どのユニバースにも共通の使用不可スロット（チャンネル上限・全体の予約）
+    generic = bytearray(size)
+    generic[universe_limit:] = b"\x01" * (size - universe_limit)
+    for universe, start, end in reserved:
+        if universe is None:
+            _fill(generic, start, end)
+    # generic に収まる機材は、まだ使っていないユニバースには必ず収まる
+    masks: dict[int, bytearray] = {}
+
+    def mask(universe: int) -> bytearray:
+        """ユニバースの使用不可スロット（初回に作る）"""
+        used = masks.get(universe)
+        if used is None:
+            used = bytearray(generic)
+            if occupancy is not None:
+                counts = occupancy.counts(universe).translate(_USED)
+                if any(counts):
+                    used = bytearray(a | b for a, b in zip(used, counts))
+            for reserved_universe, start, end in reserved:
+                if reserved_universe == universe:
+                    _fill(used, start, end)
+            if universe == start_universe:
+                _fill(used, 1, start_address - 1)
+            masks[universe] = used
+        return used
+
+    assignments = {}
+    failed = []
+    first_universe: dict[int, int] = {}  # チャンネル数 → 空きを探し始めるユニバース（空きは減る一方なので戻らない）
+    cursor_universe, cursor_index = start_universe, 0
+    for owner, channels in fixtures:
+        block = bytes(channels)
+        if not 1 <= channels <= size or generic.find(block) < 0:
+            failed.append(owner)  # どのユニバースにも収まらない
+            continue
+        if packing == "first_fit":
+            universe = first_universe.get(channels, start_universe)
+            while (index := mask(universe).find(block)) < 0:
+                universe += 1
+            first_universe[channels] = universe
+        else:
+            universe, index = cursor_universe, mask(cursor_universe).find(block, cursor_index)
+            while index < 0:
+                universe += 1
+                index = mask(universe).find(block)
+            cursor_universe, cursor_index = universe, index + channels
+        masks[universe][index:index + channels] = b"\x01" * channels
+        assignments[owner] = (universe, index + 1)
+    return assignments, failed
+
+
+def _fill(used: bytearray, start: int, end: int) -> None:
+    """スロット start〜end（1始まり、end を含む）を使用不可にする"""
+    first = max(start, 1) - 1
+    last = min(end, len(used))
+    if last > first:
+        used[first:last] = b"\x01" * (last - first)
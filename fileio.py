@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+
+
+def atomic_write(file_path: str, data: bytes) -> None:
+    """一時ファイルに書き込み fsync してから置き換える（途中で落ちても元のファイルは壊れない）"""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    # リネーム自体も確実に残るようディレクトリも同期する (対応しない環境では無視)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def encode_layout(layout_data: dict, file_path: str) -> bytes:
+    """保存先の拡張子に応じてレイアウトデータをエンコード（.olb ならバイナリ、それ以外は JSON）"""
+    import layout_binary  # 循環参照回避のため関数内でインポート
+    if file_path.lower().endswith(layout_binary.BINARY_EXTENSION):
+        return layout_binary.dumps(layout_data)
+    return json.dumps(layout_data, indent=4, ensure_ascii=False).encode("utf-8")
+
+
+def save_layout(layout_data: dict, file_path: str) -> None:
+    """レイアウトデータをアトミックに保存"""
+    atomic_write(file_path, encode_layout(layout_data, file_path))
@@ -0,0 +1,179 @@
+import math
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QPointF, QRectF
+from PySide6.QtGui import QBrush, QColor, QFont, QFontMetricsF, QPainter, QPen, QPixmap
+
+import constants
+
+
+class DeviceTileCache(ABC):
+    """シーンの描画結果を画面ピクセル単位のタイル画像にキャッシュする（拡大縮小+平行移動のみのビュー用）"""
+    def __init__(self, tile_px: int = constants.GRID_TILE_PX, limit: int = constants.GRID_TILE_CACHE_LIMIT) -> None:
+        """初期化処理"""
+        self.tile_px = tile_px
+        self.limit = limit
+        self._key: tuple | None = None
+        self._tiles: OrderedDict[tuple[int, int], QPixmap] = OrderedDict()
+
+    def invalidate(self) -> None:
+        """全てのタイルを破棄"""
+        self._tiles.clear()
+        self._key = None
+
+    @abstractmethod
+    def _render_tile(self, col: int, row: int, dpr: float) -> QPixmap:
+        """タイル (col, row) を描画（サブクラスで実装）"""
+
+    def _tile(self, col: int, row: int, dpr: float) -> QPixmap:
+        """タイルを取得（なければ描画して格納し、上限を超えた分を古い順に破棄）"""
+        key = (col, row)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+        pixmap = self._render_tile(col, row, dpr)
+        self._tiles[key] = pixmap
+        while len(self._tiles) > self.limit:
+            self._tiles.popitem(last=False)
+        return pixmap
+
+    def _new_pixmap(self, dpr: float) -> QPixmap:
+        """透明なタイル画像（描画先と同じ ARGB32 Premultiplied になり、変換なしで転送できる）"""
+        size = round(self.tile_px * dpr)
+        pixmap = QPixmap(size, size)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        return pixmap
+
+    def _blit(self, painter: QPainter, rect: QRectF, key: tuple) -> None:
+        """シーン上の rect にかかるタイルを等倍で描画（key が変わったらタイルを作り直す）"""
+        dpr = painter.device().devicePixelRatioF()
+        key = key + (dpr,)
+        if key != self._key:
+            self._tiles.clear()
+            self._key = key
+        transform = painter.worldTransform()
+        # スクロール量は整数ピクセルなので、タイルの境界も整数ピクセルに揃う
+        offset_x = round(transform.dx())
+        offset_y = round(transform.dy())
+        device_rect = transform.mapRect(rect)
+        size = self.tile_px
+        first_col = math.floor((device_rect.left() - offset_x) / size)
+        last_col = math.floor((device_rect.right() - offset_x) / size)
+        first_row = math.floor((device_rect.top() - offset_y) / size)
+        last_row = math.floor((device_rect.bottom() - offset_y) / size)
+        painter.save()
+        painter.resetTransform()
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                painter.drawPixmap(offset_x + col * size, offset_y + row * size, self._tile(col, row, dpr))
+        painter.restore()
+
+
+class GridTileCache(DeviceTileCache):
+    """グリッド線をタイル画像にキャッシュする（ズーム段階・グリッド間隔・背景色が変わるまで使い回す）"""
+    def __init__(self, tile_px: int = constants.GRID_TILE_PX, limit: int = constants.GRID_TILE_CACHE_LIMIT) -> None:
+        """初期化処理"""
+        super().__init__(tile_px, limit)
+        self._pen = QPen(QColor(220, 220, 220))  # グリッド線
+        self._pen.setWidth(0)
+        self._spacing = 1.0
+        self._background = QColor(Qt.transparent)
+
+    def _render_tile(self, col: int, row: int, dpr: float) -> QPixmap:
+        """タイル (col, row) を描画（拡大後の座標で spacing px 毎に線を引く）"""
+        size = self.tile_px
+        spacing = self._spacing
+        pixmap = self._new_pixmap(dpr)
+        painter = QPainter(pixmap)
+        # 背景色ごと焼き込んでおけば、背景の塗りつぶしを省ける
+        painter.fillRect(0, 0, size, size, self._background)
+        painter.setPen(self._pen)
+        origin_x = col * size
+        origin_y = row * size
+        # 隣のタイルと線の位置が揃うよう、拡大後の座標を丸めてからタイル内の位置にする
+        k = math.ceil(origin_x / spacing)
+        while (x := round(k * spacing) - origin_x) < size:
+            painter.drawLine(x, 0, x, size)
+            k += 1
+        k = math.ceil(origin_y / spacing)
+        while (y := round(k * spacing) - origin_y) < size:
+            painter.drawLine(0, y, size, y)
+            k += 1
+        painter.end()
+        return pixmap
+
+    @staticmethod
+    def covers_background(background: QBrush) -> bool:
+        """タイルが背景色ごと描画されるか（True なら背景の塗りつぶしは不要）"""
+        return background.style() == Qt.SolidPattern and background.color().alpha() == 255
+
+    def draw(self, painter: QPainter, rect: QRectF, scale: float, step: float, background: QBrush) -> None:
+        """シーン上の rect にかかるタイルを等倍で描画（painter は拡大縮小+平行移動のみの変換）"""
+        # 単色でない背景の上には透明なタイルを重ねる
+        self._background = background.color() if self.covers_background(background) else QColor(Qt.transparent)
+        self._spacing = step * scale
+        self._blit(painter, rect, (scale, step, self._background.rgba()))
+
+
+class GridLabelOverlay:
+    """グリッドの座標ラベル（表示範囲の上端・左端に固定）を文字列毎の画像にキャッシュして描画する"""
+    # 保持するラベル文字列の上限（超えたら作り直す）
+    MAX_TEXTS = 4096
+
+    def __init__(self) -> None:
+        """初期化処理"""
+        self._texts: dict[str, QPixmap] = {}
+        self._key: tuple | None = None
+        self._font = QFont()
+        self._ascent = 0.0
+        self._color = QColor(150, 150, 150)  # 座標テキスト
+
+    def _text_pixmap(self, text: str, dpr: float) -> QPixmap:
+        """ラベルの画像を取得（文字の描画は初回のみ）"""
+        pixmap = self._texts.get(text)
+        if pixmap is None:
+            if len(self._texts) >= self.MAX_TEXTS:
+                self._texts.clear()
+            metrics = QFontMetricsF(self._font)
+            width = math.ceil(metrics.horizontalAdvance(text)) + 2
+            height = math.ceil(metrics.height()) + 1
+            pixmap = QPixmap(math.ceil(width * dpr), math.ceil(height * dpr))
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setFont(self._font)
+            painter.setPen(self._color)
+            painter.drawText(QPointF(0, self._ascent), text)
+            painter.end()
+            self._texts[text] = pixmap
+        return pixmap
+
+    def draw(self, painter: QPainter, rect: QRectF, visible_rect: QRectF, step: float) -> None:
+        """rect 内のグリッド線の座標を visible_rect の上端・左端に描画"""
+        font = QFont(painter.font())
+        font.setPointSizeF(10)
+        dpr = painter.device().devicePixelRatioF()
+        key = (font.key(), dpr)
+        if key != self._key:
+            self._key = key
+            self._font = font
+            self._ascent = QFontMetricsF(font).ascent()
+            self._texts.clear()
+        transform = painter.worldTransform()
+        top_left = transform.map(visible_rect.topLeft())
+        painter.save()
+        painter.resetTransform()
+        x = math.floor(rect.left() / step) * step
+        while x < rect.right():
+            device_x = transform.map(QPointF(x, 0)).x()
+            painter.drawPixmap(QPointF(device_x + 5, top_left.y() + 15 - self._ascent), self._text_pixmap(str(int(x)), dpr))
+            x += step
+        y = math.floor(rect.top() / step) * step
+        while y < rect.bottom():
+            device_y = transform.map(QPointF(0, y)).y()
+            painter.drawPixmap(QPointF(top_left.x() + 5, device_y - 2 - self._ascent), self._text_pixmap(str(int(y)), dpr))
+            y += step
+        painter.restore()
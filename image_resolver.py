@@ -0,0 +1,87 @@
+import os
+
+import constants
+
+
+class ImageResolver:
+    """機材画像パスの解決結果をキャッシュする（未発見の画像はまとめて報告する）"""
+    def __init__(self, data_dir: str, images_dir: str) -> None:
+        """初期化処理"""
+        self.data_dir = data_dir
+        self.images_dir = images_dir
+        self._resolved: dict[str, str | None] = {}
+        self._missing: dict[str, None] = {}
+        self._listing: frozenset[str] | None = None
+        self._listing_stamp: int | None = None
+
+    def _images_dir_stamp(self) -> int | None:
+        """画像フォルダの更新時刻（ファイルの追加・削除で変わる）"""
+        try:
+            return os.stat(self.images_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def _images_listing(self) -> frozenset[str]:
+        """画像フォルダ直下のファイル名一覧（スナップショット）"""
+        if self._listing is None:
+            self._listing_stamp = self._images_dir_stamp()
+            try:
+                self._listing = frozenset(os.listdir(self.images_dir))
+            except OSError:
+                self._listing = frozenset()
+        return self._listing
+
+    def check_directory(self) -> bool:
+        """画像フォルダが前回のスナップショットから変わっていればキャッシュを破棄する"""
+        if self._listing is not None and self._images_dir_stamp() != self._listing_stamp:
+            self.invalidate()
+            return True
+        return False
+
+    def invalidate(self) -> None:
+        """キャッシュを全て破棄（ライブラリ編集時など）"""
+        self._resolved.clear()
+        self._listing = None
+        self._listing_stamp = None
+
+    def find(self, image_path: str) -> str | None:
+        """画像パスを実在するパスに解決する（見つからなければ None）"""
+        if image_path in self._resolved:
+            return self._resolved[image_path]
+        resolved = self._resolve_uncached(image_path)
+        self._resolved[image_path] = resolved
+        return resolved
+
+    def resolve(self, image_path: str) -> str:
+        """画像パスを解決する（見つからなければ未発見として記録し、元のパスを返す）"""
+        resolved = self.find(image_path)
+        if resolved is None:
+            self._missing[image_path] = None
+            return image_path
+        return resolved
+
+    def _resolve_uncached(self, image_path: str) -> str | None:
+        """1. そのまま 2. DATA_DIR 基準 3. IMAGES_DIR 直下のファイル名 の順で探す"""
+        if not image_path:
+            return None
+        if os.path.exists(image_path):
+            return image_path
+        # 例: "images/foo.png" -> "data/images/foo.png"
+        alt_path = os.path.join(self.data_dir, image_path)
+        if os.path.exists(alt_path):
+            return alt_path
+        # ファイル名のみの場合などは一覧のスナップショットで判定 (stat しない)
+        name_only = os.path.basename(image_path)
+        if name_only in self._images_listing():
+            return os.path.join(self.images_dir, name_only)
+        return None
+
+    def take_missing(self) -> list[str]:
+        """前回の取得以降に見つからなかった画像パスを返し、リストを空にする"""
+        missing = list(self._missing)
+        self._missing.clear()
+        return missing
+
+
+# アプリ全体で共有するリゾルバ
+IMAGE_RESOLVER = ImageResolver(constants.DATA_DIR, constants.IMAGES_DIR)
@@ -1,5 +1,5 @@
-import os
 import uuid
+import zlib
 from PySide6.QtWidgets import (
     QGraphicsObject, QGraphicsPixmapItem, QGraphicsSimpleTextItem,
     QGraphicsItem, QGraphicsPathItem, QGraphicsRectItem, QWidget,
@@ -15,16 +15,86 @@ from PySide6.QtGui import (
 
 # 自作モジュールのインポート
 import constants
+from pixmap_cache import PIXMAP_CACHE
+from image_resolver import IMAGE_RESOLVER
+from static_layer import drawn_by_static_layer
+from library import DEFAULT_DMX_MODE, DmxMode, build_mode_table
 # コマンドは循環参照回避のためメソッド内でインポート推奨
 
+# 表示倍率に応じた機材の詳細度（値が大きいほど詳細）
+LOD_BOX = 0        # 種類毎の色の矩形のみ（ラベルなし）
+LOD_THUMBNAIL = 1  # 縮小画像とアドレスのみ
+LOD_FULL = 2       # 通常描画
+
+
+def lod_tier(painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None) -> int:
+    """描画先ビューのしきい値から詳細度を求める（出力・印刷などビュー以外への描画は常に通常描画）"""
+    view = widget.parentWidget() if widget is not None else None
+    thresholds = getattr(view, "lod_thresholds", None)
+    if thresholds is None:
+        return LOD_FULL
+    lod = option.levelOfDetailFromTransform(painter.worldTransform())
+    full_min, thumbnail_min = thresholds
+    if lod >= full_min:
+        return LOD_FULL
+    return LOD_THUMBNAIL if lod >= thumbnail_min else LOD_BOX
+
+
+class EquipmentPixmapItem(QGraphicsPixmapItem):
+    """機材画像。縮小表示時は詳細度に応じて縮小画像か単色の矩形で描画する"""
+    # 種類毎の色（縮小画像は PIXMAP_CACHE で共有する）
+    _type_colors: dict[str, QColor] = {}
+
+    def __init__(self, owner: "EquipmentItem") -> None:
+        """初期化処理"""
+        super().__init__(parent=owner)
+        self._owner = owner
+        self._image_path: str | None = None
+        self._width = 0
+
+    def set_image(self, path: str, width: int) -> None:
+        """画像を指定幅で設定（同じ画像・幅の機材は縮小済み画像を共有する）"""
+        self._image_path = path
+        self._width = int(width)
+        self.setPixmap(PIXMAP_CACHE.scaled_to_width(path, width))
+
+    def _thumbnail(self) -> QPixmap:
+        """縮小画像を取得（PIXMAP_CACHE の LRU で同じ画像を使う機材と共有）"""
+        return PIXMAP_CACHE.scaled_to_width(self._image_path, min(self._width, constants.LOD_THUMBNAIL_PX))
+
+    @classmethod
+    def type_color(cls, type_id: str) -> QColor:
+        """機材の種類毎に決まる色（種類 ID から色相を決める）"""
+        color = cls._type_colors.get(type_id)
+        if color is None:
+            color = QColor.fromHsv(zlib.crc32(type_id.encode("utf-8")) % 360, 140, 220)
+            cls._type_colors[type_id] = color
+        return color
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None) -> None:
+        """詳細度に応じて画像を描画（親とは別にキャッシュされるため自分の変換から詳細度を求める）"""
+        tier = lod_tier(painter, option, widget)
+        if tier == LOD_FULL or self.pixmap().isNull() or self._image_path is None:
+            super().paint(painter, option, widget)
+        elif tier == LOD_THUMBNAIL:
+            thumbnail = self._thumbnail()
+            painter.drawPixmap(self.boundingRect(), thumbnail, QRectF(thumbnail.rect()))
+        else:
+            painter.fillRect(self.boundingRect(), self.type_color(self._owner.type_id))
+
 
 class EquipmentItem(QGraphicsObject):
     """機材アイテム（ドラッグ・配線・DMX情報などを持つ）"""
-    def __init__(self, type_info: dict, channel: int | None = None, dmx_data: dict | None = None) -> None:
-        """機材アイテムの初期化"""
+    def __init__(self, type_info: dict, channel: int | None = None, dmx_data: dict | None = None,
+                 mode_table: dict[str, DmxMode] | None = None) -> None:
+        """機材アイテムの初期化（mode_table はライブラリの DMX モードの表。省略時は type_info から作る）"""
         super().__init__()
         self.setData(0, type_info)  # 機材情報を格納
+        self._mode_table = mode_table if mode_table is not None else build_mode_table(type_info)
+        self._dmx_mode: DmxMode | None = None  # 現在のモードのキャッシュ（モード・機材情報の変更で破棄）
+        self._dmx_mode_name = ""
         self._is_highlighted = False  # 配線時のハイライト用
+        self._bounds: QRectF | None = None  # 外接矩形のキャッシュ（子アイテムの形状変更で破棄）
         # 基本プロパティ
         self.selection_mode = None  # 選択モード
         self.type_id = type_info["id"]
@@ -34,6 +104,7 @@ class EquipmentItem(QGraphicsObject):
         self.has_power = type_info.get("has_power", type_info.get("can_be_wired", False))
         self.has_dmx = type_info.get("has_dmx", type_info.get("can_be_wired", False))
         self.can_be_wired = self.has_power or self.has_dmx
+        self.attached_wires = set()  # この機材に接続されている配線 (LayoutSceneが登録/解除)
         
         # --- DMX情報の保持 ---
         if dmx_data:
@@ -50,45 +121,34 @@ class EquipmentItem(QGraphicsObject):
         # 表示サイズ
         self.target_width = type_info.get("default_width", 50)
         self.snap_points_data = type_info.get("snap_points", [])
+        self._scene_snap_points = None  # スナップ点のシーン座標キャッシュ（移動・回転で破棄）
         
-        # --- 画像パスの解決ロジック ---
-        img_path = type_info["image_path"]
-        
-        # 1. そのままのパスで存在するか確認
-        if not os.path.exists(img_path):
-            # 2. 存在しない場合、DATA_DIR 内を探す (例: "images/foo.png" -> "data/images/foo.png")
-            alt_path = os.path.join(constants.DATA_DIR, img_path)
-            if os.path.exists(alt_path):
-                img_path = alt_path
-            # 3. それでもなければ、data/images 直下を探す (ファイル名のみの場合など)
-            else:
-                name_only = os.path.basename(img_path)
-                alt_path_2 = os.path.join(constants.IMAGES_DIR, name_only)
-                if os.path.exists(alt_path_2):
-                    img_path = alt_path_2
+        # --- 画像パスの解決 (結果はキャッシュされる) ---
+        img_path = IMAGE_RESOLVER.resolve(type_info["image_path"])
         
         # --- 子アイテム作成 (画像) ---
-        self.image = QGraphicsPixmapItem(parent=self)
-        pixmap = QPixmap(img_path)
-        original_width = pixmap.width()
+        self.image = EquipmentPixmapItem(self)
+        original_width = PIXMAP_CACHE.source_size(img_path).width()
         self.scale_ratio = 1.0
         if original_width > 0:
             self.scale_ratio = self.target_width / original_width
-        self.image.setPixmap(pixmap.scaledToWidth(self.target_width, Qt.SmoothTransformation))
+        # 同じ画像・幅の機材は縮小済み画像を共有する
+        self.image.set_image(img_path, self.target_width)
         image_rect = self.image.boundingRect()
         self.image.setTransformOriginPoint(image_rect.center())
         
         # --- 子アイテム作成 (テキスト) ---
         self.text = DraggableTextItem(self.name, parent=self)
         self.text.setBrush(QColor("white"))
-        self.text.setFlags(QGraphicsItem.ItemIsMovable)
+        self.text.setFlags(QGraphicsItem.ItemIsMovable | QGraphicsItem.ItemSendsGeometryChanges)
         text_rect = self.text.boundingRect()
         self.text.setPos((image_rect.width() - text_rect.width()) / 2, image_rect.height())
         
         # --- 子アイテム作成 (チャンネル表示) ---
         self.channel_text = DraggableTextItem("", parent=self)
         self.channel_text.setBrush(QColor("cyan"))
-        self.channel_text.setFlags(QGraphicsItem.ItemIsMovable)
+        self.channel_text.setFlags(QGraphicsItem.ItemIsMovable | QGraphicsItem.ItemSendsGeometryChanges)
+        self.channel_text.min_lod = LOD_THUMBNAIL  # アドレスは縮小画像の段階でも表示
         channel_rect = self.channel_text.boundingRect()
         self.channel_text.setPos(0, -channel_rect.height())
         
@@ -107,10 +167,12 @@ class EquipmentItem(QGraphicsObject):
     
     # この機材が持つスナップポイントの現在のシーン座標リストを返すメソッド
     def get_scene_snap_points(self) -> list[QPointF]:
-        """スナップ点のシーン座標リストを取得"""
-        points = []
-        if not self.scene(): return points
+        """スナップ点のシーン座標リストを取得（キャッシュ済みならそれを返す）"""
+        if not self.scene(): return []
+        if self._scene_snap_points is not None:
+            return self._scene_snap_points
         
+        points = []
         # 画像の中心（ここを基準にローカル座標が定義されているため）
         img_rect = self.image.boundingRect()
         center = img_rect.center()
@@ -127,11 +189,26 @@ class EquipmentItem(QGraphicsObject):
             # それをシーン座標系に変換 (回転や移動が反映される)
             scene_pos = self.mapToScene(item_local_pos)
             points.append(scene_pos)
-            
+        
+        self._scene_snap_points = points
         return points
     
+    def refresh_snap_points(self) -> None:
+        """スナップ点キャッシュを破棄し、シーンの空間インデックスを更新"""
+        self._scene_snap_points = None
+        scene = self.scene()
+        if scene is not None and hasattr(scene, "snap_index"):
+            # スナップ点が無くなった場合は空リストでインデックスから外れる
+            scene.snap_index.insert(self, self.get_scene_snap_points())
+    
+    def update_attached_wires(self) -> None:
+        """この機材に接続されている配線だけを再描画"""
+        for wire in self.attached_wires:
+            wire.update_path()
+    
     def updateDmxText(self) -> None:
         """DMX情報をテキストに反映"""
+        self.update_bounds()  # 文字数が変わると外接矩形も変わる
         if self.has_dmx:
             # 表示形式: U1-001 (ユニバース-アドレス)
             disp_text = f"{self.dmx_universe}-{self.dmx_address}"
@@ -139,6 +216,36 @@ class EquipmentItem(QGraphicsObject):
         else:
             self.channel_text.setText("")
     
+    @property
+    def dmx_mode_name(self) -> str:
+        """DMX モード名"""
+        return self._dmx_mode_name
+    
+    @dmx_mode_name.setter
+    def dmx_mode_name(self, mode_name: str) -> None:
+        """DMX モード名を設定（変わった時だけモードのキャッシュを破棄）"""
+        if mode_name != self._dmx_mode_name:
+            self._dmx_mode_name = mode_name
+            self._dmx_mode = None
+    
+    @property
+    def dmx_mode(self) -> DmxMode:
+        """現在の DMX モード（見つからなければ 1ch）"""
+        if self._dmx_mode is None:
+            self._dmx_mode = self._mode_table.get(self._dmx_mode_name, DEFAULT_DMX_MODE)
+        return self._dmx_mode
+    
+    @property
+    def dmx_channels(self) -> int:
+        """現在の DMX モードのチャンネル数"""
+        return self.dmx_mode.channels
+    
+    def set_type_info(self, type_info: dict, mode_table: dict[str, DmxMode] | None = None) -> None:
+        """機材情報を差し替える（ライブラリの更新時。DMX モードのキャッシュも破棄）"""
+        self.setData(0, type_info)
+        self._mode_table = mode_table if mode_table is not None else build_mode_table(type_info)
+        self._dmx_mode = None
+    
     def setDmxData(self, universe: int, address: int, mode_name: str) -> None:
         """DMXデータを設定"""
         self.dmx_universe = universe
@@ -163,8 +270,13 @@ class EquipmentItem(QGraphicsObject):
     
     def itemChange(self, change: QGraphicsItem.GraphicsItemChange, value: object) -> object:
         """アイテムの状態変化時の処理"""
+        # 一括読み込み中はスナップ・配線更新などの副作用を行わない
+        scene = self.scene()
+        if hasattr(scene, "is_bulk_loading") and scene.is_bulk_loading():
+            return super().itemChange(change, value)
+        
         # === 位置が変わる時の処理 (スナップロジック) ===
-        if change == QGraphicsItem.ItemPositionChange and self.scene():
+        if change == QGraphicsItem.ItemPositionChange and scene:
             new_pos = value # これから移動しようとしている左上の座標
             
             # 画像の中心オフセットを取得
@@ -179,23 +291,17 @@ class EquipmentItem(QGraphicsObject):
             snap_target_pos = None
             
             # 1. 他の機材のスナップポイントへの吸着 (優先度高)
-            # 自分以外の全てのアイテムをチェック
-            items = self.scene().items()
-            for item in items:
-                if isinstance(item, EquipmentItem) and item != self:
-                    # 相手がスナップポイントを持っているか確認
-                    target_points = item.get_scene_snap_points()
-                    for pt in target_points:
-                        # 自分の中心と、相手のポイントとの距離を測る
-                        dist = QLineF(current_center_scene, pt).length()
-                        if dist < SNAP_THRESHOLD:
-                            # 吸着！
-                            # 自分の「中心」を相手のポイント(pt)に合わせる
-                            # そのための「左上座標(new_pos)」を逆算する
-                            snap_target_pos = pt - center_offset
-                            snapped = True
-                            break
-                if snapped: break
+            # 空間インデックスで近傍セルだけを調べ、自分以外で最も近い点を探す
+            # (一緒にドラッグ中の機材は位置が古いため対象外)
+            if hasattr(scene, "snap_index"):
+                exclude = {self}
+                if scene.is_dragging():
+                    exclude |= scene.drag_items()
+                found = scene.snap_index.nearest(current_center_scene, SNAP_THRESHOLD, exclude=exclude)
+                if found:
+                    # 自分の「中心」を相手のポイントに合わせるための「左上座標(new_pos)」を逆算する
+                    snap_target_pos = found[1] - center_offset
+                    snapped = True
             
             # スナップした場合はその位置を返す (グリッド処理はスキップ)
             if snapped:
@@ -222,19 +328,18 @@ class EquipmentItem(QGraphicsObject):
                 self.selection_mode = None
         
         if change == QGraphicsItem.ItemPositionHasChanged:
-            view = self.scene().views()[0] if self.scene() and self.scene().views() else None
-            if view and hasattr(view, '_redraw_all_wires'):
-                view._redraw_all_wires()
-            # シーン範囲の拡張処理
-            if self.scene():
-                current_rect = self.scene().sceneRect()
-                my_pos = self.pos()
-                trigger_margin = 5000 
-                safe_rect = current_rect.adjusted(trigger_margin, trigger_margin, -trigger_margin, -trigger_margin)
-                if not safe_rect.contains(my_pos):
-                    item_rect = QRectF(my_pos.x(), my_pos.y(), 1, 1)
-                    new_rect = current_rect.united(item_rect).adjusted(-1000, -1000, 1000, 1000)
-                    self.scene().setSceneRect(new_rect)
+            if hasattr(scene, "defer_drag_update") and scene.is_dragging():
+                # ドラッグ中は以下の更新をシーンに保留し、フレーム単位でまとめて反映
+                scene.defer_drag_update(self)
+            else:
+                # 接続されている配線のみ経路を更新
+                self.update_attached_wires()
+                # スナップ点の位置が変わるのでキャッシュとインデックスを更新
+                if self.snap_points_data:
+                    self.refresh_snap_points()
+                # シーン範囲の拡張処理
+                if hasattr(scene, "grow_scene_rect"):
+                    scene.grow_scene_rect([self.pos()])
                     
         return super().itemChange(change, value)
     
@@ -260,10 +365,16 @@ class EquipmentItem(QGraphicsObject):
         for item in self.scene().selectedItems():
             if isinstance(item, EquipmentItem):
                 self._group_start_positions[item] = item.pos()
+        # ドラッグトランザクション開始
+        if hasattr(self.scene(), "begin_drag"):
+            self.scene().begin_drag(self._group_start_positions)
     
     def mouseReleaseEvent(self, event: QGraphicsSceneMouseEvent) -> None:
         """マウスリリースイベント処理"""
         super().mouseReleaseEvent(event)
+        # ドラッグトランザクション終了（保留していた更新を反映）
+        if hasattr(self.scene(), "end_drag"):
+            self.scene().end_drag()
         from commands import CommandMoveItems
         items_to_move = []
         for item, start_pos in self._group_start_positions.items():
@@ -286,16 +397,17 @@ class EquipmentItem(QGraphicsObject):
     
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None) -> None:
         """アイテムの描画処理"""
-        my_option = QStyleOptionGraphicsItem(option)
-        my_option.state &= ~QStyle.State_Selected
-        
+        tier = lod_tier(painter, option, widget)
         if option.state & QStyle.State_Selected:
             # モードに応じたハイライト描画
             if self.selection_mode == 'whole':
                 pen = QPen(QColor("cyan")); pen.setWidth(2); painter.setPen(pen)
                 painter.drawRect(self.image.boundingRect().translated(self.image.pos()))
-                painter.drawRect(self.text.boundingRect().translated(self.text.pos()))
-                painter.drawRect(self.channel_text.boundingRect().translated(self.channel_text.pos()))
+                # 描画されないラベルの枠は描かない
+                if tier >= self.text.min_lod:
+                    painter.drawRect(self.text.boundingRect().translated(self.text.pos()))
+                if tier >= self.channel_text.min_lod:
+                    painter.drawRect(self.channel_text.boundingRect().translated(self.channel_text.pos()))
             
             elif self.selection_mode == 'name_text':
                 pen = QPen(QColor("yellow")); pen.setWidth(2); painter.setPen(pen)
@@ -312,12 +424,28 @@ class EquipmentItem(QGraphicsObject):
             painter.drawRect(self.image.boundingRect().translated(self.image.pos()))
     
     def boundingRect(self) -> QRectF:
-        """アイテムの外接矩形を返す"""
-        return self.childrenBoundingRect()
+        """アイテムの外接矩形を返す（子アイテム・当たり判定・選択枠の線幅を含む）"""
+        if self._bounds is None:
+            margin = 2  # 選択枠・配線ハイライトの線幅の半分
+            self._bounds = self.childrenBoundingRect().united(self.shape().boundingRect()).adjusted(-margin, -margin, margin, margin)
+        return self._bounds
+    
+    def update_bounds(self) -> None:
+        """子アイテム（画像・ラベル）の形状や位置を変える前に呼び、外接矩形を作り直させる"""
+        self.prepareGeometryChange()
+        self._bounds = None
+    
+    def set_cache_mode(self, mode: QGraphicsItem.CacheMode) -> None:
+        """本体と子アイテムのキャッシュモードを設定"""
+        for item in (self, self.image, self.text, self.channel_text):
+            item.setCacheMode(mode)
     
     def setRotation(self, angle: float) -> None:
         """画像の回転角度を設定する"""
+        self.update_bounds()
         self.image.setRotation(angle)
+        if self.snap_points_data:
+            self.refresh_snap_points()
     
     def rotation(self) -> float:
         """画像の回転角度を取得する"""
@@ -325,10 +453,12 @@ class EquipmentItem(QGraphicsObject):
     
     def setTextVisible(self, visible: bool) -> None:
         """テキストの表示・非表示を設定する"""
+        self.update_bounds()
         self.text.setVisible(visible)
     
     def setChannelVisible(self, visible: bool) -> None:
         """チャンネルテキストの表示・非表示を設定する"""
+        self.update_bounds()
         self.channel_text.setVisible(visible)
     
     def getTextColor(self) -> QColor:
@@ -353,8 +483,17 @@ class EquipmentItem(QGraphicsObject):
             color = QColor(color)
         self.channel_text.setBrush(color)
 
+class OutletLabelItem(QGraphicsSimpleTextItem):
+    """コンセントの回路名ラベル"""
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None) -> None:
+        """静的レイヤーが描画するビューでは描画しない"""
+        if drawn_by_static_layer(self, widget):
+            return
+        super().paint(painter, option, widget)
+
 class OutletItem(QGraphicsObject):
     """コンセント（電源）アイテム。配線可能・回路情報を持つ"""
+    static_layer = True  # 会場の静的レイヤーに描画する
     def __init__(self, info: dict, uid: str | None = None) -> None:
         """OutletItemの初期化"""
         super().__init__()
@@ -362,23 +501,26 @@ class OutletItem(QGraphicsObject):
         self.instance_id = uid if uid else f"outlet_{uuid.uuid4().hex[:8]}"
         self.name = f"Outlet {info.get('circuit_id', '?')}"
         self.can_be_wired = True  # 配線可能
+        self.attached_wires = set()  # このコンセントに接続されている配線
         self.setPos(info.get("x", 0), info.get("y", 0))
         self.setZValue(constants.Z_VAL_OUTLET)
         self.setFlags(QGraphicsItem.ItemIsSelectable)  # 移動不可
         # ツールチップ表示
         self.setToolTip(f"回路: {info.get('circuit_id')}\nタップ容量: {info.get('tap_capacity')}W\n回路容量: {info.get('circuit_capacity')}W")
         # テキストアイテム作成
-        self.text_item = QGraphicsSimpleTextItem(self.info.get("circuit_id", ""), self)
+        self.text_item = OutletLabelItem(self.info.get("circuit_id", ""), self)
         text_color_name = self.info.get("text_color", "black")
         self.text_item.setBrush(QColor(text_color_name))
         self.update_text_pos()
     
     def boundingRect(self) -> QRectF:
-        """アイテムの外接矩形を返す"""
-        return QRectF(-10, -10, 20, 20)
+        """アイテムの外接矩形を返す（選択時の枠線の太さ分を含む）"""
+        return QRectF(-11, -11, 22, 22)
     
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None) -> None:
         """アイテムの描画処理"""
+        if drawn_by_static_layer(self, widget):
+            return
         # 本体
         color = QColor(self.info.get("color", "#FFA500"))
         painter.setBrush(color)
@@ -398,6 +540,11 @@ class OutletItem(QGraphicsObject):
         path.addRect(-10, -10, 20, 20)
         return path
     
+    def set_cache_mode(self, mode: QGraphicsItem.CacheMode) -> None:
+        """本体とラベルのキャッシュモードを設定"""
+        self.setCacheMode(mode)
+        self.text_item.setCacheMode(mode)
+    
     def update_text_pos(self) -> None:
         """テキストの位置と内容を更新"""
         text = self.info.get("circuit_id", "")
@@ -411,6 +558,18 @@ class OutletItem(QGraphicsObject):
         # 中央揃え（アイテムの上部に配置）
         r = self.text_item.boundingRect()
         self.text_item.setPos(-r.width() / 2, -22)
+        self._static_layer_changed()
+    
+    def _static_layer_changed(self) -> None:
+        """見た目が変わったことをシーンの静的レイヤーに伝える"""
+        scene = self.scene()
+        if scene is not None and hasattr(scene, "invalidate_static_layer"):
+            scene.invalidate_static_layer()
+    
+    def update_attached_wires(self) -> None:
+        """このコンセントに接続されている配線だけを再描画"""
+        for wire in self.attached_wires:
+            wire.update_path()
     
     def setWiringHighlight(self, highlighted: bool) -> None:
         """配線ハイライトの更新（ダミー）"""
@@ -427,6 +586,7 @@ class OutletItem(QGraphicsObject):
         self.text_item.setBrush(color)
         # 情報を更新しておく（保存用）
         self.info["text_color"] = color.name()
+        self._static_layer_changed()
 
 class DraggableTextItem(QGraphicsSimpleTextItem):
     """ドラッグ可能なテキストアイテム（機材名やチャンネル表示用）"""
@@ -434,13 +594,21 @@ class DraggableTextItem(QGraphicsSimpleTextItem):
         """初期化処理"""
         super().__init__(text, parent)
         self._old_pos = None
+        # 機材のラベルは詳細度が min_lod より粗いときは描画しない
+        self._equipment = parent if isinstance(parent, EquipmentItem) else None
+        self.min_lod = LOD_FULL
+    
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None) -> None:
+        """縮小表示で読めない大きさのときは描画しない（詳細度は自分の変換から求める）"""
+        if self._equipment is not None and lod_tier(painter, option, widget) < self.min_lod:
+            return
+        super().paint(painter, option, widget)
     
     def itemChange(self, change: QGraphicsItem.GraphicsItemChange, value: object) -> object:
         """アイテムの状態変化時の処理"""
-        # 位置変更時の処理（現状は未使用）
-        if change == QGraphicsItem.ItemPositionHasChanged:
-            if self.parentItem() and self.parentItem().scene():
-                pass
+        # 機材のラベルが動くと機材の外接矩形も変わる
+        if change == QGraphicsItem.ItemPositionChange and self._equipment is not None:
+            self._equipment.update_bounds()
         return super().itemChange(change, value)
     
     def mousePressEvent(self, event: QGraphicsSceneMouseEvent) -> None:
@@ -484,15 +652,22 @@ class DraggableTextItem(QGraphicsSimpleTextItem):
             parent.setFlag(QGraphicsItem.ItemIsMovable, True)
         super().mouseReleaseEvent(event)
 
+def wire_anchor(item: QGraphicsItem) -> QPointF:
+    """配線が接続される点（機材は画像の中心、コンセントは原点）"""
+    if isinstance(item, EquipmentItem):
+        return item.pos() + item.image.boundingRect().center()
+    return item.pos()  # OutletItem は (0,0) 中心で作られているため pos() でよい
+
 class WiringItem(QGraphicsPathItem):
     """配線アイテム（DMX/電源線）。当たり判定や色分け対応"""
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None) -> None:
         """配線アイテムの描画処理"""
         super().paint(painter, option, widget)
     
-    def __init__(self, start_item: QGraphicsItem, end_item: QGraphicsItem, middle_points: list[QPointF] = [], wire_type: str = "dmx") -> None:
+    def __init__(self, start_item: QGraphicsItem, end_item: QGraphicsItem, middle_points: list[QPointF] = [], wire_type: str = "dmx", instance_id: str | None = None) -> None:
         """配線アイテムの初期化"""
         super().__init__()
+        self.instance_id = instance_id if instance_id else f"wire_{uuid.uuid4().hex[:8]}"
         self.start_item = start_item
         self.end_item = end_item
         self.middle_points = middle_points
@@ -500,6 +675,7 @@ class WiringItem(QGraphicsPathItem):
         # 当たり判定幅
         self.delete_stroke_width = 1.0  # 削除用
         self.guard_stroke_width = 1.0   # 通常用
+        self._shapes: dict[float, QPainterPath] = {}  # 当たり判定幅 → 形状（経路の変更で破棄）
         # 線の色・スタイルをタイプで分岐
         if self.wire_type == "power":
             pen = QPen(QColor("red"), 2)
@@ -523,6 +699,18 @@ class WiringItem(QGraphicsPathItem):
         self.setZValue(constants.Z_VAL_WIRE)  # 線は機材より背面
         self.update_path()
     
+    def _attach(self) -> None:
+        """両端アイテムに自身を登録（LayoutScene への追加時に呼ばれる）"""
+        for end in (self.start_item, self.end_item):
+            if end is not None and hasattr(end, "attached_wires"):
+                end.attached_wires.add(self)
+    
+    def _detach(self) -> None:
+        """両端アイテムから自身を解除（LayoutScene からの削除時に呼ばれる）"""
+        for end in (self.start_item, self.end_item):
+            if end is not None and hasattr(end, "attached_wires"):
+                end.attached_wires.discard(self)
+    
     def update_path(self) -> None:
         """保持している情報に基づいて経路を再描画"""
         path = QPainterPath()
@@ -530,24 +718,15 @@ class WiringItem(QGraphicsPathItem):
             self.setPath(path)
             return
         
-        # コンセント(OutletItem)にはimage属性がないため分岐処理
-        if isinstance(self.start_item, EquipmentItem):
-            start_pos = self.start_item.pos() + self.start_item.image.boundingRect().center()
-        else: # OutletItem
-            start_pos = self.start_item.pos() # OutletItemは(0,0)中心で作られているためpos()でOK
-            # もしOutletItemのboundingRectの中心が(0,0)でない場合は以下を使用:
-            # start_pos = self.start_item.pos() + self.start_item.boundingRect().center()
-        
-        if isinstance(self.end_item, EquipmentItem):
-            end_pos = self.end_item.pos() + self.end_item.image.boundingRect().center()
-        else:
-            end_pos = self.end_item.pos()
+        start_pos = wire_anchor(self.start_item)
+        end_pos = wire_anchor(self.end_item)
         
         path.moveTo(start_pos)
         for point in self.middle_points:
             path.lineTo(point)
         path.lineTo(end_pos)
         self.setPath(path)
+        self._shapes.clear()
         
         self.wire_info = {
             "type": "wire",
@@ -558,28 +737,29 @@ class WiringItem(QGraphicsPathItem):
         }
     
     def shape(self) -> QPainterPath:
-        """View の現在のモードに応じて、当たり判定の幅を動的に変更する"""
-        path = self.path()
-        stroker = QPainterPathStroker()
-        
-        view = self.scene().views()[0] if self.scene() and self.scene().views() else None
-        
-        # デフォルトは「狭い」当たり判定 (wiring や wiring_delete 用)
-        current_stroke_width = self.delete_stroke_width
-        
-        if view and type(view).__name__ == "CustomGraphicsView":
-            # 「配置」モード (cursor) の時だけ、バグ防止のため当たり判定を「広く」する
-            if view._interaction_mode == "cursor":
-                current_stroke_width = self.guard_stroke_width
-        
-        stroker.setWidth(current_stroke_width)
-        stroker.setCapStyle(Qt.PenCapStyle.FlatCap)
-        stroker.setJoinStyle(Qt.PenJoinStyle.MiterJoin)
-        shape_path = stroker.createStroke(path)
+        """シーンの操作モードに応じた幅の当たり判定（幅毎にキャッシュ）"""
+        # 「配置」モード (cursor) の時だけ、バグ防止のため当たり判定を「広く」する
+        # それ以外 (wiring や wiring_delete 用) は「狭い」当たり判定
+        scene = self.scene()
+        if scene is not None and getattr(scene, "interaction_mode", None) == "cursor":
+            stroke_width = self.guard_stroke_width
+        else:
+            stroke_width = self.delete_stroke_width
+        
+        shape_path = self._shapes.get(stroke_width)
+        if shape_path is None:
+            stroker = QPainterPathStroker()
+            stroker.setWidth(stroke_width)
+            stroker.setCapStyle(Qt.PenCapStyle.FlatCap)
+            stroker.setJoinStyle(Qt.PenJoinStyle.MiterJoin)
+            shape_path = stroker.createStroke(self.path())
+            self._shapes[stroke_width] = shape_path
         return shape_path
 
 class VenueItem(QGraphicsPathItem):
     """会場の壁を表示するアイテム"""
+    static_layer = True  # 会場の静的レイヤーに描画する
+    
     def __init__(self, points_list: list[QPointF], parent: QGraphicsItem | None = None) -> None:
         """初期化処理"""
         super().__init__(parent)
@@ -593,21 +773,71 @@ class VenueItem(QGraphicsPathItem):
         
         self.setZValue(constants.Z_VAL_VENUE) # 最背面
         self.setData(0, {"type": "venue"})
+        # 部分描画用の区間 (外接矩形, パス)。静的レイヤーのタイルにかかる区間だけを描く
+        self._chunks: list[tuple[QRectF, QPainterPath]] = []
+        self._chunk_pen = QPen(pen)
         self._update_path()
     
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None) -> None:
+        """静的レイヤーが描画するビューでは描画しない（exposedRect が一部なら重なる区間だけ描画）"""
+        if drawn_by_static_layer(self, widget):
+            return
+        exposed = option.exposedRect
+        if exposed.contains(self.boundingRect()) or option.state & QStyle.State_Selected:
+            super().paint(painter, option, widget)
+            return
+        painter.setPen(self._chunk_pen)
+        painter.setBrush(Qt.NoBrush)
+        for rect, path in self._chunks:
+            if rect.intersects(exposed):
+                painter.drawPath(path)
+    
     def _update_path(self) -> None:
-        """壁のパスを更新する"""
+        """壁のパスと部分描画用の区間を更新する"""
         path = QPainterPath()
+        self._chunks = []
         for points in self.points_list:
             if not points: continue
             path.moveTo(points[0])
             for p in points[1:]:
                 path.lineTo(p)
             # 始点と終点が近ければ閉じる
-            if len(points) > 2:
-                if QLineF(points[0], points[-1]).length() < 10:
-                    path.closeSubpath()
+            closed = len(points) > 2 and QLineF(points[0], points[-1]).length() < 10
+            if closed:
+                path.closeSubpath()
+            self._add_chunks(points, closed)
         self.setPath(path)
+    
+    def _add_chunks(self, points: list[QPointF], closed: bool) -> None:
+        """壁を VENUE_PATH_CHUNK 線分毎の区間に分ける
+        
+        区間は前後に1線分ずつ重ね、角の結合を必ずどれかの区間が描くようにする。
+        区間の端は平らな端点で描き、本来の端点には元のペンの端点の形を延長で再現する。
+        """
+        pen = self.pen()
+        self._chunk_pen = QPen(pen)
+        self._chunk_pen.setCapStyle(Qt.FlatCap)
+        half = pen.widthF() / 2
+        if closed:
+            # 閉じた壁は始点の角も描けるよう 始点→2点目 まで回り込む
+            sequence = list(points) + [points[0], points[1]]
+        else:
+            sequence = list(points)
+            if pen.capStyle() == Qt.SquareCap and len(sequence) > 1:
+                for end, neighbor in ((0, 1), (-1, -2)):
+                    line = QLineF(sequence[neighbor], sequence[end])
+                    if line.length() > 0:
+                        line.setLength(line.length() + half)
+                        sequence[end] = line.p2()
+        margin = pen.widthF() * 2  # マイター結合の張り出し
+        count = len(sequence) - 1
+        for start in range(0, max(count, 1), constants.VENUE_PATH_CHUNK):
+            chunk = sequence[max(0, start - 1):min(count, start + constants.VENUE_PATH_CHUNK + 1) + 1]
+            chunk_path = QPainterPath(chunk[0])
+            for p in chunk[1:]:
+                chunk_path.lineTo(p)
+            rect = chunk_path.boundingRect().adjusted(-margin, -margin, margin, margin)
+            self._chunks.append((rect, chunk_path))
 
 class VenueOutletItem(QGraphicsRectItem):
     """会場エディタ上に表示されるコンセントアイテム"""
@@ -0,0 +1,255 @@
+"""差分保存用のジャーナル
+
+保存時は前回の保存から変わったレコードだけを <レイアウトファイル>.journal に
+1行1エントリ (JSON) で追記する。読み込み時はスナップショットにジャーナルを
+先頭から順に適用するため、結果は全体保存と同じ内容になる。
+ジャーナルが大きくなったら全体保存（スナップショット）にまとめて削除する。
+
+スナップショットとの対応はスナップショットのファイル内容のハッシュ (journal_id) で取るため、
+レイアウトファイルの形式には何も足さない。古いバージョンなどで書き直されたスナップショットには
+ジャーナルを適用しない。
+差分は LayoutScene.mark_dirty で記録されたアイテムだけから作るため、記録漏れに備えて保存の度に
+変更なしとされたアイテムの一部を実際のレコードと照合し、食い違えば全体保存に切り替える。
+"""
+import hashlib
+import json
+import os
+from collections.abc import Callable
+
+import constants
+
+JOURNAL_SUFFIX = ".journal"
+
+# レコードの一覧を instance_id で管理するセクション
+_RECORD_KEYS = ("equipment_items", "wires")
+# ジャーナルのエントリの中で対応するスナップショットを示す ID
+_ID_KEY = "journal_id"
+
+
+def journal_path(file_path: str) -> str:
+    """レイアウトファイルに対応するジャーナルのパス"""
+    return file_path + JOURNAL_SUFFIX
+
+
+def snapshot_id(file_path: str) -> str:
+    """スナップショットのファイル内容から求めるジャーナル ID"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _index_records(records: object) -> dict[str, dict] | None:
+    """レコードの一覧を instance_id → レコード に変換（ID の欠落・重複があれば None）"""
+    if type(records) is not list:
+        return None
+    indexed = {}
+    for record in records:
+        record_id = record.get("instance_id") if type(record) is dict else None
+        if type(record_id) is not str or record_id in indexed:
+            return None
+        indexed[record_id] = record
+    return indexed
+
+
+def _diff_records(baseline: dict[str, dict], items: list, dirty: set,
+                  make_record: Callable[[object], dict | None], verify: set = frozenset()) -> dict | None:
+    """前回の保存からの追加・変更・削除を求める（追記では順序を再現できなければ None）
+
+    verify のアイテムは変更なしとされていてもレコードを作って基準と照合し、食い違えば None。
+    """
+    current_ids = []
+    seen = set()
+    upsert = []
+    for item in items:
+        item_id = item.instance_id
+        if item_id in baseline and item not in dirty:
+            record = None  # 変更なし（レコードを作らない）
+            if item in verify and make_record(item) != baseline[item_id]:
+                print(f"変更の記録漏れを検出しました ({item_id})。全体保存に切り替えます。")
+                return None
+        else:
+            record = make_record(item)
+            if record is None:
+                continue  # 保存対象外（全体保存と同じ扱い）
+        if item_id in seen:
+            return None
+        seen.add(item_id)
+        current_ids.append(item_id)
+        if record is not None and record != baseline.get(item_id):
+            upsert.append(record)
+    # 適用後の順序は「残ったレコード（元の順）+ 新規レコード（追加順）」になる
+    expected = [record_id for record_id in baseline if record_id in seen]
+    expected.extend(record_id for record_id in current_ids if record_id not in baseline)
+    if expected != current_ids:
+        return None
+    changes = {}
+    deleted = [record_id for record_id in baseline if record_id not in seen]
+    if deleted:
+        changes["delete"] = deleted
+    if upsert:
+        changes["upsert"] = upsert
+    return changes
+
+
+class LayoutJournal:
+    """保存済みの内容（基準）を保持し、差分エントリの作成・追記・再生を行う"""
+    def __init__(self) -> None:
+        """初期化処理"""
+        self.clear()
+
+    def clear(self) -> None:
+        """基準を破棄する（次回は全体保存）"""
+        self.file_path: str | None = None
+        self.journal_id: str | None = None
+        self.entries = 0
+        self.journal_bytes = 0
+        self.snapshot_bytes = 0
+        self._key_order: list[str] = []
+        self._top: dict = {}
+        self._venue = None
+        self._records: dict[str, dict[str, dict]] | None = None
+        self._needs_snapshot = False
+        # 記録漏れの照合を次に始める位置（セクション毎に順に回す）
+        self._verify_offset: dict[str, int] = {}
+
+    def _start(self, file_path: str, layout_data: dict, journal_id: str, snapshot_bytes: int) -> bool:
+        """スナップショットの内容を基準にする（差分を取れない形式なら False）"""
+        self.clear()
+        self.file_path = file_path
+        self.snapshot_bytes = snapshot_bytes
+        records = {}
+        for key in _RECORD_KEYS:
+            indexed = _index_records(layout_data.get(key, []))
+            if indexed is None:
+                return False
+            records[key] = indexed
+        self.journal_id = journal_id
+        self._key_order = list(layout_data)
+        self._top = {k: v for k, v in layout_data.items() if k not in _RECORD_KEYS and k != "venue"}
+        self._venue = layout_data.get("venue")
+        self._records = records
+        return True
+
+    def _apply(self, entry: dict) -> None:
+        """エントリを基準に適用する"""
+        self._top.update(entry.get("header", {}))
+        if "venue" in entry:
+            self._venue = entry["venue"]
+        for key in _RECORD_KEYS:
+            changes = entry.get(key)
+            if not changes:
+                continue
+            records = self._records[key]
+            for record_id in changes.get("delete", []):
+                records.pop(record_id, None)
+            for record in changes.get("upsert", []):
+                records[record["instance_id"]] = record
+        self.entries += 1
+
+    def _compose(self) -> dict:
+        """基準からレイアウトデータを組み立てる（キー順はスナップショットと同じ）"""
+        parts = dict(self._top)
+        parts["venue"] = self._venue
+        for key in _RECORD_KEYS:
+            parts[key] = list(self._records[key].values())
+        return {key: parts[key] for key in self._key_order}
+
+    def open(self, file_path: str, layout_data: dict) -> dict:
+        """読み込んだスナップショットにジャーナルを適用した内容を返す"""
+        try:
+            snapshot_bytes = os.path.getsize(file_path)
+            journal_id = snapshot_id(file_path)
+        except OSError:
+            self.clear()
+            return layout_data
+        if not self._start(file_path, layout_data, journal_id, snapshot_bytes):
+            return layout_data
+        try:
+            with open(journal_path(file_path), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return layout_data
+        applied_bytes = 0
+        for line in data.splitlines(keepends=True):
+            # 書き込み途中で落ちた末尾の行や、古いスナップショットの行はそこで打ち切る
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if type(entry) is not dict or entry.get(_ID_KEY) != self.journal_id or entry.get("seq") != self.entries + 1:
+                break
+            try:
+                self._apply(entry)
+            except (KeyError, TypeError, AttributeError):
+                break
+            applied_bytes += len(line)
+        self.journal_bytes = applied_bytes
+        if applied_bytes != len(data):
+            # 続きの追記が読めなくならないよう、次回はスナップショットを書き直す
+            print(f"ジャーナルの {self.entries + 1} 件目以降を読み込めませんでした: {journal_path(file_path)}")
+            self._needs_snapshot = True
+        return self._compose() if self.entries else layout_data
+
+    def snapshot_saved(self, file_path: str, layout_data: dict) -> None:
+        """全体保存した内容を基準にし、古いジャーナルを削除する"""
+        self._start(file_path, layout_data, snapshot_id(file_path), os.path.getsize(file_path))
+        try:
+            os.remove(journal_path(file_path))
+        except FileNotFoundError:
+            pass
+
+    def can_append(self, file_path: str) -> bool:
+        """差分の追記で保存できるか（別名保存・ジャーナル肥大時は全体保存）"""
+        if self._records is None or file_path != self.file_path or self._needs_snapshot:
+            return False
+        if self.entries >= constants.JOURNAL_MAX_ENTRIES:
+            return False
+        return self.journal_bytes <= self.snapshot_bytes * constants.JOURNAL_COMPACT_RATIO
+
+    def build_entry(self, header: dict, venue: dict, equipment_items: list, wire_items: list, dirty: set,
+                    equipment_record: Callable, wire_record: Callable) -> dict | None:
+        """現在のシーンとの差分エントリを作る（追記では全体保存と同じ結果にならなければ None）"""
+        if list(header) != [k for k in self._key_order if k in self._top]:
+            return None
+        entry = {_ID_KEY: self.journal_id, "seq": self.entries + 1}
+        changed_header = {k: v for k, v in header.items() if self._top[k] != v}
+        if changed_header:
+            entry["header"] = changed_header
+        if venue != self._venue:
+            entry["venue"] = venue
+        for key, items, make_record in (("equipment_items", equipment_items, equipment_record),
+                                        ("wires", wire_items, wire_record)):
+            changes = _diff_records(self._records[key], items, dirty, make_record, self._verify_sample(key, items))
+            if changes is None:
+                return None
+            if changes:
+                entry[key] = changes
+        return entry
+
+    def _verify_sample(self, key: str, items: list) -> set:
+        """記録漏れを照合するアイテム（保存の度に JOURNAL_VERIFY_SAMPLE 件ずつ順に回す）"""
+        count = len(items)
+        size = min(constants.JOURNAL_VERIFY_SAMPLE, count)
+        start = self._verify_offset.get(key, 0) % count if count else 0
+        self._verify_offset[key] = start + size
+        return set(items[start:start + size]) | set(items[:max(0, start + size - count)])
+
+    def append(self, entry: dict) -> None:
+        """エントリをジャーナルに追記し、基準に適用する（変更がなければ何もしない）"""
+        if len(entry) <= 2:
+            return  # journal_id と seq のみ
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        try:
+            with open(journal_path(self.file_path), "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            self._needs_snapshot = True  # 途中まで書かれた可能性があるので次回は全体保存
+            raise
+        self._apply(entry)
+        self.journal_bytes += len(line)
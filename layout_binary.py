@@ -0,0 +1,465 @@
+"""バイナリ形式のレイアウトファイル (.olb)
+
+JSON 形式 (version 1.1) と同じ内容を、列ごとの配列・文字列テーブル・配線点の
+連結配列として保存する。形式に収まらないレコードは JSON のまま保持するため、
+JSON との相互変換で内容は失われない。
+
+使い方 (変換): python layout_binary.py 入力 出力   (拡張子 .olb / .json で判定)
+"""
+import gc
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from fileio import atomic_write, save_layout
+from journal import LayoutJournal
+
+MAGIC = b"OLB\x01"
+FORMAT_VERSION = 1
+BINARY_EXTENSION = ".olb"
+
+# ファイル先頭: マジック / ヘッダJSONの長さ
+_PREAMBLE = struct.Struct("<4sI")
+_ALIGN = 8
+_LITTLE = sys.byteorder == "little"
+
+# 機材レコードの標準形（キーの順序は _perform_save と同じ）
+_EQUIPMENT_KEYS = (
+    "instance_id", "type_id", "x", "y", "angle", "z_value",
+    "text_visible", "channel_visible", "text_color", "channel_text_color", "dmx_data"
+)
+_DMX_KEYS = ("universe", "address", "mode_name")
+_WIRE_KEYS = ("start_item_id", "end_item_id", "points", "wire_category")
+# 配線IDのない古い形式のレコードは文字列番号の代わりにこの値を入れる
+_NO_STRING = 0xFFFFFFFF
+_KNOWN_TOP_KEYS = ("version", "background_color", "venue", "equipment_items", "wires")
+
+# 機材の表示フラグ
+_FLAG_TEXT_VISIBLE = 1
+_FLAG_CHANNEL_VISIBLE = 2
+
+
+class LayoutFormatError(ValueError):
+    """バイナリレイアウトとして読めない場合の例外"""
+
+
+def _is_float(value: object) -> bool:
+    """JSON 上で float として書かれる値か"""
+    return type(value) is float
+
+
+def _is_int(value: object) -> bool:
+    """JSON 上で整数として書かれる値か (bool は除く)"""
+    return type(value) is int and -2**31 <= value < 2**31
+
+
+def _is_point(value: object) -> bool:
+    """{"x": float, "y": float} の形か"""
+    return (type(value) is dict and len(value) == 2 and tuple(value) == ("x", "y")
+            and _is_float(value["x"]) and _is_float(value["y"]))
+
+
+def _is_standard_equipment(record: object) -> bool:
+    """列形式で保存できる機材レコードか"""
+    if type(record) is not dict or tuple(record) != _EQUIPMENT_KEYS:
+        return False
+    dmx = record["dmx_data"]
+    return (type(record["instance_id"]) is str and type(record["type_id"]) is str
+            and all(_is_float(record[k]) for k in ("x", "y", "angle", "z_value"))
+            and type(record["text_visible"]) is bool and type(record["channel_visible"]) is bool
+            and type(record["text_color"]) is str and type(record["channel_text_color"]) is str
+            and type(dmx) is dict and tuple(dmx) == _DMX_KEYS
+            and _is_int(dmx["universe"]) and _is_int(dmx["address"]) and type(dmx["mode_name"]) is str)
+
+
+def _is_standard_wire(record: object) -> bool:
+    """列形式で保存できる配線レコードか（先頭の instance_id は省略可）"""
+    if type(record) is not dict:
+        return False
+    keys = tuple(record)
+    if keys[:1] == ("instance_id",):
+        if type(record["instance_id"]) is not str:
+            return False
+        keys = keys[1:]
+    return (keys == _WIRE_KEYS
+            and type(record["start_item_id"]) is str and type(record["end_item_id"]) is str
+            and type(record["wire_category"]) is str and type(record["points"]) is list
+            and all(_is_point(p) for p in record["points"]))
+
+
+class _StringTable:
+    """文字列の重複を除いて番号を振る"""
+    def __init__(self) -> None:
+        """初期化処理"""
+        self.strings: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def intern(self, text: str) -> int:
+        """文字列の番号を返す（初出なら登録）"""
+        idx = self._index.get(text)
+        if idx is None:
+            idx = len(self.strings)
+            self._index[text] = idx
+            self.strings.append(text)
+        return idx
+
+
+class _Writer:
+    """セクション（型付き配列）を8バイト境界に揃えて連結する"""
+    def __init__(self) -> None:
+        """初期化処理"""
+        self.sections: dict[str, list] = {}
+        self._chunks: list[bytes] = []
+        self._size = 0
+
+    def add(self, name: str, typecode: str, values) -> None:
+        """配列セクションを追加"""
+        arr = values if isinstance(values, array) else array(typecode, values)
+        if not _LITTLE:
+            arr.byteswap()
+        data = arr.tobytes()
+        self.sections[name] = [self._size, typecode, len(arr)]
+        self._chunks.append(data)
+        self._size += len(data)
+        pad = -self._size % _ALIGN
+        if pad:
+            self._chunks.append(b"\0" * pad)
+            self._size += pad
+
+    def payload(self) -> bytes:
+        """連結したデータ部"""
+        return b"".join(self._chunks)
+
+
+def dumps(layout_data: dict) -> bytes:
+    """レイアウトデータ(dict)をバイナリに変換"""
+    if type(layout_data) is not dict:
+        raise LayoutFormatError("レイアウトデータは dict である必要があります")
+    strings = _StringTable()
+    writer = _Writer()
+    extras = {}  # 列形式に収まらないデータ (JSON のまま保持)
+
+    # --- 機材 (列形式) ---
+    equipment = layout_data.get("equipment_items", [])
+    eq_order = []  # 標準形なら -1、そうでなければ extras 内の番号
+    eq_extra = []
+    cols = {name: [] for name in ("instance", "type", "text_color", "channel_text_color", "mode", "flags",
+                                  "x", "y", "angle", "z", "universe", "address")}
+    for record in equipment if type(equipment) is list else []:
+        if not _is_standard_equipment(record):
+            eq_order.append(len(eq_extra))
+            eq_extra.append(record)
+            continue
+        eq_order.append(-1)
+        dmx = record["dmx_data"]
+        cols["instance"].append(strings.intern(record["instance_id"]))
+        cols["type"].append(strings.intern(record["type_id"]))
+        cols["text_color"].append(strings.intern(record["text_color"]))
+        cols["channel_text_color"].append(strings.intern(record["channel_text_color"]))
+        cols["mode"].append(strings.intern(dmx["mode_name"]))
+        cols["flags"].append((_FLAG_TEXT_VISIBLE if record["text_visible"] else 0)
+                             | (_FLAG_CHANNEL_VISIBLE if record["channel_visible"] else 0))
+        cols["x"].append(record["x"]); cols["y"].append(record["y"])
+        cols["angle"].append(record["angle"]); cols["z"].append(record["z_value"])
+        cols["universe"].append(dmx["universe"]); cols["address"].append(dmx["address"])
+    for name in ("instance", "type", "text_color", "channel_text_color", "mode"):
+        writer.add(f"eq.{name}", "I", cols[name])
+    writer.add("eq.flags", "B", cols["flags"])
+    for name in ("x", "y", "angle", "z"):
+        writer.add(f"eq.{name}", "d", cols[name])
+    writer.add("eq.universe", "i", cols["universe"])
+    writer.add("eq.address", "i", cols["address"])
+    writer.add("eq.order", "i", eq_order)
+    if type(equipment) is not list:
+        extras["equipment_items"] = equipment
+    elif eq_extra:
+        extras["equipment_records"] = eq_extra
+
+    # --- 配線 (列形式 + 経由点の連結配列) ---
+    wires = layout_data.get("wires", [])
+    wire_order = []
+    wire_extra = []
+    instances, starts, ends, categories, point_offsets, points = [], [], [], [], [0], array("d")
+    for record in wires if type(wires) is list else []:
+        if not _is_standard_wire(record):
+            wire_order.append(len(wire_extra))
+            wire_extra.append(record)
+            continue
+        wire_order.append(-1)
+        instances.append(strings.intern(record["instance_id"]) if "instance_id" in record else _NO_STRING)
+        starts.append(strings.intern(record["start_item_id"]))
+        ends.append(strings.intern(record["end_item_id"]))
+        categories.append(strings.intern(record["wire_category"]))
+        for p in record["points"]:
+            points.append(p["x"]); points.append(p["y"])
+        point_offsets.append(len(points) // 2)
+    writer.add("wire.instance", "I", instances)
+    writer.add("wire.start", "I", starts)
+    writer.add("wire.end", "I", ends)
+    writer.add("wire.category", "I", categories)
+    writer.add("wire.point_offsets", "I", point_offsets)
+    writer.add("wire.points", "d", points)
+    writer.add("wire.order", "i", wire_order)
+    if type(wires) is not list:
+        extras["wires"] = wires
+    elif wire_extra:
+        extras["wire_records"] = wire_extra
+
+    # --- 会場: 壁は連結配列、コンセントは数が少ないので JSON ---
+    venue = layout_data.get("venue")
+    venue_header = None
+    if "venue" in layout_data:
+        walls = venue.get("walls") if type(venue) is dict else None
+        if (type(venue) is dict and type(walls) is list
+                and all(type(w) is list and all(_is_point(p) for p in w) for w in walls)):
+            wall_offsets, wall_points = [0], array("d")
+            for wall in walls:
+                for p in wall:
+                    wall_points.append(p["x"]); wall_points.append(p["y"])
+                wall_offsets.append(len(wall_points) // 2)
+            writer.add("wall.offsets", "I", wall_offsets)
+            writer.add("wall.points", "d", wall_points)
+            venue_header = {k: v for k, v in venue.items() if k != "walls"}
+            venue_header["__walls_order__"] = list(venue).index("walls")
+        else:
+            extras["venue"] = venue
+
+    # --- 文字列テーブル ---
+    encoded = [s.encode("utf-8") for s in strings.strings]
+    string_offsets = [0]
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+    writer.add("strings.offsets", "I", string_offsets)
+    writer.add("strings.data", "B", array("B", b"".join(encoded)))
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "key_order": list(layout_data),
+        "top": {k: v for k, v in layout_data.items() if k not in _KNOWN_TOP_KEYS},
+        "venue": venue_header,
+        "extras": extras,
+        "sections": writer.sections,
+    }
+    for key in ("version", "background_color"):
+        if key in layout_data:
+            header["top"][key] = layout_data[key]
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * (-(_PREAMBLE.size + len(header_bytes)) % _ALIGN)
+    return _PREAMBLE.pack(MAGIC, len(header_bytes)) + header_bytes + writer.payload()
+
+
+class _Reader:
+    """バイト列（mmap 可）からセクションを配列として取り出す"""
+    def __init__(self, buffer, sections: dict, base: int) -> None:
+        """初期化処理"""
+        self._view = memoryview(buffer)
+        self._sections = sections
+        self._base = base
+
+    def get(self, name: str) -> list:
+        """セクションを Python のリストとして取得"""
+        offset, typecode, count = self._sections[name]
+        size = array(typecode).itemsize * count
+        start = self._base + offset
+        if start + size > len(self._view):
+            raise LayoutFormatError(f"セクション {name} がファイル末尾を超えています")
+        chunk = self._view[start:start + size]
+        if _LITTLE:
+            return chunk.cast(typecode).tolist()
+        arr = array(typecode, chunk.tobytes())
+        arr.byteswap()
+        return arr.tolist()
+
+    def has(self, name: str) -> bool:
+        """セクションが存在するか"""
+        return name in self._sections
+
+    def raw(self, name: str) -> bytes:
+        """セクションをバイト列のまま取得"""
+        offset, _, count = self._sections[name]
+        start = self._base + offset
+        return self._view[start:start + count].tobytes()
+
+    def release(self) -> None:
+        """バッファへの参照を解放"""
+        self._view.release()
+
+
+def loads(buffer) -> dict:
+    """バイナリ（bytes / mmap）からレイアウトデータ(dict)を復元"""
+    if len(buffer) < _PREAMBLE.size:
+        raise LayoutFormatError("ファイルが短すぎます")
+    magic, header_len = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise LayoutFormatError("バイナリレイアウトファイルではありません")
+    base = _PREAMBLE.size + header_len
+    try:
+        header = json.loads(bytes(buffer[_PREAMBLE.size:base]).decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise LayoutFormatError(f"ヘッダを読み込めません: {e}") from e
+    if header.get("format_version") != FORMAT_VERSION:
+        raise LayoutFormatError(f"未対応の形式バージョンです: {header.get('format_version')}")
+    reader = _Reader(buffer, header["sections"], base)
+    # 大量の dict を作る間は循環GCを止める（参照循環は作らないため安全）
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _decode(header, reader)
+    except (KeyError, IndexError, TypeError) as e:
+        raise LayoutFormatError(f"データが壊れています: {e}") from e
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+        reader.release()
+
+
+def _merge_records(standard: list, extra: list, order: list[int]) -> list:
+    """列形式のレコードと JSON のままのレコードを元の順序に並べ直す"""
+    if not extra:
+        return standard
+    merged = []
+    row = 0
+    for idx in order:
+        if idx >= 0:
+            merged.append(extra[idx])
+        else:
+            merged.append(standard[row])
+            row += 1
+    return merged
+
+
+def _decode(header: dict, reader: _Reader) -> dict:
+    """ヘッダとセクションから dict を組み立てる"""
+    offsets = reader.get("strings.offsets")
+    blob = reader.raw("strings.data")
+    strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+    extras = header["extras"]
+
+    # --- 機材 ---
+    if "equipment_items" in extras:
+        equipment = extras["equipment_items"]
+    else:
+        def names(section: str) -> list[str]:
+            return [strings[i] for i in reader.get(section)]
+        
+        flags = reader.get("eq.flags")
+        # 行ごとの添字アクセスを避け、列をまとめて zip で組み立てる
+        standard = [{
+            "instance_id": instance_id,
+            "type_id": type_id,
+            "x": x,
+            "y": y,
+            "angle": angle,
+            "z_value": z,
+            "text_visible": bool(f & _FLAG_TEXT_VISIBLE),
+            "channel_visible": bool(f & _FLAG_CHANNEL_VISIBLE),
+            "text_color": text_color,
+            "channel_text_color": channel_text_color,
+            "dmx_data": {"universe": universe, "address": address, "mode_name": mode}
+        } for instance_id, type_id, x, y, angle, z, f, text_color, channel_text_color, universe, address, mode in zip(
+            names("eq.instance"), names("eq.type"), reader.get("eq.x"), reader.get("eq.y"),
+            reader.get("eq.angle"), reader.get("eq.z"), flags, names("eq.text_color"),
+            names("eq.channel_text_color"), reader.get("eq.universe"), reader.get("eq.address"), names("eq.mode"))]
+        equipment = _merge_records(standard, extras.get("equipment_records", []), reader.get("eq.order"))
+
+    # --- 配線 ---
+    if "wires" in extras:
+        wires = extras["wires"]
+    else:
+        point_offsets, points = reader.get("wire.point_offsets"), reader.get("wire.points")
+        starts = reader.get("wire.start")
+        # 配線IDの列がない古いファイルは全て ID なしとして扱う
+        instances = reader.get("wire.instance") if reader.has("wire.instance") else [_NO_STRING] * len(starts)
+        standard = [{
+            "instance_id": strings[instance],
+            "start_item_id": strings[start],
+            "end_item_id": strings[end],
+            "points": [{"x": points[2 * i], "y": points[2 * i + 1]} for i in range(first, last)],
+            "wire_category": strings[category]
+        } if instance != _NO_STRING else {
+            "start_item_id": strings[start],
+            "end_item_id": strings[end],
+            "points": [{"x": points[2 * i], "y": points[2 * i + 1]} for i in range(first, last)],
+            "wire_category": strings[category]
+        } for instance, start, end, category, first, last in zip(
+            instances, starts, reader.get("wire.end"), reader.get("wire.category"),
+            point_offsets, point_offsets[1:])]
+        wires = _merge_records(standard, extras.get("wire_records", []), reader.get("wire.order"))
+
+    # --- 会場 ---
+    venue = extras.get("venue")
+    venue_header = header.get("venue")
+    if venue_header is not None:
+        wall_offsets, wall_points = reader.get("wall.offsets"), reader.get("wall.points")
+        walls = [[{"x": wall_points[2 * i], "y": wall_points[2 * i + 1]} for i in range(wall_offsets[w], wall_offsets[w + 1])]
+                 for w in range(len(wall_offsets) - 1)]
+        items = [(k, v) for k, v in venue_header.items() if k != "__walls_order__"]
+        items.insert(venue_header["__walls_order__"], ("walls", walls))
+        venue = dict(items)
+
+    # 元のキー順で組み立てる
+    parts = dict(header["top"])
+    parts["equipment_items"] = equipment
+    parts["wires"] = wires
+    if "venue" in extras or venue_header is not None:
+        parts["venue"] = venue
+    return {key: parts[key] for key in header["key_order"] if key in parts}
+
+
+def dump(layout_data: dict, file_path: str) -> None:
+    """レイアウトデータをバイナリファイルに書き込む（アトミックに置き換え）"""
+    atomic_write(file_path, dumps(layout_data))
+
+
+def load(file_path: str) -> dict:
+    """バイナリファイルをメモリマップで読み込む"""
+    with open(file_path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise LayoutFormatError("ファイルが空です")
+        try:
+            return loads(buffer)
+        finally:
+            buffer.close()
+
+
+def is_binary_layout(file_path: str) -> bool:
+    """ファイル先頭のマジックでバイナリレイアウトか判定"""
+    try:
+        with open(file_path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def convert(src_path: str, dst_path: str) -> None:
+    """JSON ⇔ バイナリの変換（出力形式は拡張子で判定。差分保存のジャーナルも適用する）"""
+    if is_binary_layout(src_path):
+        layout_data = load(src_path)
+    else:
+        with open(src_path, "r", encoding="utf-8") as f:
+            layout_data = json.load(f)
+    if isinstance(layout_data, dict):
+        layout_data = LayoutJournal().open(src_path, layout_data)
+    save_layout(layout_data, dst_path)
+
+
+def main(argv: list[str]) -> int:
+    """変換コマンド"""
+    if len(argv) != 2:
+        print("使い方: python layout_binary.py 入力 出力  (出力の拡張子 .olb でバイナリ、それ以外は JSON)")
+        return 1
+    try:
+        convert(argv[0], argv[1])
+    except (OSError, ValueError) as e:
+        print(f"変換に失敗しました: {e}")
+        return 1
+    print(f"{argv[0]} -> {argv[1]} に変換しました。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,129 @@
+from typing import NamedTuple
+
+
+class DmxMode(NamedTuple):
+    """DMX モード（名前・チャンネル数・各チャンネルの定義）"""
+    name: str
+    channels: int
+    definitions: tuple[str, ...]
+
+
+# モードが見つからない機材は 1ch として扱う
+DEFAULT_DMX_MODE = DmxMode("", 1, ("",))
+
+
+def build_mode_table(type_info: dict) -> dict[str, DmxMode]:
+    """機材情報の dmx_modes からモード名 → DmxMode の表を作る（同名のモードは先頭を優先）"""
+    table = {}
+    for mode in type_info.get("dmx_modes", []):
+        name = mode.get("name", "")
+        if name in table:
+            continue
+        channels = mode.get("channels", 1)
+        # 定義の数はチャンネル数に揃える（機材管理ダイアログと同じ）
+        definitions = tuple(mode.get("definitions") or ())[:channels]
+        table[name] = DmxMode(name, channels, definitions + ("",) * (channels - len(definitions)))
+    return table
+
+
+class EquipmentLibrary:
+    """機材ライブラリ（フォルダ木構造）と ID 索引"""
+    def __init__(self, data: list[dict] | None = None) -> None:
+        """初期化処理"""
+        self.set_data(data if data is not None else [])
+
+    def set_data(self, data: list[dict]) -> None:
+        """ライブラリデータを差し替えて索引を作り直す"""
+        self.data = data
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """木構造を一度だけ走査して id→項目 / id→親フォルダ の索引を作る"""
+        self._by_id: dict[str, dict] = {}
+        self._parent_by_id: dict[str, dict | None] = {}
+        # 機材の種類 ID → DMX モードの表 / (種類 ID, モード名) → チャンネル数
+        self._mode_tables: dict[str, dict[str, DmxMode]] = {}
+        self._mode_channels: dict[tuple[str, str], int] = {}
+        for entry in self.data:
+            self._index(entry, None)
+
+    def _index(self, entry: dict, parent: dict | None) -> None:
+        """項目（フォルダなら子孫も）を索引に登録"""
+        stack = [(entry, parent)]
+        while stack:
+            item, item_parent = stack.pop()
+            item_id = item.get("id")
+            # 重複IDは木の先頭側を優先する（旧来の再帰検索と同じ結果）
+            if item_id is not None and item_id not in self._by_id:
+                self._by_id[item_id] = item
+                self._parent_by_id[item_id] = item_parent
+                if item.get("type") == "equipment":
+                    self._index_modes(item_id, item)
+            if item.get("type") == "folder" and "children" in item:
+                for child in reversed(item["children"]):
+                    stack.append((child, item))
+
+    def _index_modes(self, item_id: str, entry: dict) -> None:
+        """機材の DMX モードの表を作り直す"""
+        for name in self._mode_tables.get(item_id, ()):
+            del self._mode_channels[(item_id, name)]
+        table = build_mode_table(entry)
+        self._mode_tables[item_id] = table
+        for name, mode in table.items():
+            self._mode_channels[(item_id, name)] = mode.channels
+
+    def update_modes(self, item_id: str) -> None:
+        """機材の dmx_modes を直接書き換えた後に表を作り直す"""
+        entry = self._by_id.get(item_id)
+        if entry is not None and entry.get("type") == "equipment":
+            self._index_modes(item_id, entry)
+
+    def mode_table(self, item_id: str) -> dict[str, DmxMode]:
+        """機材の DMX モードの表（モード名 → DmxMode。未登録なら空）"""
+        return self._mode_tables.get(item_id, {})
+
+    def mode_channels(self, item_id: str, mode_name: str) -> int:
+        """(種類 ID, モード名) のチャンネル数（見つからなければ 1）"""
+        return self._mode_channels.get((item_id, mode_name), 1)
+
+    def find(self, item_id: str) -> dict | None:
+        """IDから項目を取得"""
+        return self._by_id.get(item_id)
+
+    def parent_of(self, item_id: str) -> dict | None:
+        """IDから親フォルダを取得（最上位なら None）"""
+        return self._parent_by_id.get(item_id)
+
+    def add(self, entry: dict, parent: dict | None = None) -> None:
+        """項目を親フォルダ（None なら最上位）に追加"""
+        if parent is None:
+            self.data.append(entry)
+        else:
+            parent.setdefault("children", []).append(entry)
+        self._index(entry, parent)
+
+    def remove(self, item_id: str) -> None:
+        """項目（フォルダなら子孫も）を削除"""
+        entry = self._by_id.get(item_id)
+        if entry is None:
+            return
+        parent = self._parent_by_id.get(item_id)
+        siblings = self.data if parent is None else parent.get("children", [])
+        siblings[:] = [item for item in siblings if item.get("id") != item_id]
+        stack = [entry]
+        while stack:
+            item = stack.pop()
+            if self._by_id.get(item.get("id")) is item:
+                del self._by_id[item["id"]]
+                del self._parent_by_id[item["id"]]
+                for name in self._mode_tables.pop(item["id"], ()):
+                    del self._mode_channels[(item["id"], name)]
+            stack.extend(item.get("children", []))
+
+    def __contains__(self, item_id: str) -> bool:
+        """ID が登録されているか"""
+        return item_id in self._by_id
+
+    def __len__(self) -> int:
+        """登録されている項目数"""
+        return len(self._by_id)
@@ -1,17 +1,18 @@
 import sys
 import os
 import json
+import time
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QDockWidget, QWidget, QTreeWidget,
     QFormLayout, QLineEdit, QLabel, QComboBox, QHBoxLayout,
-    QSpinBox, QCheckBox, QPushButton, QGraphicsScene, QFileDialog,
+    QSpinBox, QCheckBox, QPushButton, QFileDialog,
     QMessageBox, QTreeWidgetItem, QToolBar, QColorDialog, QMenu,
-    QDialog
+    QDialog, QProgressDialog
 )
 from PySide6.QtCore import Qt, QPointF, QRectF, QSize
 from PySide6.QtGui import (
     QColor, QKeySequence, QAction, QActionGroup, QUndoStack,
-    QPixmap, QCloseEvent, QPainter, QPageSize, QPageLayout,
+    QCloseEvent, QPainter, QPageSize, QPageLayout,
     QImage, QTextDocument
 )
 
@@ -19,15 +20,30 @@ from PySide6.QtGui import (
 import constants
 from items import EquipmentItem, OutletItem, WiringItem, VenueItem
 from views import CustomGraphicsView
+from scene import LayoutScene
+from pixmap_cache import PIXMAP_CACHE
+from image_resolver import IMAGE_RESOLVER
+from library import EquipmentLibrary
+import layout_binary
+from fileio import save_layout
+from autosave import AutosaveManager
+from journal import LayoutJournal
+from router import route_wires, wires_to_route
+from dmx_patch import UniverseOccupancy, auto_patch, order_fixtures
 from commands import (
     CommandChangeProperty, CommandChangeTextColor, CommandChangeZValue,
-    CommandMoveItems # 必要に応じて
+    CommandMoveItems, CommandRouteWires, CommandChangeDmx # 必要に応じて
 )
 from dialogs import (
     EquipmentManagerDialog, VenueManagerDialog, PatchWindow,
-    PowerReportDialog, ExportDialog, TablePreviewDialog
+    PowerReportDialog, ExportDialog, TablePreviewDialog, AutoPatchDialog
 )
 
+# レイアウトファイルのダイアログ用フィルタ
+LAYOUT_OPEN_FILTER = "レイアウトファイル (*.json *.olb)"
+LAYOUT_SAVE_FILTER = "レイアウトファイル (*.json);;バイナリレイアウト (*.olb)"
+
+
 class MainWindow(QMainWindow):
     """アプリケーションのメインウィンドウ"""
     def __init__(self) -> None:
@@ -37,6 +53,8 @@ class MainWindow(QMainWindow):
         self.resize(800, 600)
         
         self.undoStack = QUndoStack(self)
+        self.autosave = AutosaveManager(self)
+        self.journal = LayoutJournal()  # 差分保存の基準（前回保存した内容）
         self._load_equipment_data()
         self.is_modified = False
         self.undoStack.cleanChanged.connect(self.set_modified)
@@ -122,13 +140,16 @@ class MainWindow(QMainWindow):
         self.addDockWidget(Qt.RightDockWidgetArea, self.right_dock)
         
         # 切り替え項目
-        self.scene = QGraphicsScene()
+        self.scene = LayoutScene()
         self.scene.setSceneRect(-5000, -5000, 10000, 10000)
         self.scene.setBackgroundBrush(QColor(150, 150, 150))
+        self.autosave.watch_scene(self.scene)
         self.view = CustomGraphicsView(self.scene)
         self.view.mainWindow = self
         self.setCentralWidget(self.view)
-        self.view.scene().changed.connect(self.update_properties_panel)
+        self.view.scene().changed.connect(self._on_scene_changed)
+        # ドラッグ中はフレーム単位のフラッシュ時にまとめて更新する
+        self.scene.dragFlushed.connect(self.update_properties_panel)
         
         # メニューバー設定
         menu_bar = self.menuBar()
@@ -159,10 +180,17 @@ class MainWindow(QMainWindow):
         patch_action = tool_menu.addAction("DMXパッチ管理...")
         patch_action.triggered.connect(self.open_patch_window)
         
+        auto_patch_action = tool_menu.addAction("選択機材を自動パッチ...")
+        auto_patch_action.triggered.connect(self.auto_patch_selected)
+        
         calc_power_action = tool_menu.addAction("電力計算レポート表示")
         calc_power_action.setShortcut("F5")
         calc_power_action.triggered.connect(self.show_power_report)
         
+        route_action = tool_menu.addAction("配線を自動ルーティング")
+        route_action.setShortcut("Ctrl+R")
+        route_action.triggered.connect(self.auto_route_wires)
+        
         arrange_menu = menu_bar.addMenu("配置")
         # 変数に保存して、後で有効/無効を切り替えられるようにする
         self.front_action = arrange_menu.addAction("最前面へ移動")
@@ -204,8 +232,10 @@ class MainWindow(QMainWindow):
         self.mode_toolbar.addSeparator()
         self.show_dmx_check = QCheckBox("DMX表示"); self.show_dmx_check.setChecked(True); self.show_dmx_check.toggled.connect(self.update_wire_visibility); self.mode_toolbar.addWidget(self.show_dmx_check)
         self.show_power_check = QCheckBox("電源表示"); self.show_power_check.setChecked(True); self.show_power_check.toggled.connect(self.update_wire_visibility); self.mode_toolbar.addWidget(self.show_power_check)
+        self.power_badge_check = QCheckBox("過負荷表示"); self.power_badge_check.setChecked(False); self.power_badge_check.toggled.connect(self.view.set_power_badges_enabled); self.mode_toolbar.addWidget(self.power_badge_check)
         self.mode_toolbar.addSeparator()
         self.grid_check = QCheckBox("グリッド吸着"); self.grid_check.setChecked(False); self.grid_check.toggled.connect(self.toggle_grid); self.mode_toolbar.addWidget(self.grid_check)
+        self.performance_check = QCheckBox("高速描画"); self.performance_check.setChecked(False); self.performance_check.toggled.connect(self.view.set_performance_mode); self.mode_toolbar.addWidget(self.performance_check)
         
         self._current_mode = "cursor"
     
@@ -229,121 +259,166 @@ class MainWindow(QMainWindow):
     
     def save_file_as(self) -> bool:
         """ファイル名を指定してレイアウトを保存"""
-        file_path, _ = QFileDialog.getSaveFileName(self, "レイアウトを保存", "", "レイアウトファイル (*.json)")
+        file_path, _ = QFileDialog.getSaveFileName(self, "レイアウトを保存", "", LAYOUT_SAVE_FILTER)
         if not file_path:
             return False
         return self._perform_save(file_path)
     
     def _perform_save(self, file_path: str) -> bool:
-        """指定パスにレイアウトデータを保存"""
-        equipment_items_data = []
-        venue_walls_data = []
-        venue_outlets_data = []
-        lines_to_process = []
-        
-        # 背景色の保存
-        bg_brush = self.view.scene().backgroundBrush()
-        bg_color_name = bg_brush.color().name() if bg_brush.style() != Qt.NoBrush else "#FFFFFF"
-        
-        # シーン内のアイテムを分類して保存
-        for item in self.view.scene().items():
-            if isinstance(item, EquipmentItem):
-                item_data = {
-                    # 既存データ...
-                    "instance_id": item.instance_id,
-                    "type_id": item.type_id,
-                    "x": item.pos().x(),
-                    "y": item.pos().y(),
-                    "angle": item.rotation(),
-                    
-                    # 重なり順と表示設定の保存
-                    "z_value": item.zValue(),
-                    "text_visible": item.text.isVisible(),
-                    "channel_visible": item.channel_text.isVisible(),
-                    
-                    "text_color": item.getTextColor().name(),
-                    "channel_text_color": item.getChannelTextColor().name(),
-                    
-                    # DMXデータ
-                    "dmx_data": {
-                        "universe": item.dmx_universe,
-                        "address": item.dmx_address,
-                        "mode_name": item.dmx_mode_name
-                    }
-                }
-                equipment_items_data.append(item_data)
-            
-            elif isinstance(item, WiringItem):
-                lines_to_process.append(item)
-            
-            elif isinstance(item, VenueItem):
-                # 会場の壁データの保存
-                # QPointFのリストを辞書のリストに変換
-                walls = []
-                for points in item.points_list:
-                    wall_pts = [{"x": p.x(), "y": p.y()} for p in points]
-                    walls.append(wall_pts)
-                venue_walls_data.extend(walls)
-            
-            elif isinstance(item, OutletItem):
-                # コンセントデータの保存
-                # OutletItemは info に色や容量を持っているのでそれを保存
-                # 位置は pos() から取得して info を更新しておく
-                info = item.info.copy()
-                info["x"] = item.pos().x()
-                info["y"] = item.pos().y()
-                info["text_color"] = item.getTextColor().name()
-                
-                outlet_data = {
-                    "instance_id": item.instance_id,
-                    "info": info
-                }
-                venue_outlets_data.append(outlet_data)
-        
-        # 配線データの作成
-        wires_data = []
-        for line in lines_to_process:
-            wire_info = getattr(line, "wire_info", None)
-            if not wire_info: continue
-            start_id = wire_info.get("start_id")
-            end_id = wire_info.get("end_id")
-            if not start_id or not end_id: continue
-            points_list = []
-            if wire_info.get("points"):
-                points_list = [{"x": p.x(), "y": p.y()} for p in wire_info["points"]]
-            wire_data = {
-                "start_item_id": wire_info["start_id"],
-                "end_item_id": wire_info["end_id"],
-                "points": points_list,
-                "wire_category": wire_info.get("wire_category", "dmx")
-            }
-            wires_data.append(wire_data)
-            
-        # 統合データ
-        layout_data = {
-            "version": 1.1, # バージョン管理用
-            "background_color": bg_color_name,
-            "venue": {
-                "walls": venue_walls_data,
-                "outlets": venue_outlets_data
-            },
-            "equipment_items": equipment_items_data, 
-            "wires": wires_data
-        }
-        
+        """指定パスにレイアウトデータを保存（拡張子 .olb ならバイナリ形式）"""
+        old_autosave_path = self.autosave.autosave_path()
+        scene = self.view.scene()
+        dirty = scene.take_dirty()
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(layout_data, f, indent=4, ensure_ascii=False)
+            if not self._append_journal(file_path, dirty):
+                self._save_snapshot(file_path)
             self.current_file_path = file_path
             # self.is_modified = False
             self.undoStack.setClean() # 保存したのでクリーン状態にする
             file_name = os.path.basename(file_path)
             self.setWindowTitle(f"{file_name} - DMX Layout Tool")
             print(f"レイアウトが {file_path} に保存されました。")
+            # 保存済みの内容より古い自動保存ファイルは不要
+            self.autosave.discard(old_autosave_path)
             return True
         except Exception as e:
+            scene.mark_dirty(*dirty)  # 次回の保存で改めて書き込む
             print(f"保存中にエラーが発生しました: {e}"); return False
     
+    def _append_journal(self, file_path: str, dirty: list) -> bool:
+        """変更されたレコードだけをジャーナルに追記（全体保存が必要なら False）"""
+        if not self.journal.can_append(file_path):
+            return False
+        scene = self.view.scene()
+        entry = self.journal.build_entry(
+            self._layout_header(), self._venue_data(),
+            scene.items_of(EquipmentItem), scene.items_of(WiringItem), set(dirty),
+            self._equipment_record, self._wire_record)
+        if entry is None:
+            return False
+        try:
+            self.journal.append(entry)
+        except OSError as e:
+            print(f"ジャーナルに追記できませんでした: {e}")
+            return False
+        return True
+    
+    def _save_snapshot(self, file_path: str) -> None:
+        """レイアウト全体を保存し、ジャーナルを新しくする"""
+        layout_data = self._build_layout_data()
+        # 一時ファイル経由で置き換えるため、書き込み途中で落ちても元のファイルは壊れない
+        save_layout(layout_data, file_path)
+        self.journal.snapshot_saved(file_path, layout_data)
+    
+    def _build_layout_data(self) -> dict:
+        """シーンから保存用のレイアウトデータ(dict)を作成"""
+        # シーン内のアイテムを分類して保存（登録簿からクラス別に取得）
+        scene = self.view.scene()
+        equipment_items_data = [self._equipment_record(item) for item in scene.items_of(EquipmentItem)]
+        
+        # 配線データの作成
+        wires_data = []
+        for line in scene.items_of(WiringItem):
+            wire_data = self._wire_record(line)
+            if wire_data is not None:
+                wires_data.append(wire_data)
+            
+        # 統合データ
+        layout_data = {
+            **self._layout_header(),
+            "venue": self._venue_data(),
+            "equipment_items": equipment_items_data, 
+            "wires": wires_data
+        }
+        return layout_data
+    
+    def _layout_header(self) -> dict:
+        """レイアウトデータの先頭項目（バージョン・背景色）"""
+        # 背景色の保存
+        bg_brush = self.view.scene().backgroundBrush()
+        bg_color_name = bg_brush.color().name() if bg_brush.style() != Qt.NoBrush else "#FFFFFF"
+        return {
+            "version": 1.1, # バージョン管理用
+            "background_color": bg_color_name
+        }
+    
+    def _equipment_record(self, item: EquipmentItem) -> dict:
+        """機材1台分の保存データ"""
+        return {
+            # 既存データ...
+            "instance_id": item.instance_id,
+            "type_id": item.type_id,
+            "x": item.pos().x(),
+            "y": item.pos().y(),
+            "angle": item.rotation(),
+            
+            # 重なり順と表示設定の保存
+            "z_value": item.zValue(),
+            "text_visible": item.text.isVisible(),
+            "channel_visible": item.channel_text.isVisible(),
+            
+            "text_color": item.getTextColor().name(),
+            "channel_text_color": item.getChannelTextColor().name(),
+            
+            # DMXデータ
+            "dmx_data": {
+                "universe": item.dmx_universe,
+                "address": item.dmx_address,
+                "mode_name": item.dmx_mode_name
+            }
+        }
+    
+    def _wire_record(self, line: WiringItem) -> dict | None:
+        """配線1本分の保存データ（両端が確定していなければ None）"""
+        wire_info = getattr(line, "wire_info", None)
+        if not wire_info: return None
+        start_id = wire_info.get("start_id")
+        end_id = wire_info.get("end_id")
+        if not start_id or not end_id: return None
+        points_list = []
+        if wire_info.get("points"):
+            points_list = [{"x": p.x(), "y": p.y()} for p in wire_info["points"]]
+        return {
+            "instance_id": line.instance_id,
+            "start_item_id": wire_info["start_id"],
+            "end_item_id": wire_info["end_id"],
+            "points": points_list,
+            "wire_category": wire_info.get("wire_category", "dmx")
+        }
+    
+    def _venue_data(self) -> dict:
+        """会場（壁・コンセント）の保存データ"""
+        scene = self.view.scene()
+        venue_walls_data = []
+        venue_outlets_data = []
+        for item in scene.items_of(VenueItem):
+            # 会場の壁データの保存
+            # QPointFのリストを辞書のリストに変換
+            walls = []
+            for points in item.points_list:
+                wall_pts = [{"x": p.x(), "y": p.y()} for p in points]
+                walls.append(wall_pts)
+            venue_walls_data.extend(walls)
+        
+        for item in scene.items_of(OutletItem):
+            # コンセントデータの保存
+            # OutletItemは info に色や容量を持っているのでそれを保存
+            # 位置は pos() から取得して info を更新しておく
+            info = item.info.copy()
+            info["x"] = item.pos().x()
+            info["y"] = item.pos().y()
+            info["text_color"] = item.getTextColor().name()
+            
+            outlet_data = {
+                "instance_id": item.instance_id,
+                "info": info
+            }
+            venue_outlets_data.append(outlet_data)
+        return {
+            "walls": venue_walls_data,
+            "outlets": venue_outlets_data
+        }
+    
     def check_unsaved_changes(self) -> bool:
         """未保存変更がある場合の確認ダイアログ"""
         if not self.is_modified:
@@ -370,122 +445,205 @@ class MainWindow(QMainWindow):
     def load_file(self) -> None:
         """レイアウトファイルを読み込む"""
         if not self.check_unsaved_changes(): return
-        file_path, _ = QFileDialog.getOpenFileName(self, "レイアウトを読み込み", "", "レイアウトファイル (*.json)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "レイアウトを読み込み", "", LAYOUT_OPEN_FILTER)
         if not file_path: return
+        if self.open_layout(file_path):
+            self.report_missing_images()
+    
+    def open_layout(self, file_path: str) -> bool:
+        """指定パスのレイアウトを読み込んでシーンを作り直す（確認ダイアログなし）"""
+        start = time.perf_counter()
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                layout_data = json.load(f)
+            # 拡張子ではなく先頭のマジックで形式を判定する
+            if layout_binary.is_binary_layout(file_path):
+                layout_data = layout_binary.load(file_path)
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    layout_data = json.load(f)
+            # 前回のスナップショット以降の差分を適用
+            layout_data = self.journal.open(file_path, layout_data) if isinstance(layout_data, dict) else layout_data
         except Exception as e:
-            print(f"読み込み中にエラーが発生しました: {e}"); return
+            print(f"読み込み中にエラーが発生しました: {e}"); return False
+        parse_ms = (time.perf_counter() - start) * 1000
         
         self.view._cancel_wiring()
         self.view.scene().clear()
-        created_items_map = {}
         
         if not isinstance(layout_data, dict):
-            return
+            return False
         
-        # 1. 背景色の復元
-        bg_color = layout_data.get("background_color", "#969696") # デフォルトはグレー
-        self.view.scene().setBackgroundBrush(QColor(bg_color))
+        # 画像フォルダが変わっていればパス解決のキャッシュを破棄
+        if IMAGE_RESOLVER.check_directory():
+            PIXMAP_CACHE.invalidate()  # 画像が差し替えられている可能性がある
+        timings = self._apply_layout_data(layout_data)
+        if timings is None:
+            # キャンセルされた場合は空の新規レイアウトに戻す
+            self.view.scene().clear()
+            self.current_venue_item = None
+            self.current_file_path = None
+            self.journal.clear()
+            self.undoStack.clear()
+            self.undoStack.setClean()
+            self.setWindowTitle("無題 - DMX Layout Tool")
+            print("レイアウトの読み込みを中止しました。")
+            return False
+        timings = {"解析": parse_ms, **timings}
+        print("読み込み時間: " + " / ".join(f"{name} {ms:.1f}ms" for name, ms in timings.items()))
         
-        # 2. 会場 (壁) の復元
+        self.current_file_path = file_path
+        self.undoStack.clear()
+        self.undoStack.setClean()
+        file_name = file_path.split('/')[-1]
+        self.setWindowTitle(f"{file_name} - DMX Layout Tool")
+        return True
+    
+    def _apply_layout_data(self, layout_data: dict) -> dict[str, float] | None:
+        """レイアウトデータからシーンを一括構築（フェーズ毎の所要時間(ms)を返す。キャンセル時は None）"""
+        scene = self.view.scene()
+        created_items_map = {}
+        timings = {}
         venue_data = layout_data.get("venue", {})
-        walls_data = venue_data.get("walls", [])
-        
-        # 互換性: 古い形式のファイルには venue キーがない場合がある
-        if walls_data:
-            points_list = []
-            for wall_pts in walls_data:
-                pts = [QPointF(p["x"], p["y"]) for p in wall_pts]
-                points_list.append(pts)
-            if points_list:
-                self.current_venue_item = VenueItem(points_list)
-                self.view.scene().addItem(self.current_venue_item)
-        
-        # 3. コンセントの復元 (IDをマップに登録することが重要)
         outlets_data = venue_data.get("outlets", [])
-        for out_d in outlets_data:
-            info = out_d.get("info", {})
-            uid = out_d.get("instance_id")
-            
-            # 位置情報は info に入っているはずだが、念のため外側にあれば優先
-            if "x" not in info and "x" in out_d: info["x"] = out_d["x"]
-            if "y" not in info and "y" in out_d: info["y"] = out_d["y"]
-            
-            outlet_item = OutletItem(info, uid=uid)
-            if "text_color" in info:
-                outlet_item.setTextColor(QColor(info["text_color"]))
-            if "channel_text_color" in item_data:
-                item.setChannelTextColor(QColor(item_data["channel_text_color"]))
-            self.view.scene().addItem(outlet_item)
-            
-            # 配線のためにマップに登録
-            if outlet_item.instance_id:
-                created_items_map[outlet_item.instance_id] = outlet_item
-        
-        # 4. 機材の復元
         equipment_items_data = layout_data.get("equipment_items", [])
-        for item_data in equipment_items_data:
-            type_id = item_data.get("type_id")
-            type_info = self._find_data_by_id(self.equipment_data, type_id)
-            if not type_info: continue
-            
-            # DMXデータの読み込み
-            dmx_data = item_data.get("dmx_data", None)
-            if dmx_data is None and "channel" in item_data:
-                old_ch = item_data["channel"]
-                if old_ch is not None:
-                    dmx_data = {"universe": 1, "address": int(old_ch), "mode_name": ""}
+        wires_data = layout_data.get("wires", [])
+        
+        progress = QProgressDialog("レイアウトを読み込んでいます...", "キャンセル", 0,
+                                   len(outlets_data) + len(equipment_items_data) + len(wires_data), self)
+        progress.setWindowTitle("読み込み中")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)  # すぐ終わる読み込みではダイアログを出さない
+        done = 0
+        
+        def add_in_chunks(records: list, create_item) -> bool:
+            """チャンク単位でアイテムを追加し、その都度イベントループに処理を返す"""
+            nonlocal done
+            for i, record in enumerate(records, 1):
+                item = create_item(record)
+                if item is not None:
+                    scene.addItem(item)
+                if i % constants.LOAD_CHUNK_SIZE == 0:
+                    progress.setValue(done + i)
+                    QApplication.processEvents()
+                    if progress.wasCanceled():
+                        return False
+            done += len(records)
+            progress.setValue(done)
+            return True
+        
+        # 索引・スナップ・配線更新を止めて一括追加する
+        scene.begin_bulk_load()
+        try:
+            # 1. 背景色の復元
+            phase_start = time.perf_counter()
+            bg_color = layout_data.get("background_color", "#969696") # デフォルトはグレー
+            scene.setBackgroundBrush(QColor(bg_color))
             
-            # Item 生成
-            item = EquipmentItem(type_info, dmx_data=dmx_data)
+            # 2. 会場 (壁) の復元
+            walls_data = venue_data.get("walls", [])
             
-            if "instance_id" in item_data:
-                item.instance_id = item_data["instance_id"]
+            # 互換性: 古い形式のファイルには venue キーがない場合がある
+            if walls_data:
+                points_list = []
+                for wall_pts in walls_data:
+                    pts = [QPointF(p["x"], p["y"]) for p in wall_pts]
+                    points_list.append(pts)
+                if points_list:
+                    self.current_venue_item = VenueItem(points_list)
+                    scene.addItem(self.current_venue_item)
             
-            item.setPos(item_data.get("x", 0), item_data.get("y", 0))
-            item.setRotation(item_data.get("angle", 0))
+            # 3. コンセントの復元 (IDをマップに登録することが重要)
+            def create_outlet(out_d: dict) -> OutletItem:
+                info = out_d.get("info", {})
+                uid = out_d.get("instance_id")
+                
+                # 位置情報は info に入っているはずだが、念のため外側にあれば優先
+                if "x" not in info and "x" in out_d: info["x"] = out_d["x"]
+                if "y" not in info and "y" in out_d: info["y"] = out_d["y"]
+                
+                outlet_item = OutletItem(info, uid=uid)
+                if "text_color" in info:
+                    outlet_item.setTextColor(QColor(info["text_color"]))
+                
+                # 配線のためにマップに登録
+                if outlet_item.instance_id:
+                    created_items_map[outlet_item.instance_id] = outlet_item
+                return outlet_item
             
-            # Z値と表示設定の復元
-            if "z_value" in item_data:
-                item.setZValue(item_data["z_value"])
-            if "text_visible" in item_data:
-                item.setTextVisible(item_data["text_visible"])
-            if "channel_visible" in item_data:
-                item.setChannelVisible(item_data["channel_visible"])
+            if not add_in_chunks(outlets_data, create_outlet): return None
+            timings["会場"] = (time.perf_counter() - phase_start) * 1000
             
-            # 文字色の復元
-            if "text_color" in item_data:
-                item.setTextColor(QColor(item_data["text_color"]))
+            # 4. 機材の復元
+            phase_start = time.perf_counter()
             
-            self.view.scene().addItem(item)
-            created_items_map[item.instance_id] = item
+            def create_equipment(item_data: dict) -> EquipmentItem | None:
+                type_id = item_data.get("type_id")
+                type_info = self.library.find(type_id)
+                if not type_info: return None
+                
+                # DMXデータの読み込み
+                dmx_data = item_data.get("dmx_data", None)
+                if dmx_data is None and "channel" in item_data:
+                    old_ch = item_data["channel"]
+                    if old_ch is not None:
+                        dmx_data = {"universe": 1, "address": int(old_ch), "mode_name": ""}
+                
+                # Item 生成
+                item = EquipmentItem(type_info, dmx_data=dmx_data, mode_table=self.library.mode_table(type_id))
+                
+                if "instance_id" in item_data:
+                    item.instance_id = item_data["instance_id"]
+                
+                item.setPos(item_data.get("x", 0), item_data.get("y", 0))
+                item.setRotation(item_data.get("angle", 0))
+                
+                # Z値と表示設定の復元
+                if "z_value" in item_data:
+                    item.setZValue(item_data["z_value"])
+                if "text_visible" in item_data:
+                    item.setTextVisible(item_data["text_visible"])
+                if "channel_visible" in item_data:
+                    item.setChannelVisible(item_data["channel_visible"])
+                
+                # 文字色の復元
+                if "text_color" in item_data:
+                    item.setTextColor(QColor(item_data["text_color"]))
+                if "channel_text_color" in item_data:
+                    item.setChannelTextColor(QColor(item_data["channel_text_color"]))
+                
+                created_items_map[item.instance_id] = item
+                return item
             
-        # 5. 配線の復元
-        wires_data = layout_data.get("wires", [])
-        for wire_data in wires_data:
-            start_id = wire_data.get("start_item_id")
-            end_id = wire_data.get("end_item_id")
+            if not add_in_chunks(equipment_items_data, create_equipment): return None
+            timings["機材"] = (time.perf_counter() - phase_start) * 1000
             
-            # 機材だけでなくコンセントもマップに入っているので検索可能
-            start_item = created_items_map.get(start_id)
-            end_item = created_items_map.get(end_id)
+            # 5. 配線の復元
+            phase_start = time.perf_counter()
             
-            if start_item and end_item:
+            def create_wire(wire_data: dict) -> WiringItem | None:
+                start_id = wire_data.get("start_item_id")
+                end_id = wire_data.get("end_item_id")
+                
+                # 機材だけでなくコンセントもマップに入っているので検索可能
+                start_item = created_items_map.get(start_id)
+                end_item = created_items_map.get(end_id)
+                
+                if not (start_item and end_item): return None
                 middle_points_data = wire_data.get("points", [])
                 middle_points = [QPointF(p['x'], p['y']) for p in middle_points_data]
                 
                 wire_category = wire_data.get("wire_category", "dmx")
-                
-                wire = WiringItem(start_item, end_item, middle_points, wire_type=wire_category)
-                self.view.scene().addItem(wire)
-                
-        self.current_file_path = file_path
-        self.undoStack.clear()
-        self.undoStack.setClean()
-        file_name = file_path.split('/')[-1]
-        self.setWindowTitle(f"{file_name} - DMX Layout Tool")
+                return WiringItem(start_item, end_item, middle_points, wire_type=wire_category,
+                                  instance_id=wire_data.get("instance_id"))
+            
+            if not add_in_chunks(wires_data, create_wire): return None
+            timings["配線"] = (time.perf_counter() - phase_start) * 1000
+        finally:
+            # 索引の再構築は最後に一度だけ
+            phase_start = time.perf_counter()
+            scene.end_bulk_load()
+            timings["索引"] = (time.perf_counter() - phase_start) * 1000
+            progress.close()
+        return timings
     
     def new_file(self) -> None:
         """新規レイアウトを作成"""
@@ -494,6 +652,7 @@ class MainWindow(QMainWindow):
         self.view._cancel_wiring()
         self.view.scene().clear()
         self.current_file_path = None
+        self.journal.clear()
         # self.is_modified = False
         self.undoStack.clear() # 新規作成時はUndoスタックをクリア
         self.undoStack.setClean() # 新規作成時はUndoスタックをクリーン状態に
@@ -516,10 +675,16 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event: QCloseEvent) -> None:
         """ウィンドウを閉じる際のイベント処理"""
         if self.check_unsaved_changes():
+            self.autosave.shutdown()  # 書き込み中の自動保存を待つ
             event.accept()
         else:
             event.ignore()
     
+    def _on_scene_changed(self, region: list) -> None:
+        """シーン変更時の処理（ドラッグ中は dragFlushed に任せる）"""
+        if not self.scene.is_dragging():
+            self.update_properties_panel()
+    
     def update_properties_panel(self) -> None:
         """選択アイテムに応じてプロパティパネルを更新"""
         # シグナルブロック
@@ -636,7 +801,8 @@ class MainWindow(QMainWindow):
     def on_property_edited(self) -> None:
         """プロパティ編集時の処理"""
         sender = self.sender()
-        selected_items = [item for item in self.view.scene().selectedItems() if isinstance(item, EquipmentItem)]
+        scene = self.view.scene()
+        selected_items = [item for item in scene.selectedItems() if isinstance(item, EquipmentItem)]
         if not selected_items: return
         
         prop_name = None
@@ -678,6 +844,7 @@ class MainWindow(QMainWindow):
                     if item.has_dmx and item.dmx_mode_name != new_mode:
                         item.dmx_mode_name = new_mode
                         item.updateDmxText() # 表示更新
+                        scene.mark_dirty(item)  # 差分保存の対象にする
                         # Undo実装時はここで Command を push する
             
             elif sender is self.spin_universe:
@@ -686,6 +853,7 @@ class MainWindow(QMainWindow):
                     if item.has_dmx and item.dmx_universe != new_univ:
                         item.dmx_universe = new_univ
                         item.updateDmxText()
+                        scene.mark_dirty(item)
             
             elif sender is self.spin_address:
                 new_addr = self.spin_address.value()
@@ -693,6 +861,7 @@ class MainWindow(QMainWindow):
                     if item.has_dmx and item.dmx_address != new_addr:
                         item.dmx_address = new_addr
                         item.updateDmxText()
+                        scene.mark_dirty(item)
         
         except ValueError:
             print("無効な値が入力されました。")
@@ -736,8 +905,11 @@ class MainWindow(QMainWindow):
         result = dialog.exec()
         if result == QDialog.Accepted:
             self.equipment_data = dialog.get_updated_data()
+            self.library.set_data(self.equipment_data)
             self.update_main_tree()
             self._save_equipment_data()
+            IMAGE_RESOLVER.invalidate()  # 画像パスが変更されている可能性があるため
+            PIXMAP_CACHE.invalidate()
             self.update_all_scene_equipment_items()
             # self.on_scene_changed()
         else:
@@ -776,6 +948,8 @@ class MainWindow(QMainWindow):
                 { "id": "folder_2", "type": "folder", "name": "その他オブジェクト", "children": [] }
             ]
             self._save_equipment_data()
+        # ID 索引を構築（機材の検索はこれを使う）
+        self.library = EquipmentLibrary(self.equipment_data)
     
     def _save_equipment_data(self) -> None:
         """機材データをファイルに保存"""
@@ -789,30 +963,25 @@ class MainWindow(QMainWindow):
         """シーン上の全EquipmentItemを最新データで更新"""
         items_to_remove = []
         wires_to_remove = []
-        all_wires = [item for item in self.view.scene().items() if isinstance(item, WiringItem)]
-        items_to_process = [item for item in self.view.scene().items() if isinstance(item, EquipmentItem)]
+        items_to_process = self.view.scene().items_of(EquipmentItem)
         for item in items_to_process:
-            updated_info = self._find_data_by_id(self.equipment_data, item.type_id)
+            updated_info = self.library.find(item.type_id)
             if updated_info:
                 # 保持しているデータも最新に更新する（消費電力の変更などを反映させるため）
-                item.setData(0, updated_info)
+                item.set_type_info(updated_info, self.library.mode_table(item.type_id))
                 item.name = updated_info["name"]
                 item.can_be_wired = updated_info["can_be_wired"]
+                self.scene.power_graph.update_equipment(item)
                 
-                img_path = updated_info["image_path"]
-                if not os.path.exists(img_path):
-                    alt_path = os.path.join(constants.DATA_DIR, img_path)
-                    if os.path.exists(alt_path):
-                        img_path = alt_path
-                    else:
-                        name_only = os.path.basename(img_path)
-                        alt_path_2 = os.path.join(constants.IMAGES_DIR, name_only)
-                        if os.path.exists(alt_path_2):
-                            img_path = alt_path_2
-                
-                pixmap = QPixmap(img_path)
-                item.image.setPixmap(pixmap.scaledToWidth(50, Qt.SmoothTransformation))
+                img_path = IMAGE_RESOLVER.resolve(updated_info["image_path"])
+                item.update_bounds()  # 画像とラベルが変わるので外接矩形を作り直す
+                original_width = PIXMAP_CACHE.source_size(img_path).width()
+                if original_width > 0:
+                    item.scale_ratio = item.target_width / original_width
+                item.image.set_image(img_path, item.target_width)
                 item.image.setTransformOriginPoint(item.image.boundingRect().center())
+                # 画像サイズが変わるとスナップ点の位置も変わる
+                item.refresh_snap_points()
                 item.text.setText(item.name)
                 text_rect = item.text.boundingRect()
                 image_rect = item.image.boundingRect()
@@ -823,16 +992,27 @@ class MainWindow(QMainWindow):
                 item.update()
             else:
                 items_to_remove.append(item)
-                for wire in all_wires:
-                    if wire.start_item is item or wire.end_item is item:
-                        if wire not in wires_to_remove:
-                            wires_to_remove.append(wire)
+                for wire in item.attached_wires:
+                    if wire not in wires_to_remove:
+                        wires_to_remove.append(wire)
         for wire in wires_to_remove:
             if wire.scene(): 
                 self.view.scene().removeItem(wire)
         for item in items_to_remove:
             if item.scene(): 
                 self.view.scene().removeItem(item)
+        self.report_missing_images()
+    
+    def report_missing_images(self) -> None:
+        """見つからなかった機材画像をまとめて通知"""
+        missing = IMAGE_RESOLVER.take_missing()
+        if not missing:
+            return
+        print(f"画像が見つかりません ({len(missing)}件): {', '.join(missing)}")
+        lines = "\n".join(missing[:10])
+        if len(missing) > 10:
+            lines += f"\n...他 {len(missing) - 10} 件"
+        QMessageBox.warning(self, "画像が見つかりません", f"以下の機材画像が見つかりませんでした:\n{lines}")
     
     def _set_mode(self, mode: str) -> None:
         """操作モードの切り替え"""
@@ -864,17 +1044,6 @@ class MainWindow(QMainWindow):
             # 現在のチェックボックスの状態を適用
             self.update_wire_visibility()
     
-    def _find_data_by_id(self, data_list: list[dict], target_id: str) -> dict | None:
-        """IDでデータを再帰検索"""
-        for item in data_list:
-            if item.get("id") == target_id:
-                return item
-            if item.get("type") == "folder" and "children" in item:
-                found = self._find_data_by_id(item["children"], target_id)
-                if found:
-                    return found
-        return None
-    
     def toggle_grid(self, checked: bool) -> None:
         """グリッド表示のON/OFF切替"""
         self.view.show_grid = checked
@@ -886,13 +1055,12 @@ class MainWindow(QMainWindow):
         show_dmx = self.show_dmx_check.isChecked()
         show_power = self.show_power_check.isChecked()
         
-        for item in self.view.scene().items():
-            if isinstance(item, WiringItem):
-                w_type = item.wire_type
-                if w_type == "dmx":
-                    item.setVisible(show_dmx)
-                elif w_type == "power":
-                    item.setVisible(show_power)
+        for item in self.view.scene().items_of(WiringItem):
+            w_type = item.wire_type
+            if w_type == "dmx":
+                item.setVisible(show_dmx)
+            elif w_type == "power":
+                item.setVisible(show_power)
     
     def open_venue_manager(self) -> None:
         """会場管理ダイアログを開く"""
@@ -910,9 +1078,8 @@ class MainWindow(QMainWindow):
             self.current_venue_item = None
         
         # 既存のコンセントアイテムも削除
-        for item in self.scene.items():
-            if isinstance(item, OutletItem):
-                self.scene.removeItem(item)
+        for item in self.scene.items_of(OutletItem):
+            self.scene.removeItem(item)
             
         walls_data = venue_data.get("walls", [])
         points_list = []
@@ -934,6 +1101,69 @@ class MainWindow(QMainWindow):
             
         print(f"会場 '{venue_data.get('name')}' を適用しました。(コンセント: {count}個)")
     
+    def auto_route_wires(self) -> None:
+        """選択中のアイテム同士の配線と、選択中の機材を含む DMX チェーンを自動ルーティング"""
+        wires = wires_to_route(self.scene.selectedItems())
+        if not wires:
+            QMessageBox.information(self, "自動ルーティング", "配線のつながった機材・コンセントを選択してください。")
+            return
+        progress = QProgressDialog("配線の経路を探索しています...", "キャンセル", 0, len(wires), self)
+        progress.setWindowTitle("自動ルーティング")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)  # すぐ終わる探索ではダイアログを出さない
+        
+        def report(done: int, total: int) -> bool:
+            """探索の進捗を表示し、イベントループに処理を返す（キャンセルされたら False）"""
+            progress.setMaximum(total)
+            progress.setValue(done)
+            QApplication.processEvents()
+            return not progress.wasCanceled()
+        
+        start = time.perf_counter()
+        routes = route_wires(self.scene, wires, report)
+        progress.close()
+        if routes is None:
+            print("自動ルーティングを中止しました。")
+            return
+        print(f"自動ルーティング: {len(routes)}/{len(wires)} 本 ({time.perf_counter() - start:.2f}s)")
+        if routes:
+            self.undoStack.push(CommandRouteWires([(wire, list(wire.middle_points), points) for wire, points in routes.items()]))
+        failed = len(wires) - len(routes)
+        if failed:
+            QMessageBox.warning(self, "自動ルーティング", f"{failed} 本の配線は障害物を避ける経路が見つかりませんでした。")
+    
+    def auto_patch_selected(self) -> None:
+        """選択中の DMX 機材にユニバース・アドレスをまとめて割り当てる"""
+        targets = [item for item in self.scene.selectedItems()
+                   if isinstance(item, EquipmentItem) and item.has_dmx and not item.data(0).get("is_controller", False)]
+        if not targets:
+            QMessageBox.information(self, "自動パッチ", "DMX機材を選択してください。")
+            return
+        dialog = AutoPatchDialog(len(targets), self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        options = dialog.get_options()
+        
+        start = time.perf_counter()
+        occupancy = None
+        if options["avoid_existing"]:
+            selected = set(targets)
+            others = [item for item in self.scene.items_of(EquipmentItem)
+                      if item.has_dmx and item not in selected and not item.data(0).get("is_controller", False)]
+            occupancy = UniverseOccupancy.from_items(others)
+        ordered = order_fixtures(targets, options["order"])
+        assignments, failed = auto_patch(
+            [(item, item.dmx_channels) for item in ordered], options["packing"],
+            options["start_universe"], options["start_address"], options["universe_limit"],
+            options["reserved"], occupancy)
+        changes = [(item, (item.dmx_universe, item.dmx_address, item.dmx_mode_name), (universe, address, item.dmx_mode_name))
+                   for item, (universe, address) in assignments.items()]
+        if changes:
+            self.undoStack.push(CommandChangeDmx(changes, "自動パッチ"))
+        print(f"自動パッチ: {len(assignments)}/{len(targets)} 台 ({time.perf_counter() - start:.2f}s)")
+        if failed:
+            QMessageBox.warning(self, "自動パッチ", f"{len(failed)} 台は空きアドレス範囲が見つからなかったため割り当てられませんでした。\n（チャンネル上限・予約範囲を確認してください）")
+    
     def show_power_report(self) -> None:
         """電力計算レポートダイアログを表示"""
         report_data = self.calculate_power()
@@ -941,7 +1171,7 @@ class MainWindow(QMainWindow):
         dialog.exec()
     
     def calculate_power(self) -> dict:
-        """シーン内の電力使用状況を計算"""
+        """シーン内の電力使用状況を取得（PowerGraph が差分で更新した集計を使う）"""
         """
         戻り値の構造:
         {
@@ -959,103 +1189,7 @@ class MainWindow(QMainWindow):
             "unpowered": [itemA, itemB...]
         }
         """
-        # 1. グラフ構築 (隣接リスト) - 電源線のみ
-        adj = {}
-        for item in self.scene.items():
-            if isinstance(item, WiringItem) and item.wire_type == "power":
-                u, v = item.start_item, item.end_item
-                if u and v:
-                    adj.setdefault(u, []).append(v)
-                    adj.setdefault(v, []).append(u)
-        
-        # 2. 全ての機材とコンセントを取得
-        all_equipment = [i for i in self.scene.items() if isinstance(i, EquipmentItem)]
-        all_outlets = [i for i in self.scene.items() if isinstance(i, OutletItem)]
-        
-        # 配線済み機材の集合（未配線検出用）
-        powered_equipment = set()
-        
-        # 結果格納用データ
-        circuits_data = {} 
-        
-        # 3. 各コンセントから探索 (BFS)
-        for outlet in all_outlets:
-            circuit_id = outlet.info.get("circuit_id", "Unknown")
-            circuit_cap = int(outlet.info.get("circuit_capacity", 2000))
-            tap_cap = int(outlet.info.get("tap_capacity", 1500))
-            
-            # 回路データエントリの初期化
-            if circuit_id not in circuits_data:
-                circuits_data[circuit_id] = {
-                    "limit": circuit_cap,
-                    "total_watts": 0,
-                    "outlets": {}
-                }
-            
-            # このコンセント（タップ）のデータ初期化
-            outlet_data = {
-                "limit": tap_cap,
-                "total_watts": 0,
-                "equipment": []
-            }
-            
-            # BFS探索
-            visited = set()
-            queue = [outlet]
-            visited.add(outlet)
-            
-            while queue:
-                current = queue.pop(0)
-                
-                # 隣接ノードへ
-                neighbors = adj.get(current, [])
-                for neighbor in neighbors:
-                    if neighbor in visited:
-                        continue
-                    
-                    # 他のコンセントにぶつかったら探索停止（通常はありえないが、電源同士がつながっている場合）
-                    if isinstance(neighbor, OutletItem):
-                        continue
-                        
-                    visited.add(neighbor)
-                    
-                    # 機材なら電力を加算
-                    if isinstance(neighbor, EquipmentItem):
-                        # 配線可能かつ電源を消費するものだけ計算
-                        if neighbor.can_be_wired:
-                            # 既に他の電源から供給されているかチェック（多重給電の警告は今回は省略し、先に探索した方を優先）
-                            if neighbor not in powered_equipment:
-                                watts = neighbor.data(0).get("power_consumption", 0)
-                                outlet_data["total_watts"] += watts
-                                outlet_data["equipment"].append(neighbor)
-                                powered_equipment.add(neighbor)
-                                
-                                # さらにその先へ
-                                queue.append(neighbor)
-            
-            # 集計結果を格納
-            circuits_data[circuit_id]["outlets"][outlet] = outlet_data
-            circuits_data[circuit_id]["total_watts"] += outlet_data["total_watts"]
-        
-        # 4. 未配線の機材を特定
-        # (カテゴリーがdeviceで、かつ配線可能フラグがTrueのもの)
-        unpowered_list = []
-        for eq in all_equipment:
-            # データの取得
-            d = eq.data(0)
-            # コンセント(outlet)ではなく、配線可能(can_be_wired)で、まだ給電リストにない場合
-            # ※ EquipmentItemにはカテゴリー情報が直接ないので、can_be_wiredで判断するか、
-            #    EquipmentManagerでoutletとして作ったものは弾く必要があるが、
-            #    現状の設計ではEquipmentItemは全て「機材」扱いなのでOK
-            if eq.can_be_wired and eq not in powered_equipment:
-                # ワット数が0より大きいものだけを警告対象にする場合
-                if d.get("power_consumption", 0) > 0:
-                    unpowered_list.append(eq)
-        
-        return {
-            "circuits": circuits_data,
-            "unpowered": unpowered_list
-        }
+        return self.scene.power_graph.report()
     
     def update_arrange_actions_state(self) -> None:
         """配置メニューの有効/無効を更新"""
@@ -1136,11 +1270,6 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
         
-        # PNGの場合、ファイル名から拡張子を除いておく
-        base_path = file_path
-        if options["format"] == "png" and file_path.lower().endswith(".png"):
-            base_path = file_path[:-4]
-        
         # 表出力が選択されている場合はプレビュー画面を表示（ユーザー確認用）
         dmx_html = ""
         pwr_html = ""
@@ -1174,6 +1303,21 @@ class MainWindow(QMainWindow):
                 pwr_html = preview_dlg.get_power_html()
         
         # --- 以下、既存のエクスポート処理 (引数に html を渡すように変更) ---
+        try:
+            self.export_pages(file_path, options, dmx_html, pwr_html)
+            QMessageBox.information(self, "完了", "エクスポートが完了しました。")
+            
+        except Exception as e:
+            QMessageBox.critical(self, "エラー", f"エクスポート中にエラーが発生しました:\n{e}")
+            import traceback
+            traceback.print_exc()
+    
+    def export_pages(self, file_path: str, options: dict, dmx_html: str = "", pwr_html: str = "") -> None:
+        """グリッド・配線表示を一時的に切り替えて PDF / PNG を出力する（バッチ出力からも使用）"""
+        # PNGの場合、ファイル名から拡張子を除いておく
+        base_path = file_path
+        if options["format"] == "png" and file_path.lower().endswith(".png"):
+            base_path = file_path[:-4]
         
         original_dmx_vis = self.show_dmx_check.isChecked()
         original_pwr_vis = self.show_power_check.isChecked()
@@ -1188,14 +1332,6 @@ class MainWindow(QMainWindow):
                 self._export_to_pdf(file_path, options, dmx_html, pwr_html)
             else:
                 self._export_to_png(base_path, options, dmx_html, pwr_html)
-                
-            QMessageBox.information(self, "完了", "エクスポートが完了しました。")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "エラー", f"エクスポート中にエラーが発生しました:\n{e}")
-            import traceback
-            traceback.print_exc()
-            
         finally:
             self.show_dmx_check.setChecked(original_dmx_vis)
             self.show_power_check.setChecked(original_pwr_vis)
@@ -1205,12 +1341,11 @@ class MainWindow(QMainWindow):
     
     def _set_scene_visibility(self, show_dmx: bool, show_pwr: bool) -> None:
         """エクスポート用の一時的な配線表示切替"""
-        for item in self.view.scene().items():
-            if isinstance(item, WiringItem):
-                if item.wire_type == "dmx":
-                    item.setVisible(show_dmx)
-                elif item.wire_type == "power":
-                    item.setVisible(show_pwr)
+        for item in self.view.scene().items_of(WiringItem):
+            if item.wire_type == "dmx":
+                item.setVisible(show_dmx)
+            elif item.wire_type == "power":
+                item.setVisible(show_pwr)
     
     def _render_scene_to_painter(self, painter: QPainter, target_rect: QRectF) -> None:
         """シーンを指定Painter領域に描画"""
@@ -1392,7 +1527,7 @@ class MainWindow(QMainWindow):
     
     def _generate_dmx_list_html(self) -> str:
         """DMX機材一覧のHTMLテーブル（配色修正版）"""
-        items = [i for i in self.view.scene().items() if isinstance(i, EquipmentItem) and i.has_dmx]
+        items = [i for i in self.view.scene().items_of(EquipmentItem) if i.has_dmx]
         items.sort(key=lambda x: (x.dmx_universe, x.dmx_address))
         
         # style属性で 色（color: black）と背景（background-color）を明示的に指定
@@ -1402,12 +1537,7 @@ class MainWindow(QMainWindow):
         html += "<tr style='background-color: #555; color: white;'><th>Univ</th><th>Addr</th><th>機材名</th><th>モード</th><th>Ch数</th></tr>"
         
         for i, item in enumerate(items):
-            modes = item.data(0).get("dmx_modes", [])
-            ch_count = 1
-            for m in modes:
-                if m["name"] == item.dmx_mode_name:
-                    ch_count = m.get("channels", 1)
-                    break
+            ch_count = item.dmx_channels
             
             # 縞々模様（偶数行に薄いグレー）をつけて読みやすくする
             bg_color = "#f9f9f9" if i % 2 == 0 else "#ffffff"
@@ -1490,6 +1620,10 @@ class MainWindow(QMainWindow):
                 self.undoStack.push(cmd)
 
 if __name__ == "__main__":
+    # python main.py export ... : 画面なしでの一括出力
+    if sys.argv[1:2] == ["export"]:
+        import batch_export
+        sys.exit(batch_export.main(sys.argv[2:]))
     constants.ensure_data_directories()
     app = QApplication(sys.argv)
     window = MainWindow()
@@ -0,0 +1,124 @@
+import os
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QSize
+from PySide6.QtGui import QPixmap, QImageReader
+
+import constants
+
+
+class PixmapCache:
+    """プロセス全体で共有する QPixmap の LRU キャッシュ（パス・幅・更新時刻をキーとする）
+
+    更新時刻はパス毎に一度だけ調べて記憶する。画像ファイルを差し替えた時は invalidate で調べ直す。
+    """
+    def __init__(self, limit_bytes: int, size_limit: int = constants.PIXMAP_SIZE_CACHE_LIMIT) -> None:
+        """初期化処理"""
+        self.limit_bytes = limit_bytes
+        self.size_limit = size_limit
+        self._pixmaps: OrderedDict[tuple, tuple[QPixmap, int]] = OrderedDict()
+        self._sizes: OrderedDict[tuple[str, float | None], QSize] = OrderedDict()
+        # パス → 更新時刻（一度だけ stat し、invalidate されるまで使い回す）
+        self._mtimes: dict[str, float | None] = {}
+        self._total_bytes = 0
+
+    @staticmethod
+    def _stat_mtime(path: str) -> float | None:
+        """ファイルの更新時刻（存在しなければ None）"""
+        try:
+            return os.path.getmtime(path)
+        except (OSError, TypeError):
+            return None
+
+    def _mtime(self, path: str) -> float | None:
+        """記憶しておいた更新時刻（初回のみ stat する）"""
+        if path in self._mtimes:
+            return self._mtimes[path]
+        mtime = self._stat_mtime(path)
+        self._mtimes[path] = mtime
+        return mtime
+
+    @staticmethod
+    def _cost(pixmap: QPixmap) -> int:
+        """ピクセルデータのおおよそのバイト数"""
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def _lookup(self, key: tuple) -> QPixmap | None:
+        """キャッシュから取得（最近使った順を更新）"""
+        entry = self._pixmaps.get(key)
+        if entry is None:
+            return None
+        self._pixmaps.move_to_end(key)
+        return entry[0]
+
+    def _store(self, key: tuple, pixmap: QPixmap) -> None:
+        """キャッシュに格納し、上限を超えた分を古い順に破棄"""
+        cost = self._cost(pixmap)
+        if cost > self.limit_bytes:
+            return  # 単体で上限を超えるものはキャッシュしない
+        self._pixmaps[key] = (pixmap, cost)
+        self._total_bytes += cost
+        while self._total_bytes > self.limit_bytes and self._pixmaps:
+            _, (_, old_cost) = self._pixmaps.popitem(last=False)
+            self._total_bytes -= old_cost
+
+    def pixmap(self, path: str) -> QPixmap:
+        """元サイズの画像を取得"""
+        key = (path, None, self._mtime(path))
+        pixmap = self._lookup(key)
+        if pixmap is None:
+            pixmap = QPixmap(path)
+            self._store(key, pixmap)
+        return pixmap
+
+    def scaled_to_width(self, path: str, width: int) -> QPixmap:
+        """指定幅に縮小した画像を取得（同じパス・幅なら全アイテムで同じ画像を共有）"""
+        key = (path, int(width), self._mtime(path))
+        pixmap = self._lookup(key)
+        if pixmap is None:
+            # 縮小後の画像だけを保持する（元画像はキャッシュに載せない）
+            pixmap = QPixmap(path).scaledToWidth(int(width), Qt.SmoothTransformation)
+            self._store(key, pixmap)
+        return pixmap
+
+    def source_size(self, path: str) -> QSize:
+        """元画像のサイズ（画像ヘッダのみ読み込む）"""
+        key = (path, self._mtime(path))
+        size = self._sizes.get(key)
+        if size is None:
+            size = QImageReader(path).size() if key[1] is not None else QSize()
+            if key[1] is not None and not size.isValid():
+                size = QPixmap(path).size()  # ヘッダからサイズが取れない形式
+            self._sizes[key] = size
+            while len(self._sizes) > self.size_limit:
+                self._sizes.popitem(last=False)
+        else:
+            self._sizes.move_to_end(key)
+        return QSize(size)
+
+    def invalidate(self, path: str | None = None) -> None:
+        """更新時刻を調べ直し、変わった画像のキャッシュを破棄（path 省略時は記憶している全パス）"""
+        paths = [path] if path is not None else list(self._mtimes)
+        stale = set()
+        for p in paths:
+            old = self._mtimes.pop(p, None)
+            if self._mtime(p) != old:
+                stale.add(p)
+        if not stale:
+            return
+        for key in [key for key in self._pixmaps if key[0] in stale]:
+            _, cost = self._pixmaps.pop(key)
+            self._total_bytes -= cost
+        for key in [key for key in self._sizes if key[0] in stale]:
+            del self._sizes[key]
+
+    def clear(self) -> None:
+        """全て破棄"""
+        self._pixmaps.clear()
+        self._sizes.clear()
+        self._mtimes.clear()
+        self._total_bytes = 0
+
+
+# 全ての機材アイテム・プレビューで共有するキャッシュ
+PIXMAP_CACHE = PixmapCache(constants.PIXMAP_CACHE_LIMIT_BYTES)
@@ -0,0 +1,281 @@
+"""電源系統の増分計算
+
+電源線でつながった機材のまとまり（コンセントを通り抜けない連結成分）毎に、給電元の
+コンセント（つながっているコンセントのうち最初に配置されたもの）と合計消費電力を保持する。
+配線・機材・コンセントの追加削除では影響する成分だけを次の参照時に作り直し、
+コンセント毎・回路毎の合計を差分で更新する。
+
+LayoutScene がアイテムの追加・削除の度に add_item / remove_item を呼ぶため、
+配線の追加・削除コマンドや読み込みはすべてここを通る。
+"""
+from collections import deque
+
+from PySide6.QtCore import Qt, QPointF, QRectF
+from PySide6.QtGui import QColor, QFont, QFontMetricsF, QPainter
+from PySide6.QtWidgets import QGraphicsItem
+
+from items import EquipmentItem, OutletItem, WiringItem
+
+
+class _Component:
+    """電源線でつながった機材のまとまり"""
+    __slots__ = ("members", "feeder", "watts")
+
+    def __init__(self, members: list[EquipmentItem], feeder: OutletItem | None, watts: float) -> None:
+        """初期化処理"""
+        self.members = members
+        self.feeder = feeder
+        self.watts = watts
+
+
+class PowerGraph:
+    """電源線のグラフと、コンセント毎・回路毎の消費電力の合計"""
+    def __init__(self) -> None:
+        """初期化処理"""
+        # 隣接リスト（相手 → 電源線の本数）
+        self._adjacency: dict[QGraphicsItem, dict[QGraphicsItem, int]] = {}
+        self._equipment: dict[EquipmentItem, None] = {}  # 配置順
+        self._outlets: dict[OutletItem, int] = {}  # コンセント → 配置順
+        self._outlet_circuit: dict[OutletItem, str] = {}
+        self._outlet_count = 0
+        self._component_of: dict[EquipmentItem, _Component] = {}
+        self._outlet_components: dict[OutletItem, dict[_Component, None]] = {}
+        self._outlet_watts: dict[OutletItem, float] = {}
+        self._circuit_watts: dict[str, float] = {}
+        # 次の参照時に成分を作り直すアイテム
+        self._dirty: dict[QGraphicsItem, None] = {}
+        self._report: dict | None = None
+        # 合計が変わる度に増える版（表示の更新判定用）
+        self.version = 0
+
+    # === グラフの更新 ===
+    def add_item(self, item: QGraphicsItem) -> None:
+        """アイテムの追加を反映"""
+        if isinstance(item, WiringItem):
+            self._add_wire(item)
+        elif isinstance(item, EquipmentItem):
+            self._equipment[item] = None
+            self._dirty[item] = None
+        elif isinstance(item, OutletItem):
+            self._outlets[item] = self._outlet_count
+            self._outlet_count += 1
+            circuit_id = item.info.get("circuit_id", "Unknown")
+            self._outlet_circuit[item] = circuit_id
+            self._outlet_components[item] = {}
+            self._outlet_watts[item] = 0
+            self._circuit_watts.setdefault(circuit_id, 0)
+            self._dirty[item] = None
+
+    def remove_item(self, item: QGraphicsItem) -> None:
+        """アイテムの削除を反映"""
+        if isinstance(item, WiringItem):
+            self._remove_wire(item)
+        elif isinstance(item, EquipmentItem):
+            self._equipment.pop(item, None)
+            self._dirty[item] = None
+        elif isinstance(item, OutletItem) and item in self._outlets:
+            # 給電していた成分は別のコンセントにつながっていないか調べ直す
+            for component in list(self._outlet_components[item]):
+                self._drop(component)
+                self._dirty.update(dict.fromkeys(component.members))
+            del self._outlets[item]
+            del self._outlet_components[item]
+            del self._outlet_watts[item]
+            circuit_id = self._outlet_circuit.pop(item)
+            if circuit_id not in self._outlet_circuit.values():
+                del self._circuit_watts[circuit_id]
+            self._report = None
+            self.version += 1
+
+    def update_equipment(self, item: EquipmentItem) -> None:
+        """機材の消費電力・配線可否の変更を反映（機材ライブラリの更新時）"""
+        self._dirty[item] = None
+
+    def _add_wire(self, wire: WiringItem) -> None:
+        """電源線を隣接リストに追加"""
+        if wire.wire_type != "power" or not wire.start_item or not wire.end_item:
+            return
+        for u, v in ((wire.start_item, wire.end_item), (wire.end_item, wire.start_item)):
+            neighbors = self._adjacency.setdefault(u, {})
+            neighbors[v] = neighbors.get(v, 0) + 1
+            self._dirty[u] = None
+
+    def _remove_wire(self, wire: WiringItem) -> None:
+        """電源線を隣接リストから外す"""
+        if wire.wire_type != "power" or not wire.start_item or not wire.end_item:
+            return
+        for u, v in ((wire.start_item, wire.end_item), (wire.end_item, wire.start_item)):
+            neighbors = self._adjacency.get(u, {})
+            if neighbors.get(v, 0) > 1:
+                neighbors[v] -= 1
+            else:
+                neighbors.pop(v, None)
+                if not neighbors:
+                    self._adjacency.pop(u, None)
+            self._dirty[u] = None
+
+    # === 成分の作り直し ===
+    def _refresh(self) -> None:
+        """変更のあったアイテムを含む成分だけを作り直す"""
+        if not self._dirty:
+            return
+        dirty = list(self._dirty)
+        self._dirty = {}
+        seeds = []
+        for item in dirty:
+            if isinstance(item, OutletItem):
+                seeds.extend(self._adjacency.get(item, ()))
+            else:
+                seeds.append(item)
+        # 古い成分を外し、その機材も作り直しの対象にする（seeds は走査中に伸びる）
+        for item in seeds:
+            component = self._component_of.get(item)
+            if component is not None:
+                self._drop(component)
+                seeds.extend(component.members)
+        for item in seeds:
+            if item not in self._component_of and item in self._equipment and item.can_be_wired:
+                self._build(item)
+        self._report = None
+        self.version += 1
+
+    def _connected(self, start: QGraphicsItem, outlets: set[OutletItem] | None = None,
+                   within: set[EquipmentItem] | None = None) -> list[EquipmentItem]:
+        """start から電源線をたどれる機材（幅優先順。within があればその中だけ）。コンセントは通り抜けず outlets に集める"""
+        members = []
+        visited = {start}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            for neighbor in self._adjacency.get(current, ()):
+                if neighbor in visited or (within is not None and neighbor not in within and neighbor not in self._outlets):
+                    continue
+                visited.add(neighbor)
+                if neighbor in self._outlets:
+                    if outlets is not None:
+                        outlets.add(neighbor)
+                elif neighbor in self._equipment and neighbor.can_be_wired:
+                    members.append(neighbor)
+                    queue.append(neighbor)
+        return members
+
+    def _build(self, seed: EquipmentItem) -> None:
+        """seed を含む成分を作り、給電元のコンセントに合計を加える"""
+        outlets = set()
+        members = [seed] + self._connected(seed, outlets)
+        feeder = min(outlets, key=self._outlets.__getitem__) if outlets else None
+        if feeder is not None and len(members) > 1:
+            # 給電元から近い順に並べる（同じコンセントにつながる他の成分は除く）
+            members = self._connected(feeder, within=set(members))
+        watts = sum(member.data(0).get("power_consumption", 0) for member in members)
+        component = _Component(members, feeder, watts)
+        for member in members:
+            self._component_of[member] = component
+        if feeder is not None:
+            self._outlet_components[feeder][component] = None
+            self._outlet_watts[feeder] += watts
+            self._circuit_watts[self._outlet_circuit[feeder]] += watts
+
+    def _drop(self, component: _Component) -> None:
+        """成分を外し、給電元の合計から差し引く"""
+        for member in component.members:
+            if self._component_of.get(member) is component:
+                del self._component_of[member]
+        feeder = component.feeder
+        components = self._outlet_components.get(feeder)
+        if components is not None and component in components:
+            del components[component]
+            self._outlet_watts[feeder] -= component.watts
+            self._circuit_watts[self._outlet_circuit[feeder]] -= component.watts
+
+    # === 集計結果 ===
+    def outlet_watts(self, outlet: OutletItem) -> float:
+        """コンセント（タップ）から給電している消費電力の合計"""
+        self._refresh()
+        return self._outlet_watts.get(outlet, 0)
+
+    def circuit_watts(self, circuit_id: str) -> float:
+        """回路の消費電力の合計"""
+        self._refresh()
+        return self._circuit_watts.get(circuit_id, 0)
+
+    def feeder_of(self, item: EquipmentItem) -> OutletItem | None:
+        """機材に給電しているコンセント（未接続なら None）"""
+        self._refresh()
+        component = self._component_of.get(item)
+        return component.feeder if component is not None else None
+
+    def overloads(self) -> list[tuple[OutletItem, bool, bool]]:
+        """容量を超えているコンセント (コンセント, タップ超過, 回路超過)"""
+        self._refresh()
+        result = []
+        for outlet, circuit_id in self._outlet_circuit.items():
+            tap_over = self._outlet_watts[outlet] > int(outlet.info.get("tap_capacity", 1500))
+            circuit_over = self._circuit_watts[circuit_id] > int(outlet.info.get("circuit_capacity", 2000))
+            if tap_over or circuit_over:
+                result.append((outlet, tap_over, circuit_over))
+        return result
+
+    def report(self) -> dict:
+        """電力計算レポート（MainWindow.calculate_power と同じ構造。変更があるまで同じものを返す）"""
+        self._refresh()
+        if self._report is not None:
+            return self._report
+        circuits = {}
+        for outlet, circuit_id in self._outlet_circuit.items():
+            circuit = circuits.setdefault(circuit_id, {
+                "limit": int(outlet.info.get("circuit_capacity", 2000)),
+                "total_watts": self._circuit_watts[circuit_id],
+                "outlets": {}
+            })
+            circuit["outlets"][outlet] = {
+                "limit": int(outlet.info.get("tap_capacity", 1500)),
+                "total_watts": self._outlet_watts[outlet],
+                "equipment": [member for component in self._outlet_components[outlet] for member in component.members]
+            }
+        unpowered = []
+        for item in self._equipment:
+            component = self._component_of.get(item)
+            if item.can_be_wired and (component is None or component.feeder is None):
+                if item.data(0).get("power_consumption", 0) > 0:
+                    unpowered.append(item)
+        self._report = {"circuits": circuits, "unpowered": unpowered}
+        return self._report
+
+
+class PowerBadgeOverlay:
+    """容量を超えたコンセントの横に消費電力のバッジを描画する（ズームによらず画面px固定の大きさ）"""
+    def __init__(self) -> None:
+        """初期化処理"""
+        self._font = QFont()
+        self._font.setPointSizeF(9)
+        self._font.setBold(True)
+        self._color = QColor(220, 0, 0, 230)  # バッジの背景
+
+    def draw(self, painter: QPainter, graph: PowerGraph) -> None:
+        """容量超過のコンセント毎にバッジを描画"""
+        overloads = graph.overloads()
+        if not overloads:
+            return
+        transform = painter.worldTransform()
+        metrics = QFontMetricsF(self._font)
+        painter.save()
+        painter.resetTransform()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(self._font)
+        for outlet, tap_over, circuit_over in overloads:
+            lines = []
+            if tap_over:
+                lines.append(f"タップ {graph.outlet_watts(outlet):g}/{int(outlet.info.get('tap_capacity', 1500))}W")
+            if circuit_over:
+                circuit_id = outlet.info.get("circuit_id", "Unknown")
+                lines.append(f"回路 {circuit_id} {graph.circuit_watts(circuit_id):g}/{int(outlet.info.get('circuit_capacity', 2000))}W")
+            text = " / ".join(lines)
+            anchor = transform.map(outlet.pos()) + QPointF(12, -12)
+            rect = QRectF(anchor.x(), anchor.y() - metrics.height() - 4, metrics.horizontalAdvance(text) + 10, metrics.height() + 4)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(self._color)
+            painter.drawRoundedRect(rect, 4, 4)
+            painter.setPen(Qt.white)
+            painter.drawText(rect, Qt.AlignCenter, text)
+        painter.restore()
@@ -0,0 +1,293 @@
+"""配線の自動ルーティング
+
+会場の壁 (VenueItem) と機材の外接矩形から格子状の占有マップを作り、A* 探索で
+水平・垂直の線分だけからなる経路を求める。曲がる回数にはペナルティを付け、
+手で引いた配線と同じように角の少ない経路を優先する。
+
+占有マップは壁（会場の版が変わるまで）と機材（外接矩形の一覧が変わるまで）を
+キャッシュして使い回す。探索は Qt のオブジェクトを使わない純粋な計算のため、
+ワーカースレッドで行い、GUI スレッドは進捗の表示とイベント処理を続ける。
+"""
+import heapq
+import math
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from PySide6.QtCore import QPointF
+from PySide6.QtWidgets import QGraphicsItem, QGraphicsScene
+
+import constants
+from items import EquipmentItem, VenueItem, WiringItem, wire_anchor
+
+# 探索する進行方向 (列, 行)
+_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+class OccupancyMap:
+    """格子状の占有マップ（セル毎に 1 = 通行不可）"""
+    def __init__(self, left: float, top: float, cols: int, rows: int, cell_size: float) -> None:
+        """初期化処理"""
+        self.left = left
+        self.top = top
+        self.cols = cols
+        self.rows = rows
+        self.cell_size = cell_size
+        self.blocked = bytearray(cols * rows)
+
+    def copy(self) -> "OccupancyMap":
+        """複製（壁だけのマップに機材を書き込む時に使う）"""
+        other = OccupancyMap(self.left, self.top, self.cols, self.rows, self.cell_size)
+        other.blocked[:] = self.blocked
+        return other
+
+    def cell_of(self, x: float, y: float) -> tuple[int, int]:
+        """座標を含むセル（範囲外は端のセル）"""
+        col = min(max(math.floor((x - self.left) / self.cell_size), 0), self.cols - 1)
+        row = min(max(math.floor((y - self.top) / self.cell_size), 0), self.rows - 1)
+        return col, row
+
+    def center_of(self, col: int, row: int) -> tuple[float, float]:
+        """セルの中心座標"""
+        return self.left + (col + 0.5) * self.cell_size, self.top + (row + 0.5) * self.cell_size
+
+    def cells_in_rect(self, left: float, top: float, right: float, bottom: float) -> list[int]:
+        """矩形に重なるセルの番号"""
+        first_col, first_row = self.cell_of(left, top)
+        last_col, last_row = self.cell_of(right, bottom)
+        return [row * self.cols + col for row in range(first_row, last_row + 1) for col in range(first_col, last_col + 1)]
+
+    def block_rect(self, left: float, top: float, right: float, bottom: float) -> None:
+        """矩形に重なるセルを通行不可にする"""
+        for index in self.cells_in_rect(left, top, right, bottom):
+            self.blocked[index] = 1
+
+    def block_segment(self, x1: float, y1: float, x2: float, y2: float) -> None:
+        """線分が通るセルを通行不可にする（セル幅の半分毎に調べる）"""
+        steps = max(1, math.ceil(math.hypot(x2 - x1, y2 - y1) / (self.cell_size / 2)))
+        for i in range(steps + 1):
+            col, row = self.cell_of(x1 + (x2 - x1) * i / steps, y1 + (y2 - y1) * i / steps)
+            self.blocked[row * self.cols + col] = 1
+
+
+def find_route(occupancy: OccupancyMap, start: tuple[float, float], end: tuple[float, float],
+               passable: frozenset[int] = frozenset()) -> list[tuple[float, float]] | None:
+    """start から end までの直交経路の中間点（見つからなければ None）。passable のセルは障害物でも通れる"""
+    cols = occupancy.cols
+    rows = occupancy.rows
+    blocked = occupancy.blocked
+    bend_penalty = constants.ROUTER_BEND_PENALTY
+    start_col, start_row = occupancy.cell_of(*start)
+    end_col, end_row = occupancy.cell_of(*end)
+    start_index = start_row * cols + start_col
+    end_index = end_row * cols + end_col
+
+    # 状態は (セル番号, 直前の進行方向)。開始時は方向なし (-1)
+    start_state = (start_index, -1)
+    best = {start_state: 0}
+    came_from = {}
+    heap = [(abs(end_col - start_col) + abs(end_row - start_row), 0, start_index, -1)]
+    goal_state = None
+    expansions = 0
+    while heap:
+        _, cost, index, direction = heapq.heappop(heap)
+        if cost > best.get((index, direction), cost):
+            continue  # より安い経路で処理済み
+        if index == end_index:
+            goal_state = (index, direction)
+            break
+        expansions += 1
+        if expansions > constants.ROUTER_MAX_EXPANSIONS:
+            return None
+        col, row = index % cols, index // cols
+        for new_direction, (dc, dr) in enumerate(_DIRECTIONS):
+            new_col, new_row = col + dc, row + dr
+            if not (0 <= new_col < cols and 0 <= new_row < rows):
+                continue
+            new_index = new_row * cols + new_col
+            if blocked[new_index] and new_index not in passable:
+                continue
+            new_cost = cost + 1 + (bend_penalty if direction not in (-1, new_direction) else 0)
+            state = (new_index, new_direction)
+            if new_cost < best.get(state, new_cost + 1):
+                best[state] = new_cost
+                came_from[state] = (index, direction)
+                heuristic = abs(end_col - new_col) + abs(end_row - new_row)
+                heapq.heappush(heap, (new_cost + heuristic, new_cost, new_index, new_direction))
+    if goal_state is None:
+        return None
+
+    cells = []
+    state = goal_state
+    while state != start_state:
+        cells.append(state[0])
+        state = came_from[state]
+    cells.append(start_index)
+    cells.reverse()
+    return _middle_points(occupancy, [(index % cols, index // cols) for index in cells], start, end)
+
+
+def _middle_points(occupancy: OccupancyMap, cells: list[tuple[int, int]],
+                   start: tuple[float, float], end: tuple[float, float]) -> list[tuple[float, float]]:
+    """セルの経路を、両端の点を通る直交折れ線の中間点（曲がり角）に変換"""
+    # 同じ向きに進む区間 [向き ("h"/"v"), 固定される座標] に分ける
+    runs = []
+    for (col1, row1), (col2, row2) in zip(cells, cells[1:]):
+        orientation = "h" if row1 == row2 else "v"
+        if not runs or runs[-1][0] != orientation:
+            x, y = occupancy.center_of(col1, row1)
+            runs.append([orientation, y if orientation == "h" else x])
+    if not runs:
+        # 同じセル内: 直線で結べなければ角を1つ作る
+        return [] if start[0] == end[0] or start[1] == end[1] else [(end[0], start[1])]
+
+    if len(runs) == 1 and runs[0][1] is not None:
+        # 一直線の経路で両端の位置がずれている場合は、中央で段差を付ける
+        orientation = runs[0][0]
+        if (orientation == "h" and start[1] != end[1]) or (orientation == "v" and start[0] != end[0]):
+            middle_col, middle_row = cells[len(cells) // 2]
+            mx, my = occupancy.center_of(middle_col, middle_row)
+            runs = [[orientation, None], ["v" if orientation == "h" else "h", mx if orientation == "h" else my],
+                    [orientation, None]]
+    # 最初と最後の区間は端点の位置に合わせる
+    runs[0][1] = start[1] if runs[0][0] == "h" else start[0]
+    runs[-1][1] = end[1] if runs[-1][0] == "h" else end[0]
+
+    points = []
+    for (orientation, fixed), (_, next_fixed) in zip(runs, runs[1:]):
+        point = (next_fixed, fixed) if orientation == "h" else (fixed, next_fixed)
+        if not points or points[-1] != point:
+            points.append(point)
+    # 端点と重なる角は不要
+    return [p for p in points if p != start and p != end]
+
+
+class ObstacleCache:
+    """占有マップのキャッシュ（壁は会場の版、機材は外接矩形の一覧が変わるまで使い回す）"""
+    def __init__(self) -> None:
+        """初期化処理"""
+        self._wall_key: tuple | None = None
+        self._wall_map: OccupancyMap | None = None
+        self._key: tuple | None = None
+        self._map: OccupancyMap | None = None
+
+    def get(self, scene: QGraphicsScene) -> OccupancyMap:
+        """シーンの占有マップを取得（変更がなければ前回のものを返す）"""
+        bounds = scene.itemsBoundingRect().adjusted(-constants.ROUTER_MARGIN, -constants.ROUTER_MARGIN,
+                                                    constants.ROUTER_MARGIN, constants.ROUTER_MARGIN)
+        # セル数が上限を超えないようにセルを粗くする
+        cell_size = max(constants.ROUTER_CELL_SIZE,
+                        math.sqrt(bounds.width() * bounds.height() / constants.ROUTER_MAX_CELLS))
+        # 格子の原点をセルの間隔に揃え、配置が少し変わっても同じ格子になるようにする
+        left = math.floor(bounds.left() / cell_size) * cell_size
+        top = math.floor(bounds.top() / cell_size) * cell_size
+        grid = (left, top, math.ceil((bounds.right() - left) / cell_size),
+                math.ceil((bounds.bottom() - top) / cell_size), cell_size)
+        wall_key = (id(scene), getattr(scene, "static_layer_version", 0), grid)
+        if wall_key != self._wall_key:
+            self._wall_map = OccupancyMap(*grid)
+            for venue in _items_of(scene, VenueItem):
+                for wall in venue.points_list:
+                    for p1, p2 in zip(wall, wall[1:]):
+                        self._wall_map.block_segment(p1.x(), p1.y(), p2.x(), p2.y())
+            self._wall_key = wall_key
+            self._key = None
+        boxes = tuple(fixture_box(item) for item in _items_of(scene, EquipmentItem))
+        key = (wall_key, boxes)
+        if key != self._key:
+            self._map = self._wall_map.copy()
+            for box in boxes:
+                self._map.block_rect(*box)
+            self._key = key
+        return self._map
+
+
+def _items_of(scene: QGraphicsScene, cls: type) -> list[QGraphicsItem]:
+    """シーンから指定クラスのアイテムを取得（登録簿があれば使う）"""
+    if hasattr(scene, "items_of"):
+        return scene.items_of(cls)
+    return [item for item in scene.items() if isinstance(item, cls)]
+
+
+def fixture_box(item: EquipmentItem) -> tuple[float, float, float, float]:
+    """機材の障害物としての範囲 (左, 上, 右, 下)。画像の外接矩形に余白を足す"""
+    rect = item.image.sceneBoundingRect()
+    margin = constants.ROUTER_CLEARANCE
+    return (rect.left() - margin, rect.top() - margin, rect.right() + margin, rect.bottom() + margin)
+
+
+def endpoint_box(item: QGraphicsItem) -> tuple[float, float, float, float]:
+    """配線の端のアイテムの範囲 (左, 上, 右, 下)。機材は fixture_box、それ以外は外接矩形"""
+    if isinstance(item, EquipmentItem):
+        return fixture_box(item)
+    rect = item.sceneBoundingRect()
+    return (rect.left(), rect.top(), rect.right(), rect.bottom())
+
+
+def _cell_index(occupancy: OccupancyMap, x: float, y: float) -> int:
+    """座標を含むセルの番号"""
+    col, row = occupancy.cell_of(x, y)
+    return row * occupancy.cols + col
+
+
+def wires_to_route(items: Iterable[QGraphicsItem]) -> list[WiringItem]:
+    """選択したアイテム同士の配線と、選択したアイテムを含む DMX チェーン全体の配線"""
+    selected = set(items)
+    wires = {}
+    for item in selected:
+        for wire in getattr(item, "attached_wires", ()):
+            if wire.start_item in selected and wire.end_item in selected:
+                wires[wire] = None
+    # DMX はデイジーチェーンを辿って、つながっている配線を全て対象にする
+    visited = set()
+    stack = list(selected)
+    while stack:
+        item = stack.pop()
+        if item in visited:
+            continue
+        visited.add(item)
+        for wire in getattr(item, "attached_wires", ()):
+            if wire.wire_type != "dmx":
+                continue
+            wires[wire] = None
+            stack.extend(end for end in (wire.start_item, wire.end_item) if end is not None)
+    return list(wires)
+
+
+def route_wires(scene: QGraphicsScene, wires: list[WiringItem],
+                progress: Callable[[int, int], bool] | None = None) -> dict[WiringItem, list[QPointF]] | None:
+    """配線の経路をまとめて求める（経路が見つからなかった配線は結果に含めない）
+
+    探索はワーカースレッドで行い、呼び出し側のスレッドは待つ間 progress(完了数, 総数) を呼ぶ。
+    progress が False を返したら残りの探索を取り消して None を返す。
+    """
+    occupancy = OBSTACLE_CACHE.get(scene)
+    jobs = []
+    for wire in wires:
+        if wire.start_item is None or wire.end_item is None:
+            continue
+        start = wire_anchor(wire.start_item)
+        end = wire_anchor(wire.end_item)
+        # 両端のセルと両端のアイテム（機材・壁のコンセント等）の中は通れるようにする
+        passable = {_cell_index(occupancy, start.x(), start.y()), _cell_index(occupancy, end.x(), end.y())}
+        for end_item in (wire.start_item, wire.end_item):
+            passable.update(occupancy.cells_in_rect(*endpoint_box(end_item)))
+        passable = frozenset(passable)
+        jobs.append((wire, (start.x(), start.y()), (end.x(), end.y()), passable))
+    if not jobs:
+        return {}
+    executor = ThreadPoolExecutor(max_workers=min(constants.ROUTER_WORKERS, len(jobs)), thread_name_prefix="wire-router")
+    futures = [executor.submit(find_route, occupancy, start, end, passable) for _, start, end, passable in jobs]
+    pending = set(futures)
+    while pending:
+        _, pending = wait(pending, timeout=constants.ROUTER_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        if progress is not None and not progress(len(futures) - len(pending), len(futures)):
+            # 探索中のものは終わり次第捨てられる（占有マップは読むだけなので待たない）
+            executor.shutdown(wait=False, cancel_futures=True)
+            return None
+    executor.shutdown()
+    return {job[0]: [QPointF(x, y) for x, y in future.result()]
+            for job, future in zip(jobs, futures) if future.result() is not None}
+
+
+# 自動ルーティングで共有する占有マップのキャッシュ
+OBSTACLE_CACHE = ObstacleCache()
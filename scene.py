@@ -0,0 +1,234 @@
+from PySide6.QtWidgets import QGraphicsScene, QGraphicsItem
+from PySide6.QtCore import QTimer, QRectF, QPointF, Signal
+
+import constants
+from power import PowerGraph
+from spatial import GridIndex
+
+
+# ドラッグ中に保留した更新をまとめて反映する間隔 (ms, 約60fps)
+DRAG_FLUSH_INTERVAL_MS = 16
+
+
+class LayoutScene(QGraphicsScene):
+    """配置図用シーン（クラス・instance_id・type_id 別のアイテム登録簿を持つ）"""
+    # ドラッグ中に保留していた更新を反映した時に発行
+    dragFlushed = Signal()
+    # アイテムが変更済みとして記録された時に発行（Undo スタックを通らない編集も含む。引数は対象アイテムのリスト）
+    itemsMarkedDirty = Signal(list)
+    
+    def __init__(self, *args) -> None:
+        """初期化処理"""
+        super().__init__(*args)
+        self._reset_registry()
+        # --- ドラッグトランザクション ---
+        self._drag_items: set[QGraphicsItem] = set()
+        self._drag_dirty: dict[QGraphicsItem, None] = {}
+        self._drag_active = False
+        self._drag_timer = QTimer(self)
+        self._drag_timer.setInterval(DRAG_FLUSH_INTERVAL_MS)
+        self._drag_timer.timeout.connect(self.flush_drag)
+        # --- 一括読み込み ---
+        self._bulk_loading = False
+        self._saved_index_method = self.itemIndexMethod()
+        # --- 機材・コンセントのキャッシュモード（高速描画モードで変更） ---
+        self._item_cache_mode = QGraphicsItem.NoCache
+        # 会場の壁・コンセントの表示が変わる毎に増える版（ビューの静的レイヤーの作り直し判定用）
+        self.static_layer_version = 0
+        # ビューの操作モード（配線の当たり判定の幅を切り替える。CustomGraphicsView が設定）
+        self.interaction_mode: str | None = None
+
+    def _reset_registry(self) -> None:
+        """登録簿を空にする"""
+        # dict を挿入順付きの集合として使う（追加順が保存順・計算順になる）
+        self._items_by_class: dict[type, dict[QGraphicsItem, None]] = {}
+        self._items_by_instance_id: dict[str, QGraphicsItem] = {}
+        self._items_by_type_id: dict[str, dict[QGraphicsItem, None]] = {}
+        # 機材スナップ点の空間インデックス（セル幅 = 吸着距離）
+        self.snap_index = GridIndex(constants.SNAP_THRESHOLD_ITEM)
+        # 前回の保存以降に変更されたアイテム（差分保存用）
+        self._dirty_items: dict[QGraphicsItem, None] = {}
+        # 電源系統（コンセント毎・回路毎の消費電力を差分で更新）
+        self.power_graph = PowerGraph()
+
+    def addItem(self, item: QGraphicsItem) -> None:
+        """アイテムを追加し、登録簿に登録する"""
+        super().addItem(item)
+        self._register(item)
+        if hasattr(item, "set_cache_mode"):
+            item.set_cache_mode(self._item_cache_mode)
+        if getattr(item, "static_layer", False):
+            self.invalidate_static_layer()
+        # 配線は両端アイテムの接続配線リストに登録する
+        if hasattr(item, "_attach"):
+            item._attach()
+
+    def removeItem(self, item: QGraphicsItem) -> None:
+        """アイテムを削除し、登録簿から外す"""
+        if hasattr(item, "_detach"):
+            item._detach()
+        self._unregister(item)
+        super().removeItem(item)
+        if getattr(item, "static_layer", False):
+            self.invalidate_static_layer()
+
+    def clear(self) -> None:
+        """全アイテムを削除し、登録簿もリセットする"""
+        super().clear()
+        self._reset_registry()
+        self.invalidate_static_layer()
+
+    def _register(self, item: QGraphicsItem) -> None:
+        """登録簿にアイテムを登録"""
+        self._items_by_class.setdefault(type(item), {})[item] = None
+        instance_id = getattr(item, "instance_id", None)
+        if instance_id:
+            self._items_by_instance_id[instance_id] = item
+        type_id = getattr(item, "type_id", None)
+        if type_id:
+            self._items_by_type_id.setdefault(type_id, {})[item] = None
+        self.power_graph.add_item(item)
+        # 一括読み込み中のスナップ点登録は end_bulk_load でまとめて行う
+        if not self._bulk_loading and getattr(item, "snap_points_data", None):
+            item.refresh_snap_points()
+
+    def _unregister(self, item: QGraphicsItem) -> None:
+        """登録簿からアイテムを外す"""
+        self._items_by_class.get(type(item), {}).pop(item, None)
+        instance_id = getattr(item, "instance_id", None)
+        if instance_id and self._items_by_instance_id.get(instance_id) is item:
+            del self._items_by_instance_id[instance_id]
+        type_id = getattr(item, "type_id", None)
+        if type_id:
+            self._items_by_type_id.get(type_id, {}).pop(item, None)
+        self.snap_index.remove(item)
+        self.power_graph.remove_item(item)
+
+    def invalidate_static_layer(self) -> None:
+        """会場の壁・コンセントの表示が変わったことを記録する"""
+        self.static_layer_version += 1
+
+    def set_item_cache_mode(self, mode: QGraphicsItem.CacheMode) -> None:
+        """機材・コンセントのキャッシュモードを設定（以降に追加されるアイテムにも適用）"""
+        self._item_cache_mode = mode
+        for cls, items in self._items_by_class.items():
+            if hasattr(cls, "set_cache_mode"):
+                for item in items:
+                    item.set_cache_mode(mode)
+
+    def items_of(self, *classes: type) -> list[QGraphicsItem]:
+        """指定クラス（サブクラス含む）のアイテムを追加順で返す"""
+        result = []
+        for cls, items in self._items_by_class.items():
+            if issubclass(cls, classes):
+                result.extend(items)
+        return result
+
+    def item_by_instance_id(self, instance_id: str) -> QGraphicsItem | None:
+        """instance_id からアイテムを取得"""
+        return self._items_by_instance_id.get(instance_id)
+
+    def items_by_type_id(self, type_id: str) -> list[QGraphicsItem]:
+        """機材タイプIDが一致するアイテムを返す"""
+        return list(self._items_by_type_id.get(type_id, {}))
+
+    # === 差分保存 ===
+    def mark_dirty(self, *items: QGraphicsItem) -> None:
+        """アイテムを変更済みとして記録する"""
+        for item in items:
+            self._dirty_items[item] = None
+        if items:
+            self.itemsMarkedDirty.emit(list(items))
+
+    def take_dirty(self) -> list[QGraphicsItem]:
+        """変更済みアイテムを返し、記録を空にする"""
+        dirty = list(self._dirty_items)
+        self._dirty_items = {}
+        return dirty
+
+    # === ドラッグトランザクション ===
+    def begin_drag(self, items) -> None:
+        """ドラッグ開始（配線更新・シーン範囲拡張をフレーム単位にまとめる）"""
+        self._drag_items = set(items)
+        self._drag_dirty = {}
+        self._drag_active = True
+        self._drag_timer.start()
+
+    def end_drag(self) -> None:
+        """ドラッグ終了（保留していた更新を反映する）"""
+        if not self._drag_active:
+            return
+        self._drag_timer.stop()
+        self._drag_active = False
+        self.flush_drag()
+        self._drag_items = set()
+
+    def is_dragging(self) -> bool:
+        """ドラッグトランザクション中かどうか"""
+        return self._drag_active
+
+    def drag_items(self) -> set[QGraphicsItem]:
+        """ドラッグ中のアイテム集合"""
+        return self._drag_items
+
+    def defer_drag_update(self, item: QGraphicsItem) -> None:
+        """移動したアイテムの更新を次のフラッシュまで保留する"""
+        self._drag_dirty[item] = None
+
+    def flush_drag(self) -> None:
+        """保留中の配線更新・スナップ点更新・シーン範囲拡張を一度だけ行う"""
+        if not self._drag_dirty:
+            return
+        moved = [item for item in self._drag_dirty if item.scene() is self]
+        self._drag_dirty = {}
+        # 複数の移動アイテムに接続された配線も1回だけ再計算する
+        wires = {}
+        for item in moved:
+            for wire in getattr(item, "attached_wires", ()):
+                wires[wire] = None
+        for wire in wires:
+            wire.update_path()
+        for item in moved:
+            if getattr(item, "snap_points_data", None):
+                item.refresh_snap_points()
+        self.grow_scene_rect([item.pos() for item in moved])
+        self.dragFlushed.emit()
+
+    def grow_scene_rect(self, positions: list[QPointF]) -> None:
+        """位置が端に近づいていればシーン範囲を拡張する"""
+        if not positions:
+            return
+        current_rect = self.sceneRect()
+        trigger_margin = 5000
+        safe_rect = current_rect.adjusted(trigger_margin, trigger_margin, -trigger_margin, -trigger_margin)
+        new_rect = current_rect
+        for pos in positions:
+            if not safe_rect.contains(pos):
+                new_rect = new_rect.united(QRectF(pos.x(), pos.y(), 1, 1))
+        if new_rect != current_rect:
+            self.setSceneRect(new_rect.adjusted(-1000, -1000, 1000, 1000))
+
+    # === 一括読み込み ===
+    def begin_bulk_load(self) -> None:
+        """一括読み込み開始（BSP索引・スナップ点登録・移動時の副作用を止める）"""
+        self._bulk_loading = True
+        self._saved_index_method = self.itemIndexMethod()
+        self.setItemIndexMethod(QGraphicsScene.NoIndex)
+
+    def end_bulk_load(self) -> None:
+        """一括読み込み終了（索引を一度だけ再構築する）"""
+        if not self._bulk_loading:
+            return
+        self._bulk_loading = False
+        self.setItemIndexMethod(self._saved_index_method)
+        positions = []
+        for items in self._items_by_class.values():
+            for item in items:
+                if getattr(item, "snap_points_data", None):
+                    item.refresh_snap_points()
+                positions.append(item.pos())
+        self.grow_scene_rect(positions)
+
+    def is_bulk_loading(self) -> bool:
+        """一括読み込み中かどうか"""
+        return self._bulk_loading
@@ -0,0 +1,100 @@
+import math
+from collections.abc import Hashable, Iterator
+
+from PySide6.QtCore import QPointF
+
+
+class GridIndex:
+    """一様グリッドによる点の空間インデックス（キーごとに複数の点を持てる）"""
+    def __init__(self, cell_size: float) -> None:
+        """初期化処理"""
+        self.cell_size = float(cell_size)
+        self._cells: dict[tuple[int, int], dict[Hashable, list[QPointF]]] = {}
+        self._key_cells: dict[Hashable, set[tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        """登録されているキーの数"""
+        return len(self._key_cells)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """キーが登録されているか"""
+        return key in self._key_cells
+
+    def _cell_of(self, x: float, y: float) -> tuple[int, int]:
+        """座標が属するセルを返す"""
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, key: Hashable, points: list[QPointF]) -> None:
+        """キーの点を登録（既に登録済みなら置き換える。空なら削除）"""
+        self.remove(key)
+        if not points:
+            return
+        cells = set()
+        for pt in points:
+            cell = self._cell_of(pt.x(), pt.y())
+            self._cells.setdefault(cell, {}).setdefault(key, []).append(pt)
+            cells.add(cell)
+        self._key_cells[key] = cells
+
+    def remove(self, key: Hashable) -> None:
+        """キーの点を全て削除"""
+        for cell in self._key_cells.pop(key, ()):
+            bucket = self._cells.get(cell)
+            if bucket is None:
+                continue
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self) -> None:
+        """全ての点を削除"""
+        self._cells.clear()
+        self._key_cells.clear()
+
+    def query(self, pos: QPointF, radius: float) -> Iterator[tuple[Hashable, QPointF]]:
+        """pos から radius 未満にある (キー, 点) を列挙"""
+        x, y = pos.x(), pos.y()
+        min_cx, min_cy = self._cell_of(x - radius, y - radius)
+        max_cx, max_cy = self._cell_of(x + radius, y + radius)
+        radius_sq = radius * radius
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = self._cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for key, points in bucket.items():
+                    for pt in points:
+                        dx = pt.x() - x
+                        dy = pt.y() - y
+                        if dx * dx + dy * dy < radius_sq:
+                            yield key, pt
+
+    def query_box(self, pos: QPointF, half_size: float) -> Iterator[tuple[Hashable, QPointF]]:
+        """pos を中心とする一辺 2*half_size の正方形の内側（境界を除く）にある (キー, 点) を列挙"""
+        x, y = pos.x(), pos.y()
+        min_cx, min_cy = self._cell_of(x - half_size, y - half_size)
+        max_cx, max_cy = self._cell_of(x + half_size, y + half_size)
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = self._cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for key, points in bucket.items():
+                    for pt in points:
+                        if abs(pt.x() - x) < half_size and abs(pt.y() - y) < half_size:
+                            yield key, pt
+
+    def nearest(self, pos: QPointF, radius: float, exclude: set | None = None) -> tuple[Hashable, QPointF] | None:
+        """pos から radius 未満で最も近い (キー, 点) を返す（見つからなければ None）"""
+        best = None
+        best_dist_sq = radius * radius
+        for key, pt in self.query(pos, radius):
+            if exclude and key in exclude:
+                continue
+            dx = pt.x() - pos.x()
+            dy = pt.y() - pos.y()
+            dist_sq = dx * dx + dy * dy
+            if dist_sq < best_dist_sq:
+                best = (key, pt)
+                best_dist_sq = dist_sq
+        return best
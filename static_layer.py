@@ -0,0 +1,64 @@
+"""会場の壁・コンセントの静的レイヤー
+
+機材の配置中は会場の壁 (VenueItem) とコンセント (OutletItem とそのラベル) は変化しないため、
+ズーム倍率毎にタイル画像へ描画しておき、ビューの背景として貼り付ける。
+ビュー上ではこれらのアイテム自身は描画を省き（選択中のものを除く）、機材と配線だけを毎回描画する。
+会場の適用・コンセントの追加削除・表示内容の変更でシーンの static_layer_version が
+変わるとタイルを作り直す。
+"""
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QPainter, QPixmap, QTransform
+from PySide6.QtWidgets import QGraphicsItem, QGraphicsScene, QStyleOptionGraphicsItem, QWidget
+
+import constants
+from grid_tiles import DeviceTileCache
+
+
+def is_static_item(item: QGraphicsItem) -> bool:
+    """静的レイヤーに描画するアイテムか（最上位の親が static_layer 属性を持つもの）"""
+    return getattr(item.topLevelItem(), "static_layer", False)
+
+
+def drawn_by_static_layer(item: QGraphicsItem, widget: QWidget | None) -> bool:
+    """描画先のビューで静的レイヤーが有効か（選択中のアイテムは枠を出すため自分で描画する）"""
+    view = widget.parentWidget() if widget is not None else None
+    return getattr(view, "static_layer_enabled", False) and not item.topLevelItem().isSelected()
+
+
+class StaticLayer(DeviceTileCache):
+    """静的アイテムのタイルキャッシュ（ズーム倍率・シーンの版が変わるまで使い回す）"""
+    def __init__(self, tile_px: int = constants.STATIC_LAYER_TILE_PX,
+                 limit: int = constants.STATIC_LAYER_CACHE_LIMIT) -> None:
+        """初期化処理"""
+        super().__init__(tile_px, limit)
+        self._scene: QGraphicsScene | None = None
+        self._scale = 1.0
+        self._hints = QPainter.RenderHint(0)
+
+    def _render_tile(self, col: int, row: int, dpr: float) -> QPixmap:
+        """タイル (col, row) に重なる静的アイテムを重なり順に描画"""
+        size = self.tile_px
+        pixmap = self._new_pixmap(dpr)
+        # タイル左上を原点とする、拡大後の座標系
+        tile_transform = QTransform(self._scale, 0, 0, self._scale, -col * size, -row * size)
+        scene_rect = tile_transform.inverted()[0].mapRect(QRectF(0, 0, size, size))
+        painter = QPainter(pixmap)
+        painter.setRenderHints(self._hints)
+        painter.setClipRect(QRectF(0, 0, size, size))
+        option = QStyleOptionGraphicsItem()
+        for item in self._scene.items(scene_rect, Qt.IntersectsItemBoundingRect, Qt.AscendingOrder):
+            if not item.isVisible() or not is_static_item(item):
+                continue
+            painter.setTransform(item.sceneTransform() * tile_transform)
+            # タイルにかかる範囲だけを描画させる（大きな会場の壁を毎タイル全て描かない）
+            option.exposedRect = item.mapRectFromScene(scene_rect) & item.boundingRect()
+            item.paint(painter, option, None)
+        painter.end()
+        return pixmap
+
+    def draw(self, painter: QPainter, rect: QRectF, scene: QGraphicsScene, scale: float) -> None:
+        """シーン上の rect にかかるタイルを等倍で描画（painter は拡大縮小+平行移動のみの変換）"""
+        self._scene = scene
+        self._scale = scale
+        self._hints = painter.renderHints()
+        self._blit(painter, rect, (id(scene), getattr(scene, "static_layer_version", 0), scale, int(self._hints.value)))
@@ -0,0 +1,160 @@
+"""会場テンプレートの一覧用カタログ
+
+会場ファイル (data/venues/*.json) ごとに名前・サイズ・更新時刻・壁とコンセントの数・
+縮小表示用の図形をカタログファイルに保存しておき、一覧表示のたびに全ファイルを
+読み込まないようにする。更新時刻かサイズが変わったファイルだけをスレッドプールで読み直す。
+"""
+import base64
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import Qt, QPoint, QBuffer, QByteArray, QIODevice
+from PySide6.QtGui import QColor, QImage, QPainter, QPen, QPixmap, QPolygon
+
+import constants
+from fileio import atomic_write
+
+CATALOG_VERSION = 1
+# 会場ファイルを並列に読み込むスレッド数の上限
+MAX_PARSE_WORKERS = 8
+
+
+def _to_pixels(points: list, min_x: float, min_y: float, scale: float) -> list[QPoint]:
+    """点列を縮小画像の画素座標に変換（同じ画素に続けて落ちる点は1つにまとめる）"""
+    pixels = []
+    last = None
+    for p in points:
+        pixel = (int(2 + (p["x"] - min_x) * scale), int(2 + (p["y"] - min_y) * scale))
+        if pixel != last:
+            pixels.append(QPoint(*pixel))
+            last = pixel
+    return pixels
+
+
+def _thumbnail(walls: list, outlets: list) -> str:
+    """縮小表示の PNG 画像 (base64)。QImage への描画はワーカースレッドでも行える"""
+    size = constants.VENUE_THUMBNAIL_SIZE
+    image = QImage(size, size, QImage.Format_ARGB32)
+    image.fill(Qt.white)
+    xs = [p["x"] for wall in walls for p in wall] + [o.get("x", 0) for o in outlets]
+    ys = [p["y"] for wall in walls for p in wall] + [o.get("y", 0) for o in outlets]
+    if xs:
+        # 余白 2px を残して THUMBNAIL_SIZE 四方に収める
+        min_x, min_y = min(xs), min(ys)
+        scale = (size - 5) / (max(max(xs) - min_x, max(ys) - min_y) or 1.0)
+        painter = QPainter(image)
+        painter.setPen(QPen(QColor("black"), 1))
+        for wall in walls:
+            painter.drawPolyline(QPolygon(_to_pixels(wall, min_x, min_y, scale)))
+        painter.setPen(QPen(QColor("orange"), 3))
+        for pixel in _to_pixels([{"x": o.get("x", 0), "y": o.get("y", 0)} for o in outlets], min_x, min_y, scale):
+            painter.drawPoint(pixel)
+        painter.end()
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return base64.b64encode(bytes(data)).decode("ascii")
+
+
+def _parse_venue(path: str) -> dict | None:
+    """会場ファイルを読み込んでカタログの項目を作る（ワーカースレッドで実行。消えていたら None）"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        walls = data.get("walls", [])
+        outlets = data.get("outlets", [])
+        entry.update({
+            "name": data.get("name", "Unknown"),
+            "wall_count": len(walls),
+            "outlet_count": len(outlets),
+            "thumbnail": _thumbnail(walls, outlets),
+        })
+    except Exception as e:
+        # 壊れたファイルも記録しておき、更新されるまで読み直さない
+        entry["error"] = str(e)
+    return entry
+
+
+class VenueCatalog:
+    """会場ファイルのカタログ（差分更新）"""
+    def __init__(self, venue_dir: str, catalog_path: str) -> None:
+        """初期化処理"""
+        self.venue_dir = venue_dir
+        self.catalog_path = catalog_path
+        self._entries: dict[str, dict] | None = None
+
+    def _load(self) -> dict[str, dict]:
+        """カタログファイルを読み込む（無い・壊れている場合は空）"""
+        try:
+            with open(self.catalog_path, "r", encoding="utf-8") as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if type(catalog) is not dict or catalog.get("version") != CATALOG_VERSION:
+            return {}
+        venues = catalog.get("venues")
+        return venues if type(venues) is dict else {}
+
+    def _save(self) -> None:
+        """カタログファイルを書き出す"""
+        catalog = {"version": CATALOG_VERSION, "venues": self._entries}
+        data = json.dumps(catalog, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        try:
+            atomic_write(self.catalog_path, data)
+        except OSError as e:
+            print(f"会場カタログを保存できませんでした: {e}")
+
+    def refresh(self) -> list[tuple[str, dict]]:
+        """更新された会場ファイルだけを読み直し、(パス, 項目) をファイル名順で返す"""
+        if self._entries is None:
+            self._entries = self._load()
+        current = {}
+        stale = []
+        try:
+            scanned = [e for e in os.scandir(self.venue_dir) if e.name.endswith(".json") and e.is_file()]
+        except OSError:
+            scanned = []
+        for dir_entry in scanned:
+            try:
+                stat = dir_entry.stat()
+            except OSError:
+                continue  # 一覧を取った後に削除された
+            cached = self._entries.get(dir_entry.name)
+            if cached and cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+                current[dir_entry.name] = cached
+            else:
+                stale.append(dir_entry.name)
+        if stale:
+            paths = [os.path.join(self.venue_dir, name) for name in stale]
+            workers = min(MAX_PARSE_WORKERS, len(stale), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="venue-catalog") as executor:
+                for name, path, entry in zip(stale, paths, executor.map(_parse_venue, paths)):
+                    if entry is None:
+                        continue  # 読み込む前に削除された
+                    if "error" in entry:
+                        print(f"会場データ読み込みエラー ({path}): {entry['error']}")
+                    current[name] = entry
+        changed = bool(stale) or len(current) != len(self._entries)
+        self._entries = current
+        if changed:
+            self._save()
+        return [(os.path.join(self.venue_dir, name), self._entries[name])
+                for name in sorted(self._entries) if "error" not in self._entries[name]]
+
+
+def thumbnail_pixmap(thumbnail: str) -> QPixmap:
+    """カタログの縮小表示を QPixmap に変換"""
+    pixmap = QPixmap()
+    pixmap.loadFromData(base64.b64decode(thumbnail), "PNG")
+    return pixmap
+
+
+# 会場管理ダイアログで共有するカタログ
+VENUE_CATALOG = VenueCatalog(constants.VENUES_DIR, constants.VENUE_CATALOG_FILE)
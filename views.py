@@ -1,14 +1,18 @@
 from PySide6.QtWidgets import (
-    QGraphicsView, QGraphicsScene, QGraphicsPathItem, QGraphicsRectItem, QTreeWidget
+    QGraphicsView, QGraphicsScene, QGraphicsItem, QGraphicsPathItem, QGraphicsRectItem, QTreeWidget
 )
 from PySide6.QtCore import Qt, Signal, QRectF, QPointF, QSize, QTimer, QRect, QEvent
 from PySide6.QtGui import (
     QPainter, QPen, QColor, QMouseEvent, QPainterPath, QCursor, QWheelEvent,
-    QKeyEvent, QUndoStack, QFontMetrics
+    QKeyEvent, QUndoStack, QFontMetrics, QPixmapCache
 )
 
 import constants
-from items import EquipmentItem, WiringItem, VenueItem, VenueOutletItem, OutletItem
+from grid_tiles import GridTileCache, GridLabelOverlay
+from power import PowerBadgeOverlay
+from spatial import GridIndex
+from static_layer import StaticLayer
+from items import EquipmentItem, WiringItem, VenueItem, VenueOutletItem, OutletItem, wire_anchor
 from commands import (
     CommandAddItems, CommandRemoveItems, CommandRotateItems,
     VenueDeleteCommand, VenueAddCommand, VenueAddOutletCommand
@@ -23,19 +27,31 @@ class CustomGraphicsView(QGraphicsView):
         super().__init__(scene)
         self.setAcceptDrops(True)
         self.setMouseTracking(True)
-        # ビューポート全体を常に再描画する設定
+        # ビューポート全体を常に再描画する設定（高速描画モードでは変更部分のみ）
         self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        self.performance_mode = False
         
         # 内部状態の初期化
         self._is_panning = False  # パン操作中かどうか
         self._last_pan_pos = None
         self._r_key_is_pressed = False  # Rキー押下状態
         self._interaction_mode = "cursor"  # 現在の操作モード
+        if hasattr(scene, "interaction_mode"):
+            scene.interaction_mode = self._interaction_mode
         self.show_grid = False  # グリッド表示フラグ
         self.grid_size = int(constants.DEFAULT_GRID_SIZE)  # グリッド間隔
+        self._grid_tiles = GridTileCache()  # グリッド線のタイルキャッシュ
+        self._grid_labels = GridLabelOverlay()  # グリッドの座標ラベル
+        self.static_layer_enabled = False  # 会場の壁・コンセントを静的レイヤーから描画するか
+        self._static_layer = StaticLayer()
+        self.power_badges_enabled = False  # 容量を超えたコンセントにバッジを表示するか
+        self._power_badges = PowerBadgeOverlay()
+        self._power_version = None  # バッジを描画した時点の電源系統の版
+        # 機材の詳細度を切り替える表示倍率 (通常描画の下限, 縮小画像の下限)
+        self.lod_thresholds = (constants.LOD_FULL_MIN_SCALE, constants.LOD_THUMBNAIL_MIN_SCALE)
         self._wiring_start_item = None  # 配線開始アイテム
         self._wiring_preview_path = None  # 配線プレビュー用パス
-        self._snap_targets = []  # スナップ対象リスト
+        self._snap_index = GridIndex(constants.SNAP_DISTANCE_MOUSE)  # 配線の接続先候補（配線開始時に作成）
         self._snap_radius = constants.SNAP_DISTANCE_MOUSE  # スナップ判定半径
         self._current_wiring_points = []  # 現在の配線経路
         self._current_preview_points = []  # プレビュー用経路
@@ -47,17 +63,23 @@ class CustomGraphicsView(QGraphicsView):
         self.setDragMode(QGraphicsView.RubberBandDrag)  # デフォルトは範囲選択
     
     def drawBackground(self, painter: QPainter, rect: QRectF) -> None:
-        """グリッド背景の描画"""
-        super().drawBackground(painter, rect)
-        # グリッド表示が有効な場合のみ描画
-        if not self.show_grid:
-            return
+        """グリッド背景と会場の静的レイヤーの描画"""
+        background = self.backgroundBrush() if self.backgroundBrush().style() != Qt.NoBrush else self.scene().backgroundBrush()
+        # 単色の背景はグリッドのタイルに焼き込まれているため、塗りつぶしを省く
+        if not (self.show_grid and GridTileCache.covers_background(background)):
+            super().drawBackground(painter, rect)
         
         # 現在のズーム倍率を取得
         scale = self.transform().m11()
         if scale == 0:
             scale = 1.0
         
+        # グリッド表示が有効な場合のみ描画
+        if not self.show_grid:
+            if self.static_layer_enabled:
+                self._static_layer.draw(painter, rect, self.scene(), scale)
+            return
+        
         # グリッド間隔をズームに応じて調整（50px～100pxの範囲に収める）
         base_step = constants.DEFAULT_GRID_SIZE
         step = base_step
@@ -67,42 +89,74 @@ class CustomGraphicsView(QGraphicsView):
             step /= 2
         self.grid_size = step  # スナップ用グリッドサイズも更新
         
-        # ペンとフォントの設定
-        grid_pen = QPen(QColor(220, 220, 220))  # グリッド線
-        grid_pen.setWidth(0)
-        text_pen = QPen(QColor(150, 150, 150))  # 座標テキスト
-        font = painter.font()
-        font.setPointSizeF(10 / scale)  # フォントサイズをズームに合わせて逆補正
-        painter.setFont(font)
-        
+        # グリッド線はキャッシュしたタイルを貼り、座標ラベルだけを毎回重ねる
+        self._grid_tiles.draw(painter, rect, scale, step, background)
+        # 会場の壁・コンセントはグリッド線の上、座標ラベルの下に描く
+        if self.static_layer_enabled:
+            self._static_layer.draw(painter, rect, self.scene(), scale)
         # 現在画面に見えている範囲（シーン座標）を取得
-        viewport_rect = self.viewport().rect()
-        visible_scene_rect = self.mapToScene(viewport_rect).boundingRect()
-        view_left = visible_scene_rect.left()
-        view_top = visible_scene_rect.top()
-        offset_x = 5 / scale
-        offset_y = 15 / scale
-        
-        # 縦線とX座標の描画
-        left = int(rect.left()) - (int(rect.left()) % step)
-        x = left
-        while x < rect.right():
-            painter.setPen(grid_pen)
-            painter.drawLine(x, rect.top(), x, rect.bottom())
-            painter.setPen(text_pen)
-            painter.drawText(QPointF(x + offset_x, view_top + offset_y), str(int(x)))
-            x += step
-        
-        # 横線とY座標の描画
-        top = int(rect.top()) - (int(rect.top()) % step)
-        y = top
-        while y < rect.bottom():
-            painter.setPen(grid_pen)
-            painter.drawLine(rect.left(), y, rect.right(), y)
-            painter.setPen(text_pen)
-            painter.drawText(QPointF(view_left + offset_x, y - (2 / scale)), str(int(y)))
-            y += step
+        visible_scene_rect = self.mapToScene(self.viewport().rect()).boundingRect()
+        self._grid_labels.draw(painter, rect, visible_scene_rect, step)
     
+    def drawForeground(self, painter: QPainter, rect: QRectF) -> None:
+        """容量超過のバッジを最前面に描画"""
+        super().drawForeground(painter, rect)
+        if self.power_badges_enabled and hasattr(self.scene(), "power_graph"):
+            self._power_badges.draw(painter, self.scene().power_graph)
+            self._power_version = self.scene().power_graph.version
+    
+    def set_power_badges_enabled(self, enabled: bool) -> None:
+        """容量を超えたコンセントへのバッジ表示を設定（配線の追加・削除に合わせて更新）"""
+        if enabled == self.power_badges_enabled or not hasattr(self.scene(), "power_graph"):
+            return
+        self.power_badges_enabled = enabled
+        # シーンの変更通知は表示中だけ受け取る（接続中はシーンが更新範囲を集めるため）
+        if enabled:
+            self.scene().changed.connect(self._check_power_badges)
+        else:
+            self.scene().changed.disconnect(self._check_power_badges)
+        self.viewport().update()
+    
+    def _check_power_badges(self) -> None:
+        """シーンの変更後、電源系統の集計が変わっていればバッジを描き直す"""
+        graph = self.scene().power_graph
+        graph.overloads()  # 保留中の変更を集計に反映
+        if graph.version != self._power_version:
+            self.viewport().update()
+    
+    def set_lod_thresholds(self, full_min: float, thumbnail_min: float) -> None:
+        """機材の詳細度を切り替える表示倍率を設定（0 を指定すると常に通常描画）"""
+        if not 0 <= thumbnail_min <= full_min:
+            raise ValueError("縮小画像の下限は通常描画の下限以下にしてください")
+        self.lod_thresholds = (full_min, thumbnail_min)
+        self.viewport().update()
+
+    def set_static_layer_enabled(self, enabled: bool) -> None:
+        """会場の壁・コンセントをズーム倍率毎のタイル画像から描画するかを設定"""
+        self.static_layer_enabled = enabled
+        self._static_layer.invalidate()
+        self.viewport().update()
+
+    def set_performance_mode(self, enabled: bool) -> None:
+        """高速描画モードの切り替え（変更部分だけを再描画し、機材・コンセントをデバイス座標でキャッシュ、会場は静的レイヤーで描画）"""
+        self.performance_mode = enabled
+        self.set_static_layer_enabled(enabled)
+        if enabled:
+            self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+            # 既定の上限 (10MB) では数千台の機材のキャッシュが追い出し合う
+            QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), constants.ITEM_CACHE_LIMIT_KB))
+        else:
+            self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        if hasattr(self.scene(), "set_item_cache_mode"):
+            self.scene().set_item_cache_mode(QGraphicsItem.DeviceCoordinateCache if enabled else QGraphicsItem.NoCache)
+        self.viewport().update()
+
+    def scrollContentsBy(self, dx: int, dy: int) -> None:
+        """スクロール処理（グリッドの座標ラベルは画面端に固定のため、ずらした画像を使わず全体を再描画）"""
+        super().scrollContentsBy(dx, dy)
+        if self.show_grid and self.viewportUpdateMode() != QGraphicsView.FullViewportUpdate:
+            self.viewport().update()
+
     def set_interaction_mode(self, mode: str) -> None:
         """操作モードの切り替え"""
         self._cancel_wiring()
@@ -115,11 +169,9 @@ class CustomGraphicsView(QGraphicsView):
             self.setCursor(Qt.CrossCursor)
             self.setDragMode(QGraphicsView.NoDrag)
             
-        # 操作モード切替時にWiringItemのshapeキャッシュを破棄し、再計算させる
-        if self.scene():
-            for item in self.scene().items():
-                if isinstance(item, WiringItem):
-                    item.prepareGeometryChange()
+        # 配線の当たり判定はモード毎にキャッシュされているため、シーンのモードを切り替えるだけでよい
+        if hasattr(self.scene(), "interaction_mode"):
+            self.scene().interaction_mode = mode
     
     def mousePressEvent(self, event: QMouseEvent) -> None:
         """マウス押下イベント処理"""
@@ -173,10 +225,12 @@ class CustomGraphicsView(QGraphicsView):
                     self._wiring_preview_path.setPen(pen)
                     self.scene().addItem(self._wiring_preview_path)
                     
-                    self._snap_targets = []
-                    for item in self.scene().items():
-                        if isinstance(item, (EquipmentItem, OutletItem)) and item != self._wiring_start_item:
-                            self._snap_targets.append(item)
+                    # 接続先候補の中心点をグリッドに登録し、マウス移動時は周囲のセルだけを調べる
+                    # (配線中は機材を動かせないため、配線の終了まで使い回す)
+                    self._snap_index.clear()
+                    for item in self.scene().items_of(EquipmentItem, OutletItem):
+                        if item != self._wiring_start_item:
+                            self._snap_index.insert(item, [wire_anchor(item)])
             else:
                 self._current_wiring_points.extend(self._current_preview_points)
                 # 直線上の冗長な点を削除
@@ -184,10 +238,7 @@ class CustomGraphicsView(QGraphicsView):
                     p1 = self._current_wiring_points[-2]
                     p2 = self._current_wiring_points[-1]
                     if len(self._current_wiring_points) == 2:
-                        if isinstance(self._wiring_start_item, EquipmentItem):
-                            p0 = self._wiring_start_item.pos() + self._wiring_start_item.image.boundingRect().center()
-                        else:
-                            p0 = self._wiring_start_item.pos()
+                        p0 = wire_anchor(self._wiring_start_item)
                     else:
                         p0 = self._current_wiring_points[-3]
                     if (p0.x() == p1.x() == p2.x()) or (p0.y() == p1.y() == p2.y()):
@@ -230,10 +281,7 @@ class CustomGraphicsView(QGraphicsView):
             if self._wiring_start_item and self._wiring_preview_path:
                 current_pos_scene = self.mapToScene(event.position().toPoint())
                 
-                if isinstance(self._wiring_start_item, EquipmentItem):
-                    start_center = self._wiring_start_item.pos() + self._wiring_start_item.image.boundingRect().center()
-                else:
-                    start_center = self._wiring_start_item.pos()
+                start_center = wire_anchor(self._wiring_start_item)
                 
                 if not self._current_wiring_points:
                     last_pos = start_center
@@ -245,26 +293,19 @@ class CustomGraphicsView(QGraphicsView):
                 for point in self._current_wiring_points: path.lineTo(point)
                 self._current_preview_points = []
                 
+                # カーソルの周囲 (縦横 ±スナップ半径) にある候補のうち最も近いもの
                 target_item = None
-                for item in self._snap_targets:
-                    if isinstance(item, EquipmentItem):
-                        item_center = item.pos() + item.image.boundingRect().center()
-                    else:
-                        item_center = item.pos()
-                        
-                    dx = abs(current_pos_scene.x() - item_center.x())
-                    dy = abs(current_pos_scene.y() - item_center.y())
-                    if dx < self._snap_radius and dy < self._snap_radius:
-                        target_item = item
-                        break
+                end_pos = None
+                best_dist_sq = None
+                for item, item_center in self._snap_index.query_box(current_pos_scene, self._snap_radius):
+                    dx = current_pos_scene.x() - item_center.x()
+                    dy = current_pos_scene.y() - item_center.y()
+                    dist_sq = dx * dx + dy * dy
+                    if best_dist_sq is None or dist_sq < best_dist_sq:
+                        target_item, end_pos, best_dist_sq = item, item_center, dist_sq
                 
                 if target_item:
                     # A: スナップする場合（終点処理）
-                    if isinstance(target_item, EquipmentItem):
-                        end_pos = target_item.pos() + target_item.image.boundingRect().center()
-                    else:
-                        end_pos = target_item.pos()
-                        
                     if self._wiring_direction_priority == "horizontal":
                         first_corner = QPointF(end_pos.x(), last_pos.y())
                         second_corner = QPointF(end_pos.x(), end_pos.y())
@@ -346,7 +387,9 @@ class CustomGraphicsView(QGraphicsView):
         if not isinstance(source, QTreeWidget): return
         item_data = source.currentItem().data(0, Qt.UserRole)
         if not item_data or item_data.get("type") != "equipment": return
-        equipment_item = EquipmentItem(item_data)
+        # ライブラリの DMX モードの表を同じ種類の機材で共有する
+        mode_table = self.mainWindow.library.mode_table(item_data["id"]) if self.mainWindow else None
+        equipment_item = EquipmentItem(item_data, mode_table=mode_table)
         scene_pos = self.mapToScene(event.position().toPoint())
         equipment_item.setPos(scene_pos)
         # self.scene().addItem(equipment_item)
@@ -356,6 +399,8 @@ class CustomGraphicsView(QGraphicsView):
         else:
             print("エラー: undoStack が見つかりません。")
             self.scene().addItem(equipment_item)
+        if self.mainWindow:
+            self.mainWindow.report_missing_images()
         event.acceptProposedAction()
     
     def wheelEvent(self, event: QEvent) -> None:
@@ -382,12 +427,6 @@ class CustomGraphicsView(QGraphicsView):
         else:
             super().wheelEvent(event)
     
-    def _redraw_all_wires(self) -> None:
-        """全WiringItemの再描画"""
-        for item in self.scene().items():
-            if isinstance(item, WiringItem):
-                item.update_path()
-    
     def keyPressEvent(self, event: QKeyEvent) -> None:
         """キーボード押下イベント処理"""
         # Escキーで配線を一括キャンセル
@@ -440,7 +479,7 @@ class CustomGraphicsView(QGraphicsView):
         self._wiring_preview_path = None
         self._current_wiring_points = []
         self._current_preview_points = []
-        self._snap_targets = []
+        self._snap_index.clear()
         self._locked_axis = None # ロック解除
     
     def _get_target_item_at(self, pos: QPointF) -> object:
@@ -1,13 +1,14 @@
-import os
 from PySide6.QtWidgets import (
     QWidget, QTableWidget, QHeaderView, QTableWidgetItem, QMenu,
-    QAbstractItemView
+    QAbstractItemView, QToolTip
 )
 from PySide6.QtCore import Qt, Signal, QPoint, QRect, QPointF
-from PySide6.QtGui import QPainter, QColor, QPen, QPixmap, QMouseEvent, QPainterPath, QPaintEvent, QAction, QCursor
+from PySide6.QtGui import QPainter, QColor, QPen, QMouseEvent, QPainterPath, QPaintEvent, QAction, QCursor, QImage
 
-# 定数ファイルからインポート
-from constants import DATA_DIR
+import constants
+
+from pixmap_cache import PIXMAP_CACHE
+from image_resolver import IMAGE_RESOLVER
 
 class SnapPreviewWidget(QWidget):
     """スナップ点プレビュー用ウィジェット"""
@@ -24,15 +25,9 @@ class SnapPreviewWidget(QWidget):
         self.image_path = image_path
         self.snap_points = points
         
-        load_path = image_path
-        if image_path and not os.path.exists(image_path):
-            # DATA_DIR 基準で探す
-            alt_path = os.path.join(DATA_DIR, image_path)
-            if os.path.exists(alt_path):
-                load_path = alt_path
-        
-        if load_path and os.path.exists(load_path):
-            self._pixmap = QPixmap(load_path)
+        load_path = IMAGE_RESOLVER.find(image_path)
+        if load_path:
+            self._pixmap = PIXMAP_CACHE.pixmap(load_path)
         else:
             self._pixmap = None
         self.update() # 再描画
@@ -101,6 +96,80 @@ class SnapPreviewWidget(QWidget):
         
         painter.restore()
 
+class UniverseOccupancyWidget(QWidget):
+    """ユニバース毎のスロット使用状況（1行 = 1ユニバース。全ユニバースを1枚の画像から描画）"""
+    LABEL_WIDTH = 44  # ユニバース番号の欄の幅
+    ROW_HEIGHT = 12  # 1ユニバースの行の高さ
+    
+    def __init__(self, parent: QWidget = None) -> None:
+        """初期化処理"""
+        super().__init__(parent)
+        self.setMouseTracking(True)
+        self._occupancy = None
+        self._universes: list[int] = []
+        self._image = QImage()
+        # スロットの使用機材数 → 色（0 = 空き、1 = 使用中、2以上 = 重複）
+        self._color_table = [QColor(60, 60, 60).rgb(), QColor(80, 170, 90).rgb()] + [QColor(220, 60, 60).rgb()] * 254
+    
+    def set_occupancy(self, occupancy) -> None:
+        """表示する UniverseOccupancy を設定"""
+        self._occupancy = occupancy
+        self.refresh()
+    
+    def refresh(self) -> None:
+        """使用状況の変更を反映（スロット配列をそのまま8bitの画像にする）"""
+        size = constants.DMX_UNIVERSE_SIZE
+        self._universes = self._occupancy.universes() if self._occupancy else []
+        if self._universes:
+            data = b"".join(self._occupancy.counts(universe) for universe in self._universes)
+            image = QImage(data, size, len(self._universes), size, QImage.Format_Indexed8)
+            image.setColorTable(self._color_table)
+            self._image = image.copy()  # data の寿命に依存しないよう複製
+        else:
+            self._image = QImage()
+        self.setMinimumHeight(max(1, len(self._universes)) * self.ROW_HEIGHT)
+        self.update()
+    
+    def paintEvent(self, event: QPaintEvent) -> None:
+        """ウィジェット描画処理"""
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(40, 40, 40))
+        if self._image.isNull():
+            painter.setPen(QColor(200, 200, 200))
+            painter.drawText(self.rect(), Qt.AlignCenter, "DMX機材なし")
+            return
+        row_height = self.ROW_HEIGHT
+        painter.drawImage(QRect(self.LABEL_WIDTH, 0, self.width() - self.LABEL_WIDTH, row_height * len(self._universes)), self._image)
+        font = painter.font()
+        font.setPixelSize(row_height - 2)
+        painter.setFont(font)
+        painter.setPen(QColor(200, 200, 200))
+        for row, universe in enumerate(self._universes):
+            painter.drawText(QRect(0, row * row_height, self.LABEL_WIDTH - 4, row_height), Qt.AlignRight | Qt.AlignVCenter, f"U{universe}")
+    
+    def slot_at(self, pos: QPoint) -> tuple[int, int] | None:
+        """ウィジェット上の位置の (ユニバース, スロット)"""
+        width = self.width() - self.LABEL_WIDTH
+        row = pos.y() // self.ROW_HEIGHT
+        if width <= 0 or pos.x() < self.LABEL_WIDTH or not 0 <= row < len(self._universes):
+            return None
+        slot = (pos.x() - self.LABEL_WIDTH) * constants.DMX_UNIVERSE_SIZE // width + 1
+        return self._universes[row], min(slot, constants.DMX_UNIVERSE_SIZE)
+    
+    def mouseMoveEvent(self, event: QMouseEvent) -> None:
+        """スロットの使用機材をツールチップに表示"""
+        hit = self.slot_at(event.position().toPoint())
+        if hit is None:
+            QToolTip.hideText()
+            return
+        universe, slot = hit
+        owner = self._occupancy.owner_at(universe, slot)
+        name = getattr(owner, "name", "?") if owner is not None else "空き"
+        text = (f"U{universe}-{slot}: {name}\n"
+                f"使用 {self._occupancy.used(universe)}/{constants.DMX_UNIVERSE_SIZE}ch  "
+                f"断片化 {self._occupancy.fragmentation(universe):.0%}")
+        QToolTip.showText(event.globalPosition().toPoint(), text, self)
+
 class NumericTableWidgetItem(QTableWidgetItem):
     """数値としてソート可能なテーブルアイテム"""
     def __lt__(self, other: QTableWidgetItem) -> bool: